@@ -4,27 +4,36 @@ Authentication API Endpoints
 
 from fastapi import APIRouter, Depends, HTTPException, status
 from fastapi.security import OAuth2PasswordBearer, OAuth2PasswordRequestForm
-from sqlalchemy.orm import Session
+from sqlalchemy.ext.asyncio import AsyncSession
 from datetime import timedelta
 from app.core.database import get_db
 from app.core.security import (
-    verify_password, 
-    get_password_hash, 
+    verify_password_async,
+    get_password_hash_async,
     create_access_token, 
     create_refresh_token,
-    decode_token
+    decode_token,
+    PasswordHashingBusyError
 )
 from app.core.config import settings
-from app.schemas.auth import Token, UserCreate, UserResponse, TokenData, TokenRefresh
+from app.schemas.auth import Token, UserCreate, UserResponse, UserAdminUpdate, TokenData, TokenRefresh
 from app.repositories.user_repository import UserRepository
+from app.services.principal_cache import principal_cache
+from app.services.volunteer_matching import volunteer_capabilities
 
 router = APIRouter()
 oauth2_scheme = OAuth2PasswordBearer(tokenUrl="/api/v1/auth/login")
 
+password_busy_exception = HTTPException(
+    status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+    detail="Authentication service is busy, please retry shortly",
+    headers={"Retry-After": "1"},
+)
+
 
 async def get_current_user(
     token: str = Depends(oauth2_scheme),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_db)
 ) -> UserResponse:
     """Get current authenticated user from JWT token"""
     credentials_exception = HTTPException(
@@ -42,8 +51,17 @@ async def get_current_user(
         raise credentials_exception
     
     token_data = TokenData(user_id=user_id)
+    
+    # Serve repeat requests for the same token without a users lookup
+    issued_at = payload.get("iat")
+    principal = await principal_cache.get(token_data.user_id, issued_at)
+    if principal is not None:
+        return principal
+    
+    # Taken before the lookup so a concurrent invalidation wins over this load
+    snapshot = await principal_cache.snapshot(token_data.user_id)
     repo = UserRepository(db)
-    user = repo.get_by_id(token_data.user_id)
+    user = await repo.get_by_id(token_data.user_id)
     
     if user is None:
         raise credentials_exception
@@ -54,24 +72,27 @@ async def get_current_user(
             detail="User account is inactive"
         )
     
-    return UserResponse(
+    principal = UserResponse(
         id=str(user.id),
         email=user.email,
         role=user.role,
         first_name=user.first_name,
         last_name=user.last_name,
         is_active=user.is_active,
+        timezone=user.timezone or "UTC",
         created_at=user.created_at
     )
+    await principal_cache.set(token_data.user_id, issued_at, principal, snapshot)
+    return principal
 
 
 @router.post("/register", response_model=UserResponse, status_code=status.HTTP_201_CREATED)
-async def register(user_data: UserCreate, db: Session = Depends(get_db)):
+async def register(user_data: UserCreate, db: AsyncSession = Depends(get_db)):
     """Register a new user"""
     repo = UserRepository(db)
     
     # Check if user already exists
-    existing_user = repo.get_by_email(user_data.email)
+    existing_user = await repo.get_by_email(user_data.email)
     if existing_user:
         raise HTTPException(
             status_code=status.HTTP_400_BAD_REQUEST,
@@ -87,7 +108,10 @@ async def register(user_data: UserCreate, db: Session = Depends(get_db)):
         )
     
     # Hash password
-    hashed_password = get_password_hash(user_data.password)
+    try:
+        hashed_password = await get_password_hash_async(user_data.password)
+    except PasswordHashingBusyError:
+        raise password_busy_exception
     
     # Create user
     user_dict = {
@@ -103,7 +127,7 @@ async def register(user_data: UserCreate, db: Session = Depends(get_db)):
         "is_email_verified": False
     }
     
-    user = repo.create(user_dict)
+    user = await repo.create(user_dict)
     
     return UserResponse(
         id=str(user.id),
@@ -112,6 +136,7 @@ async def register(user_data: UserCreate, db: Session = Depends(get_db)):
         first_name=user.first_name,
         last_name=user.last_name,
         is_active=user.is_active,
+        timezone=user.timezone or "UTC",
         created_at=user.created_at
     )
 
@@ -119,11 +144,11 @@ async def register(user_data: UserCreate, db: Session = Depends(get_db)):
 @router.post("/login", response_model=Token)
 async def login(
     form_data: OAuth2PasswordRequestForm = Depends(),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_db)
 ):
     """Login and get access token"""
     repo = UserRepository(db)
-    user = repo.get_by_email(form_data.username)  # OAuth2 uses 'username' for email
+    user = await repo.get_by_email(form_data.username)  # OAuth2 uses 'username' for email
     
     if not user:
         raise HTTPException(
@@ -132,7 +157,12 @@ async def login(
             headers={"WWW-Authenticate": "Bearer"},
         )
     
-    if not verify_password(form_data.password, user.password_hash):
+    try:
+        password_valid = await verify_password_async(form_data.password, user.password_hash)
+    except PasswordHashingBusyError:
+        raise password_busy_exception
+    
+    if not password_valid:
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
             detail="Incorrect email or password",
@@ -146,7 +176,7 @@ async def login(
         )
     
     # Update last login
-    repo.update_last_login(user)
+    await repo.update_last_login(user)
     
     # Create tokens
     access_token_expires = timedelta(minutes=settings.ACCESS_TOKEN_EXPIRE_MINUTES)
@@ -169,7 +199,7 @@ async def login(
 @router.post("/refresh", response_model=Token)
 async def refresh_token_endpoint(
     token_data: TokenRefresh,
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_db)
 ):
     """Refresh access token using refresh token"""
     credentials_exception = HTTPException(
@@ -191,7 +221,7 @@ async def refresh_token_endpoint(
         raise credentials_exception
     
     repo = UserRepository(db)
-    user = repo.get_by_id(user_id)
+    user = await repo.get_by_id(user_id)
     
     if user is None or not user.is_active:
         raise credentials_exception
@@ -221,3 +251,55 @@ async def get_current_user_endpoint(
     """Get current authenticated user"""
     return current_user
 
+
+@router.patch("/users/{user_id}", response_model=UserResponse)
+async def update_user_access(
+    user_id: str,
+    user_update: UserAdminUpdate,
+    current_user: UserResponse = Depends(get_current_user),
+    db: AsyncSession = Depends(get_db)
+):
+    """Change a user's role or active state (site admins only)"""
+    if current_user.role != 'site_admin':
+        raise HTTPException(
+            status_code=status.HTTP_403_FORBIDDEN,
+            detail="Only site admins can update user access"
+        )
+    
+    repo = UserRepository(db)
+    user = await repo.get_by_id(user_id)
+    
+    if user is None:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="User not found"
+        )
+    
+    update_dict = user_update.model_dump(exclude_unset=True)
+    
+    if 'role' in update_dict:
+        valid_roles = ['requesting_doctor', 'requesting_patient', 'volunteer_physician', 'site_admin']
+        if update_dict['role'] not in valid_roles:
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail=f"Invalid role. Must be one of: {', '.join(valid_roles)}"
+            )
+    
+    user = await repo.update(user, update_dict)
+    
+    # Cached principals still carry the old role / active flag
+    await principal_cache.invalidate(str(user.id))
+    # ...and so does the volunteer matching map (in this worker; others age out)
+    volunteer_capabilities.invalidate()
+    
+    return UserResponse(
+        id=str(user.id),
+        email=user.email,
+        role=user.role,
+        first_name=user.first_name,
+        last_name=user.last_name,
+        is_active=user.is_active,
+        timezone=user.timezone or "UTC",
+        created_at=user.created_at
+    )
+
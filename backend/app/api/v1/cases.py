@@ -3,23 +3,47 @@ Cases API Endpoints
 """
 
 from fastapi import APIRouter, Depends, HTTPException, status, Query
-from sqlalchemy.orm import Session
+from sqlalchemy.ext.asyncio import AsyncSession
 from typing import Optional
 from uuid import UUID
+from datetime import datetime, timezone
 from app.core.database import get_db
+from app.core.db_routing import get_read_db
+from app.core.pagination import InvalidCursorError
 from app.api.v1.auth import get_current_user
 from app.schemas.auth import UserResponse
 from app.schemas.case import CaseCreate, CaseUpdate, CaseResponse, CaseListResponse
 from app.repositories.case_repository import CaseRepository
+from app.services.case_priority import compute_priority_score
 
 router = APIRouter()
 
 
+def _case_response(case) -> CaseResponse:
+    return CaseResponse(
+        id=str(case.id),
+        requesting_doctor_id=str(case.requesting_doctor_id),
+        patient_id=str(case.patient_id) if case.patient_id else None,
+        title=case.title,
+        chief_complaint=case.chief_complaint,
+        history=case.history,
+        physical_exam_notes=case.physical_exam_notes,
+        urgency=case.urgency,
+        status=case.status,
+        assigned_volunteer_id=str(case.assigned_volunteer_id) if case.assigned_volunteer_id else None,
+        priority_score=case.priority_score,
+        created_at=case.created_at,
+        updated_at=case.updated_at,
+        submitted_at=case.submitted_at,
+        is_offline=case.is_offline
+    )
+
+
 @router.post("/", response_model=CaseResponse, status_code=status.HTTP_201_CREATED)
 async def create_case(
     case_data: CaseCreate,
     current_user: UserResponse = Depends(get_current_user),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_db)
 ):
     """Create a new case"""
     # Only requesting doctors can create cases
@@ -48,7 +72,7 @@ async def create_case(
         "physical_exam_notes": case_data.physical_exam_notes,
         "urgency": case_data.urgency,
         "status": "draft",
-        "priority_score": 0,
+        "priority_score": compute_priority_score(case_data.urgency, None, None),
         "is_offline": False,
         "metadata": case_data.metadata
     }
@@ -62,25 +86,9 @@ async def create_case(
                 detail="Invalid patient_id format"
             )
     
-    case = repo.create(case_dict)
+    case = await repo.create(case_dict)
     
-    return CaseResponse(
-        id=str(case.id),
-        requesting_doctor_id=str(case.requesting_doctor_id),
-        patient_id=str(case.patient_id) if case.patient_id else None,
-        title=case.title,
-        chief_complaint=case.chief_complaint,
-        history=case.history,
-        physical_exam_notes=case.physical_exam_notes,
-        urgency=case.urgency,
-        status=case.status,
-        assigned_volunteer_id=str(case.assigned_volunteer_id) if case.assigned_volunteer_id else None,
-        priority_score=case.priority_score,
-        created_at=case.created_at,
-        updated_at=case.updated_at,
-        submitted_at=case.submitted_at,
-        is_offline=case.is_offline
-    )
+    return _case_response(case)
 
 
 @router.get("/", response_model=CaseListResponse)
@@ -88,8 +96,10 @@ async def list_cases(
     status_filter: Optional[str] = Query(None, alias="status"),
     page: int = Query(1, ge=1),
     page_size: int = Query(20, ge=1, le=100),
+    after: Optional[str] = Query(None, description="next_cursor from the previous page"),
+    include_total: Optional[bool] = Query(None, description="Defaults to true only without a cursor"),
     current_user: UserResponse = Depends(get_current_user),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_read_db)
 ):
     """List cases for current user"""
     repo = CaseRepository(db)
@@ -101,39 +111,77 @@ async def list_cases(
             detail="Only requesting doctors can list cases"
         )
     
-    cases, total = repo.list_by_doctor(
-        doctor_id=current_user.id,
-        status=status_filter,
+    if include_total is None:
+        include_total = after is None
+    
+    try:
+        cases, total, next_cursor = await repo.list_by_doctor(
+            doctor_id=current_user.id,
+            status=status_filter,
+            page=page,
+            page_size=page_size,
+            after=after,
+            include_total=include_total
+        )
+    except InvalidCursorError:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Invalid pagination cursor"
+        )
+    
+    case_responses = [_case_response(case) for case in cases]
+    
+    return CaseListResponse(
+        cases=case_responses,
+        total=total,
         page=page,
-        page_size=page_size
+        page_size=page_size,
+        next_cursor=next_cursor
     )
+
+
+# Declared before /{case_id} so "available" is not taken as an id
+@router.get("/available", response_model=CaseListResponse)
+async def list_available_cases(
+    urgency: Optional[str] = Query(None),
+    page: int = Query(1, ge=1),
+    page_size: int = Query(20, ge=1, le=100),
+    after: Optional[str] = Query(None, description="next_cursor from the previous page"),
+    include_total: Optional[bool] = Query(None, description="Defaults to true only without a cursor"),
+    current_user: UserResponse = Depends(get_current_user),
+    db: AsyncSession = Depends(get_read_db)
+):
+    """Case queue for volunteers, highest priority first"""
+    if current_user.role != 'volunteer_physician':
+        raise HTTPException(
+            status_code=status.HTTP_403_FORBIDDEN,
+            detail="Only volunteers can view available cases"
+        )
     
-    case_responses = [
-        CaseResponse(
-            id=str(case.id),
-            requesting_doctor_id=str(case.requesting_doctor_id),
-            patient_id=str(case.patient_id) if case.patient_id else None,
-            title=case.title,
-            chief_complaint=case.chief_complaint,
-            history=case.history,
-            physical_exam_notes=case.physical_exam_notes,
-            urgency=case.urgency,
-            status=case.status,
-            assigned_volunteer_id=str(case.assigned_volunteer_id) if case.assigned_volunteer_id else None,
-            priority_score=case.priority_score,
-            created_at=case.created_at,
-            updated_at=case.updated_at,
-            submitted_at=case.submitted_at,
-            is_offline=case.is_offline
+    if include_total is None:
+        include_total = after is None
+    
+    repo = CaseRepository(db)
+    try:
+        cases, total, next_cursor = await repo.list_available(
+            urgency=urgency,
+            page=page,
+            page_size=page_size,
+            after=after,
+            include_total=include_total
+        )
+    except InvalidCursorError:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Invalid pagination cursor"
         )
-        for case in cases
-    ]
     
     return CaseListResponse(
-        cases=case_responses,
+        cases=[_case_response(case) for case in cases],
         total=total,
         page=page,
-        page_size=page_size
+        page_size=page_size,
+        next_cursor=next_cursor
     )
 
 
@@ -141,7 +189,7 @@ async def list_cases(
 async def get_case(
     case_id: str,
     current_user: UserResponse = Depends(get_current_user),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_db)
 ):
     """Get case by ID"""
     repo = CaseRepository(db)
@@ -153,7 +201,7 @@ async def get_case(
             detail="Only requesting doctors can view cases"
         )
     
-    case = repo.get_by_id(case_id, doctor_id=current_user.id)
+    case = await repo.get_by_id(case_id, doctor_id=current_user.id)
     
     if not case:
         raise HTTPException(
@@ -161,23 +209,7 @@ async def get_case(
             detail="Case not found"
         )
     
-    return CaseResponse(
-        id=str(case.id),
-        requesting_doctor_id=str(case.requesting_doctor_id),
-        patient_id=str(case.patient_id) if case.patient_id else None,
-        title=case.title,
-        chief_complaint=case.chief_complaint,
-        history=case.history,
-        physical_exam_notes=case.physical_exam_notes,
-        urgency=case.urgency,
-        status=case.status,
-        assigned_volunteer_id=str(case.assigned_volunteer_id) if case.assigned_volunteer_id else None,
-        priority_score=case.priority_score,
-        created_at=case.created_at,
-        updated_at=case.updated_at,
-        submitted_at=case.submitted_at,
-        is_offline=case.is_offline
-    )
+    return _case_response(case)
 
 
 @router.put("/{case_id}", response_model=CaseResponse)
@@ -185,7 +217,7 @@ async def update_case(
     case_id: str,
     case_update: CaseUpdate,
     current_user: UserResponse = Depends(get_current_user),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_db)
 ):
     """Update a case"""
     repo = CaseRepository(db)
@@ -196,7 +228,7 @@ async def update_case(
             detail="Only requesting doctors can update cases"
         )
     
-    case = repo.get_by_id(case_id, doctor_id=current_user.id)
+    case = await repo.get_by_id(case_id, doctor_id=current_user.id)
     if not case:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
@@ -225,32 +257,26 @@ async def update_case(
                 detail="Invalid patient_id format"
             )
     
-    updated_case = repo.update(case, update_dict)
+    # Submitting starts the waiting clock; urgency changes rescore at once
+    if update_dict.get('status') == 'submitted' and case.submitted_at is None:
+        update_dict['submitted_at'] = datetime.now(timezone.utc)
+    if 'urgency' in update_dict or 'submitted_at' in update_dict:
+        update_dict['priority_score'] = compute_priority_score(
+            update_dict.get('urgency', case.urgency),
+            update_dict.get('submitted_at') or case.submitted_at,
+            case.created_at
+        )
     
-    return CaseResponse(
-        id=str(updated_case.id),
-        requesting_doctor_id=str(updated_case.requesting_doctor_id),
-        patient_id=str(updated_case.patient_id) if updated_case.patient_id else None,
-        title=updated_case.title,
-        chief_complaint=updated_case.chief_complaint,
-        history=updated_case.history,
-        physical_exam_notes=updated_case.physical_exam_notes,
-        urgency=updated_case.urgency,
-        status=updated_case.status,
-        assigned_volunteer_id=str(updated_case.assigned_volunteer_id) if updated_case.assigned_volunteer_id else None,
-        priority_score=updated_case.priority_score,
-        created_at=updated_case.created_at,
-        updated_at=updated_case.updated_at,
-        submitted_at=updated_case.submitted_at,
-        is_offline=updated_case.is_offline
-    )
+    updated_case = await repo.update(case, update_dict)
+    
+    return _case_response(updated_case)
 
 
 @router.delete("/{case_id}", status_code=status.HTTP_204_NO_CONTENT)
 async def delete_case(
     case_id: str,
     current_user: UserResponse = Depends(get_current_user),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_db)
 ):
     """Delete a case"""
     repo = CaseRepository(db)
@@ -261,19 +287,19 @@ async def delete_case(
             detail="Only requesting doctors can delete cases"
         )
     
-    case = repo.get_by_id(case_id, doctor_id=current_user.id)
+    case = await repo.get_by_id(case_id, doctor_id=current_user.id)
     if not case:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
             detail="Case not found"
         )
     
-    repo.delete(case)
+    await repo.delete(case)
     return None
 
 
 @router.post("/sync")
-async def sync_offline_cases(db: Session = Depends(get_db)):
+async def sync_offline_cases(db: AsyncSession = Depends(get_db)):
     """Sync offline queue"""
     # TODO: Implement offline sync
     raise HTTPException(status_code=501, detail="Not implemented yet")
@@ -3,34 +3,80 @@ Consultations API Endpoints
 """
 
 from fastapi import APIRouter, Depends, HTTPException, status, Query
-from sqlalchemy.orm import Session
+from sqlalchemy.ext.asyncio import AsyncSession
 from datetime import datetime, timezone
 from typing import Optional
 from uuid import UUID
+from sqlalchemy.exc import IntegrityError
 
 from app.core.database import get_db
+from app.core.db_routing import get_read_db
+from app.core.pagination import InvalidCursorError
+from app.core.unit_of_work import UnitOfWork
+from app.core.localization import localize_models
 from app.api.v1.auth import get_current_user
 from app.schemas.auth import UserResponse
 from app.schemas.consultation import (
     ConsultationCreate,
+    ConsultationClaimNext,
     ConsultationUpdate,
     ConsultationResponse,
     ConsultationStartResponse,
     ConsultationListResponse
 )
-from app.repositories.consultation_repository import ConsultationRepository
+from app.repositories.consultation_repository import ConsultationRepository, CLOSED_STATUSES
 from app.repositories.case_repository import CaseRepository
-from app.services.agora_service import AgoraService
+from app.core.services import get_agora_service
+from app.services.availability_index import availability_index
+from app.services.free_busy import free_busy
 
 router = APIRouter()
-agora_service = AgoraService()
+
+
+def _consultation_response(consultation) -> ConsultationResponse:
+    return ConsultationResponse(
+        id=str(consultation.id),
+        case_id=str(consultation.case_id),
+        volunteer_id=str(consultation.volunteer_id),
+        patient_id=str(consultation.patient_id) if consultation.patient_id else None,
+        requesting_doctor_id=str(consultation.requesting_doctor_id),
+        scheduled_start=consultation.scheduled_start,
+        scheduled_end=consultation.scheduled_end,
+        actual_start=consultation.actual_start,
+        actual_end=consultation.actual_end,
+        duration_minutes=consultation.duration_minutes,
+        status=consultation.status,
+        agora_channel_name=consultation.agora_channel_name,
+        connection_quality=consultation.connection_quality,
+        fallback_mode=consultation.fallback_mode,
+        volunteer_notes=consultation.volunteer_notes,
+        diagnosis=consultation.diagnosis,
+        treatment_plan=consultation.treatment_plan,
+        follow_up_required=consultation.follow_up_required,
+        follow_up_notes=consultation.follow_up_notes,
+        recording_url=consultation.recording_url,
+        recording_consent_given=consultation.recording_consent_given,
+        created_at=consultation.created_at,
+        updated_at=consultation.updated_at,
+        cancelled_at=consultation.cancelled_at
+    )
+
+
+def _reserve(consultation) -> None:
+    """Take a new consultation's time out of the in-process availability caches"""
+    availability_index.reserve(consultation.volunteer_id, consultation.scheduled_start, consultation.scheduled_end)
+    free_busy.invalidate(
+        [consultation.volunteer_id, consultation.requesting_doctor_id],
+        consultation.scheduled_start,
+        consultation.scheduled_end
+    )
 
 
 @router.post("/", response_model=ConsultationResponse, status_code=status.HTTP_201_CREATED)
 async def create_consultation(
     consultation_data: ConsultationCreate,
     current_user: UserResponse = Depends(get_current_user),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_db)
 ):
     """Create a new consultation (assign volunteer to case)"""
     # Only volunteers or admins can create consultations
@@ -41,7 +87,7 @@ async def create_consultation(
         )
     
     case_repo = CaseRepository(db)
-    case = case_repo.get_by_id(consultation_data.case_id)
+    case = await case_repo.get_by_id(consultation_data.case_id)
     
     if not case:
         raise HTTPException(
@@ -51,7 +97,7 @@ async def create_consultation(
     
     # Check if consultation already exists for this case
     consultation_repo = ConsultationRepository(db)
-    existing = consultation_repo.get_by_case(consultation_data.case_id)
+    existing = await consultation_repo.get_by_case(consultation_data.case_id)
     if existing:
         raise HTTPException(
             status_code=status.HTTP_400_BAD_REQUEST,
@@ -69,7 +115,7 @@ async def create_consultation(
     consultation_dict = {
         "case_id": UUID(consultation_data.case_id),
         "volunteer_id": UUID(current_user.id),
-        "requesting_doctor_id": UUID(case.requesting_doctor_id),
+        "requesting_doctor_id": case.requesting_doctor_id,
         "scheduled_start": consultation_data.scheduled_start,
         "scheduled_end": consultation_data.scheduled_end,
         "status": "scheduled"
@@ -84,40 +130,74 @@ async def create_consultation(
                 detail="Invalid patient_id format"
             )
     
-    consultation = consultation_repo.create(consultation_dict)
+    # Claim first: the conditional UPDATE lets exactly one volunteer win the
+    # case; the unique index on consultations(case_id) is the backstop
+    try:
+        async with UnitOfWork(db):
+            claimed = await case_repo.claim(case.id, UUID(current_user.id))
+            if claimed is None:
+                raise HTTPException(
+                    status_code=status.HTTP_409_CONFLICT,
+                    detail="Case has already been claimed or is not open"
+                )
+            consultation = await consultation_repo.create(consultation_dict)
+    except IntegrityError:
+        raise HTTPException(
+            status_code=status.HTTP_409_CONFLICT,
+            detail="Consultation already exists for this case"
+        )
     
-    # Update case status
-    case_repo.update(case, {
-        "status": "assigned",
-        "assigned_volunteer_id": current_user.id
-    })
+    _reserve(consultation)
+    return _consultation_response(consultation)
+
+
+@router.post("/claim-next", response_model=ConsultationResponse, status_code=status.HTTP_201_CREATED)
+async def claim_next_case(
+    claim_data: ConsultationClaimNext,
+    current_user: UserResponse = Depends(get_current_user),
+    db: AsyncSession = Depends(get_db)
+):
+    """Claim the highest-priority open case and schedule its consultation"""
+    if current_user.role != 'volunteer_physician':
+        raise HTTPException(
+            status_code=status.HTTP_403_FORBIDDEN,
+            detail="Only volunteers can claim cases"
+        )
     
-    return ConsultationResponse(
-        id=str(consultation.id),
-        case_id=str(consultation.case_id),
-        volunteer_id=str(consultation.volunteer_id),
-        patient_id=str(consultation.patient_id) if consultation.patient_id else None,
-        requesting_doctor_id=str(consultation.requesting_doctor_id),
-        scheduled_start=consultation.scheduled_start,
-        scheduled_end=consultation.scheduled_end,
-        actual_start=consultation.actual_start,
-        actual_end=consultation.actual_end,
-        duration_minutes=consultation.duration_minutes,
-        status=consultation.status,
-        agora_channel_name=consultation.agora_channel_name,
-        connection_quality=consultation.connection_quality,
-        fallback_mode=consultation.fallback_mode,
-        volunteer_notes=consultation.volunteer_notes,
-        diagnosis=consultation.diagnosis,
-        treatment_plan=consultation.treatment_plan,
-        follow_up_required=consultation.follow_up_required,
-        follow_up_notes=consultation.follow_up_notes,
-        recording_url=consultation.recording_url,
-        recording_consent_given=consultation.recording_consent_given,
-        created_at=consultation.created_at,
-        updated_at=consultation.updated_at,
-        cancelled_at=consultation.cancelled_at
-    )
+    if claim_data.scheduled_end <= claim_data.scheduled_start:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="scheduled_end must be after scheduled_start"
+        )
+    
+    case_repo = CaseRepository(db)
+    consultation_repo = ConsultationRepository(db)
+    
+    try:
+        async with UnitOfWork(db):
+            case = await case_repo.claim_next(UUID(current_user.id), urgency=claim_data.urgency)
+            if case is None:
+                raise HTTPException(
+                    status_code=status.HTTP_404_NOT_FOUND,
+                    detail="No open cases"
+                )
+            consultation = await consultation_repo.create({
+                "case_id": case.id,
+                "volunteer_id": UUID(current_user.id),
+                "requesting_doctor_id": case.requesting_doctor_id,
+                "patient_id": case.patient_id,
+                "scheduled_start": claim_data.scheduled_start,
+                "scheduled_end": claim_data.scheduled_end,
+                "status": "scheduled"
+            })
+    except IntegrityError:
+        raise HTTPException(
+            status_code=status.HTTP_409_CONFLICT,
+            detail="Consultation already exists for this case"
+        )
+    
+    _reserve(consultation)
+    return _consultation_response(consultation)
 
 
 @router.get("/", response_model=ConsultationListResponse)
@@ -125,30 +205,45 @@ async def list_consultations(
     status_filter: Optional[str] = Query(None, alias="status"),
     page: int = Query(1, ge=1),
     page_size: int = Query(20, ge=1, le=100),
+    after: Optional[str] = Query(None, description="next_cursor from the previous page"),
+    include_total: Optional[bool] = Query(None, description="Defaults to true only without a cursor"),
     current_user: UserResponse = Depends(get_current_user),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_read_db)
 ):
     """List consultations for current user"""
     repo = ConsultationRepository(db)
     
-    if current_user.role == 'volunteer_physician':
-        consultations, total = repo.list_by_volunteer(
-            volunteer_id=current_user.id,
-            status=status_filter,
-            page=page,
-            page_size=page_size
-        )
-    elif current_user.role == 'requesting_doctor':
-        consultations, total = repo.list_by_doctor(
-            doctor_id=current_user.id,
-            status=status_filter,
-            page=page,
-            page_size=page_size
-        )
-    else:
+    if include_total is None:
+        include_total = after is None
+    
+    try:
+        if current_user.role == 'volunteer_physician':
+            consultations, total, next_cursor = await repo.list_by_volunteer(
+                volunteer_id=current_user.id,
+                status=status_filter,
+                page=page,
+                page_size=page_size,
+                after=after,
+                include_total=include_total
+            )
+        elif current_user.role == 'requesting_doctor':
+            consultations, total, next_cursor = await repo.list_by_doctor(
+                doctor_id=current_user.id,
+                status=status_filter,
+                page=page,
+                page_size=page_size,
+                after=after,
+                include_total=include_total
+            )
+        else:
+            raise HTTPException(
+                status_code=status.HTTP_403_FORBIDDEN,
+                detail="Only doctors and volunteers can list consultations"
+            )
+    except InvalidCursorError:
         raise HTTPException(
-            status_code=status.HTTP_403_FORBIDDEN,
-            detail="Only doctors and volunteers can list consultations"
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Invalid pagination cursor"
         )
     
     consultation_responses = [
@@ -181,11 +276,18 @@ async def list_consultations(
         for c in consultations
     ]
     
+    localize_models(
+        consultation_responses,
+        ["scheduled_start", "scheduled_end", "actual_start", "actual_end"],
+        current_user.timezone
+    )
+    
     return ConsultationListResponse(
         consultations=consultation_responses,
         total=total,
         page=page,
-        page_size=page_size
+        page_size=page_size,
+        next_cursor=next_cursor
     )
 
 
@@ -193,11 +295,11 @@ async def list_consultations(
 async def get_consultation(
     consultation_id: str,
     current_user: UserResponse = Depends(get_current_user),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_db)
 ):
     """Get consultation by ID"""
     repo = ConsultationRepository(db)
-    consultation = repo.get_by_id(consultation_id)
+    consultation = await repo.get_by_id(consultation_id)
     
     if not consultation:
         raise HTTPException(
@@ -256,11 +358,12 @@ async def get_consultation(
 async def start_consultation(
     consultation_id: str,
     current_user: UserResponse = Depends(get_current_user),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_db),
+    agora_service = Depends(get_agora_service)
 ):
     """Start a consultation and generate Agora token"""
     repo = ConsultationRepository(db)
-    consultation = repo.get_by_id(consultation_id)
+    consultation = await repo.get_by_id(consultation_id)
     
     if not consultation:
         raise HTTPException(
@@ -301,7 +404,7 @@ async def start_consultation(
     
     # Update consultation
     from app.core.config import settings
-    repo.update(consultation, {
+    await repo.update(consultation, {
         "status": "in_progress",
         "actual_start": datetime.now(timezone.utc),
         "agora_channel_name": channel_name,
@@ -321,11 +424,11 @@ async def end_consultation(
     consultation_id: str,
     consultation_update: Optional[ConsultationUpdate] = None,
     current_user: UserResponse = Depends(get_current_user),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_db)
 ):
     """End a consultation"""
     repo = ConsultationRepository(db)
-    consultation = repo.get_by_id(consultation_id)
+    consultation = await repo.get_by_id(consultation_id)
     
     if not consultation:
         raise HTTPException(
@@ -364,13 +467,12 @@ async def end_consultation(
         delta = update_data["actual_end"] - consultation.actual_start
         update_data["duration_minutes"] = int(delta.total_seconds() / 60)
     
-    updated = repo.update(consultation, update_data)
-    
-    # Update case status
     case_repo = CaseRepository(db)
-    case = case_repo.get_by_id(str(consultation.case_id))
-    if case:
-        case_repo.update(case, {"status": "completed"})
+    async with UnitOfWork(db):
+        updated = await repo.update(consultation, update_data)
+        
+        # Update case status
+        await case_repo.update_by_id(consultation.case_id, {"status": "completed"})
     
     return ConsultationResponse(
         id=str(updated.id),
@@ -405,11 +507,11 @@ async def update_consultation(
     consultation_id: str,
     consultation_update: ConsultationUpdate,
     current_user: UserResponse = Depends(get_current_user),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_db)
 ):
     """Update consultation details"""
     repo = ConsultationRepository(db)
-    consultation = repo.get_by_id(consultation_id)
+    consultation = await repo.get_by_id(consultation_id)
     
     if not consultation:
         raise HTTPException(
@@ -427,7 +529,17 @@ async def update_consultation(
     else:
         raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail="Access denied")
     
-    updated = repo.update(consultation, consultation_update.model_dump(exclude_unset=True))
+    was_live = consultation.status not in CLOSED_STATUSES
+    updated = await repo.update(consultation, consultation_update.model_dump(exclude_unset=True))
+    
+    # Cancelling or rescheduling frees the time for everyone involved
+    if was_live and updated.status in CLOSED_STATUSES:
+        free_busy.invalidate(
+            await repo.list_participant_ids(updated),
+            updated.scheduled_start,
+            updated.scheduled_end
+        )
+        await availability_index.refresh_volunteer(db, updated.volunteer_id)
     
     return ConsultationResponse(
         id=str(updated.id),
@@ -461,7 +573,7 @@ async def update_consultation(
 async def list_upcoming_consultations(
     limit: int = Query(10, ge=1, le=50),
     current_user: UserResponse = Depends(get_current_user),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_db)
 ):
     """List upcoming consultations for current user"""
     repo = ConsultationRepository(db)
@@ -472,7 +584,7 @@ async def list_upcoming_consultations(
             detail="Only doctors and volunteers can view upcoming consultations"
         )
     
-    consultations = repo.list_upcoming(
+    consultations = await repo.list_upcoming(
         user_id=current_user.id,
         role=current_user.role,
         limit=limit
@@ -4,47 +4,217 @@ TUS Protocol and file management
 """
 
 from fastapi import APIRouter, Depends, HTTPException, Request, Response, Header
+from fastapi.concurrency import run_in_threadpool
 from fastapi.responses import StreamingResponse
-from sqlalchemy.orm import Session
-from typing import Optional
-from uuid import uuid4
+from starlette.requests import ClientDisconnect
+from sqlalchemy.ext.asyncio import AsyncSession
+from typing import Optional, Tuple
+from uuid import UUID, uuid4
 from datetime import datetime, timezone
+from email.utils import format_datetime
 import base64
 import io
+import logging
 
 from app.core.database import get_db
+from app.core.db_routing import get_read_db
 from app.core.config import settings
+from app.core.services import get_s3_service
+from app.core.unit_of_work import UnitOfWork
 from app.api.v1.auth import get_current_user
 from app.schemas.auth import UserResponse
-from app.schemas.file import FileResponse, TUSCreateResponse, TUSHeadResponse, TUSPatchResponse
+from app.schemas.file import (
+    FileResponse,
+    TUSCreateResponse,
+    TUSHeadResponse,
+    TUSPatchResponse,
+    DirectUploadCreate,
+    DirectUploadResponse,
+    PresignedPartsRequest,
+    PresignedPart,
+    PresignedPartsResponse,
+    DirectUploadCompleteRequest
+)
 from app.repositories.file_repository import FileRepository
 from app.repositories.case_repository import CaseRepository
-from app.services.s3_service import S3Service
-from app.services.image_quality_service import ImageQualityService
+from app.repositories.upload_session_repository import UploadSessionRepository
+from app.services.tus_upload import (
+    CHECKSUM_ALGORITHMS,
+    TusMultipartWriter,
+    UploadStorageError,
+    UploadTooLargeError,
+    ChecksumMismatchError,
+    parse_checksum
+)
+
+logger = logging.getLogger(__name__)
 
 router = APIRouter()
-s3_service = S3Service()
-quality_service = ImageQualityService()
 
 
 # TUS Protocol Headers
 TUS_VERSION = "1.0.0"
 TUS_RESUMABLE = "1.0.0"
 TUS_MAX_SIZE = str(settings.TUS_MAX_FILE_SIZE)
+TUS_EXTENSIONS = "creation,creation-with-upload,termination,expiration,checksum,concatenation"
+TUS_CONTENT_TYPE = "application/offset+octet-stream"
+
+# Checksum extension: body did not match Upload-Checksum
+HTTP_460_CHECKSUM_MISMATCH = 460
+
+
+def _tus_error(status_code: int, detail: str) -> HTTPException:
+    return HTTPException(status_code=status_code, detail=detail, headers={"Tus-Resumable": TUS_RESUMABLE})
+
+
+def _upload_expires(expires_at: datetime) -> str:
+    """Upload-Expires value (RFC 7231 HTTP-date)"""
+    return format_datetime(expires_at.astimezone(timezone.utc), usegmt=True)
+
+
+def _parse_metadata(upload_metadata: Optional[str]) -> dict:
+    metadata = {}
+    if upload_metadata:
+        for item in upload_metadata.split(","):
+            if " " in item:
+                key, value = item.split(" ", 1)
+                # Decode base64 value
+                try:
+                    metadata[key] = base64.b64decode(value).decode('utf-8')
+                except Exception:
+                    metadata[key] = value
+    return metadata
+
+
+def _parse_checksum(upload_checksum: Optional[str]) -> Optional[Tuple[str, bytes]]:
+    if not upload_checksum:
+        return None
+    try:
+        return parse_checksum(upload_checksum)
+    except ValueError as e:
+        raise _tus_error(400, str(e))
+
+
+def _is_expired(session) -> bool:
+    return session.expires_at <= datetime.now(timezone.utc)
+
+
+def _milestone(offset: int, length: int) -> int:
+    """Index of the TUS_PROGRESS_MILESTONE_PERCENT band the offset falls in"""
+    return int(offset * 100 / length) // settings.TUS_PROGRESS_MILESTONE_PERCENT if length else 0
+
+
+async def _append(
+    db: AsyncSession,
+    s3,
+    session,
+    upload_offset: int,
+    request: Request,
+    checksum: Optional[Tuple[str, bytes]]
+) -> Tuple[int, Optional[datetime]]:
+    """
+    Stream the request body into the session's S3 multipart upload part by
+    part and record it; returns the new offset and the new expiry (None once
+    the upload is complete). Memory is bounded by TUS_S3_PART_SIZE, and each
+    chunk costs one UPDATE of the session; the files row is written at
+    progress milestones and on completion only
+    """
+    writer = TusMultipartWriter(s3)
+    try:
+        new_offset, part_etags = await writer.write(session, upload_offset, request.stream(), checksum)
+    except ClientDisconnect:
+        # Only a checksummed chunk gets here: it cannot be verified, so it is
+        # discarded and the offset stays put (nobody is left to answer)
+        logger.info(f"Client disconnected from upload {session.tus_upload_id}; discarding checksummed chunk")
+        return upload_offset, session.expires_at
+    except UploadTooLargeError:
+        raise _tus_error(413, "Chunk extends past Upload-Length")
+    except ChecksumMismatchError:
+        raise _tus_error(HTTP_460_CHECKSUM_MISMATCH, "Checksum Mismatch")
+    except UploadStorageError:
+        raise _tus_error(502, "Could not store chunk in file storage")
+    
+    completed = new_offset >= session.upload_length
+    if new_offset == upload_offset and not completed:
+        return new_offset, session.expires_at
+    
+    session_repo = UploadSessionRepository(db)
+    file_repo = FileRepository(db)
+    async with UnitOfWork(db):
+        # Record the offset only once the bytes are in S3. This also runs
+        # after a client disconnect, so the next HEAD resumes from here
+        advanced = await session_repo.advance(
+            session.tus_upload_id, upload_offset, new_offset, part_etags, completed=completed
+        )
+        if advanced is None:
+            raise _tus_error(409, "Upload was modified by a concurrent request")
+        
+        if session.is_partial:
+            # Kept until a final upload merges it (or it expires)
+            pass
+        elif completed:
+            file = await file_repo.get_by_id(str(session.file_id))
+            await file_repo.mark_completed(file)
+            await session_repo.delete(session.tus_upload_id)
+        elif upload_offset == 0 or _milestone(upload_offset, session.upload_length) != _milestone(new_offset, session.upload_length):
+            await file_repo.record_progress(session.file_id, new_offset, session.upload_length)
+    
+    await writer.discard_tail(session, upload_offset)
+    return new_offset, None if completed and not session.is_partial else advanced.expires_at
+
+
+@router.options("/upload")
+@router.options("/upload/{upload_id}")
+async def upload_options():
+    """
+    TUS Protocol: Discover server capabilities (OPTIONS)
+    Unauthenticated, as clients call it before creating an upload
+    """
+    return Response(
+        status_code=204,
+        headers={
+            "Tus-Resumable": TUS_RESUMABLE,
+            "Tus-Version": TUS_VERSION,
+            "Tus-Max-Size": TUS_MAX_SIZE,
+            "Tus-Extension": TUS_EXTENSIONS,
+            "Tus-Checksum-Algorithm": ",".join(CHECKSUM_ALGORITHMS),
+        }
+    )
 
 
 @router.post("/upload", response_model=TUSCreateResponse)
 async def create_upload(
     request: Request,
-    upload_length: int = Header(..., alias="Upload-Length"),
+    upload_length: Optional[int] = Header(None, alias="Upload-Length"),
     upload_metadata: Optional[str] = Header(None, alias="Upload-Metadata"),
+    upload_concat: Optional[str] = Header(None, alias="Upload-Concat"),
+    upload_checksum: Optional[str] = Header(None, alias="Upload-Checksum"),
+    content_type: Optional[str] = Header(None, alias="Content-Type"),
     current_user: UserResponse = Depends(get_current_user),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_db),
+    s3 = Depends(get_s3_service)
 ):
     """
     TUS Protocol: Create upload (POST)
-    Creates a new upload session
+    Creates a new upload session backed by an S3 multipart upload. A body
+    sent with Content-Type application/offset+octet-stream is stored right
+    away (creation-with-upload). Upload-Concat: partial creates a part of a
+    later concatenation; Upload-Concat: final;<urls> merges finished parts
     """
+    if not s3.enabled:
+        raise HTTPException(status_code=503, detail="File storage is not configured")
+    
+    metadata = _parse_metadata(upload_metadata)
+    
+    if upload_concat and upload_concat.startswith("final;"):
+        return await _concatenate_uploads(upload_concat, metadata, current_user, db, s3)
+    if upload_concat not in (None, "partial"):
+        raise _tus_error(400, "Upload-Concat must be 'partial' or 'final;<upload URLs>'")
+    is_partial = upload_concat == "partial"
+    
+    if upload_length is None:
+        raise _tus_error(400, "Upload-Length header is required")
+    
     # Validate file size
     if upload_length > settings.TUS_MAX_FILE_SIZE:
         raise HTTPException(
@@ -52,33 +222,81 @@ async def create_upload(
             detail=f"File size exceeds maximum allowed size of {settings.TUS_MAX_FILE_SIZE} bytes"
         )
     
-    # Parse metadata
-    metadata = {}
-    if upload_metadata:
-        for item in upload_metadata.split(","):
-            if " " in item:
-                key, value = item.split(" ", 1)
-                # Decode base64 value
-                try:
-                    metadata[key] = base64.b64decode(value).decode('utf-8')
-                except Exception:
-                    metadata[key] = value
+    checksum = _parse_checksum(upload_checksum)
     
     # Generate TUS upload ID
     tus_upload_id = str(uuid4())
     
     # Generate S3 key
     file_name = metadata.get("filename", f"upload_{tus_upload_id}")
-    s3_key = f"uploads/{current_user.id}/{tus_upload_id}/{file_name}"
+    if is_partial:
+        s3_key = f"uploads/{current_user.id}/{tus_upload_id}/partial"
+    else:
+        s3_key = f"uploads/{current_user.id}/{tus_upload_id}/{file_name}"
+    
+    # Chunks are streamed straight into this multipart upload by PATCH
+    try:
+        s3_upload_id = await TusMultipartWriter(s3).start(
+            s3_key, settings.S3_BUCKET_NAME, metadata.get("filetype")
+        )
+    except UploadStorageError:
+        raise HTTPException(status_code=502, detail="Could not start upload in file storage")
     
-    # Create file record
-    repo = FileRepository(db)
+    session_data = {
+        "tus_upload_id": tus_upload_id,
+        "uploaded_by": UUID(current_user.id),
+        "s3_key": s3_key,
+        "s3_bucket": settings.S3_BUCKET_NAME,
+        "s3_upload_id": s3_upload_id,
+        "upload_length": upload_length,
+        "is_partial": is_partial,
+    }
+    
+    # File record and its upload session are created together; partials
+    # get no file record of their own
+    async with UnitOfWork(db):
+        if not is_partial:
+            file_data = await _file_data(metadata, file_name, upload_length, s3_key, tus_upload_id, current_user, db)
+            file = await FileRepository(db).create(file_data)
+            session_data["file_id"] = file.id
+        session = await UploadSessionRepository(db).create(session_data)
+    
+    headers = {
+        "Location": f"/api/v1/files/upload/{tus_upload_id}",
+        "Tus-Resumable": TUS_RESUMABLE,
+        "Upload-Offset": "0",
+        "Upload-Length": str(upload_length),
+        "Upload-Expires": _upload_expires(session.expires_at)
+    }
+    
+    # creation-with-upload: the first chunk rides along with the POST
+    if content_type == TUS_CONTENT_TYPE:
+        new_offset, expires_at = await _append(db, s3, session, 0, request, checksum)
+        headers["Upload-Offset"] = str(new_offset)
+        if expires_at:
+            headers["Upload-Expires"] = _upload_expires(expires_at)
+        else:
+            headers.pop("Upload-Expires")
+    
+    return Response(status_code=201, headers=headers)
+
+
+async def _file_data(
+    metadata: dict,
+    file_name: str,
+    file_size: int,
+    s3_key: str,
+    tus_upload_id: str,
+    current_user: UserResponse,
+    db: AsyncSession
+) -> dict:
+    """Column values for a new files row"""
     file_data = {
         "uploaded_by": current_user.id,
         "file_name": file_name,
         "original_file_name": metadata.get("filename", file_name),
         "file_type": metadata.get("filetype", "document"),
-        "file_size": upload_length,
+        "file_size": file_size,
         "s3_key": s3_key,
         "s3_bucket": settings.S3_BUCKET_NAME,
         "s3_region": settings.AWS_REGION,
@@ -91,26 +309,79 @@ async def create_upload(
     
     if "case_id" in metadata:
         try:
-            from uuid import UUID
             case_uuid = UUID(metadata["case_id"])
             # Verify case exists and belongs to user
             case_repo = CaseRepository(db)
-            case = case_repo.get_by_id(metadata["case_id"], doctor_id=current_user.id)
+            case = await case_repo.get_by_id(metadata["case_id"], doctor_id=current_user.id)
             if case:
                 file_data["case_id"] = case_uuid
         except Exception:
             pass  # Invalid case_id, continue without it
     
-    file = repo.create(file_data)
+    return file_data
+
+
+async def _concatenate_uploads(
+    upload_concat: str,
+    metadata: dict,
+    current_user: UserResponse,
+    db: AsyncSession,
+    s3
+) -> Response:
+    """
+    Upload-Concat: final;<url> <url> ... merges finished partial uploads in
+    order into one file, server-side in S3, then drops the partials
+    """
+    partial_ids = [url.rstrip("/").rsplit("/", 1)[-1] for url in upload_concat[len("final;"):].split()]
+    if not partial_ids or len(partial_ids) != len(set(partial_ids)):
+        raise _tus_error(400, "Upload-Concat final needs distinct partial upload URLs")
+    if len(partial_ids) > settings.TUS_MAX_CONCAT_PARTS:
+        raise _tus_error(400, f"At most {settings.TUS_MAX_CONCAT_PARTS} partial uploads can be concatenated")
+    
+    session_repo = UploadSessionRepository(db)
+    partials = await session_repo.get_many(partial_ids)
+    if len(partials) != len(partial_ids):
+        raise _tus_error(404, "Partial upload not found")
+    for partial in partials:
+        if str(partial.uploaded_by) != current_user.id:
+            raise HTTPException(status_code=403, detail="Access denied")
+        if not partial.is_partial or partial.upload_offset < partial.upload_length:
+            raise _tus_error(400, f"Upload {partial.tus_upload_id} is not a finished partial upload")
+    
+    upload_length = sum(partial.upload_length for partial in partials)
+    if upload_length > settings.TUS_MAX_FILE_SIZE:
+        raise HTTPException(
+            status_code=413,
+            detail=f"File size exceeds maximum allowed size of {settings.TUS_MAX_FILE_SIZE} bytes"
+        )
+    
+    tus_upload_id = str(uuid4())
+    file_name = metadata.get("filename", f"upload_{tus_upload_id}")
+    s3_key = f"uploads/{current_user.id}/{tus_upload_id}/{file_name}"
+    
+    file_repo = FileRepository(db)
+    file_data = await _file_data(metadata, file_name, upload_length, s3_key, tus_upload_id, current_user, db)
+    file_data["upload_status"] = "uploading"
+    file = await file_repo.create(file_data)
+    
+    writer = TusMultipartWriter(s3)
+    try:
+        await writer.concatenate(s3_key, settings.S3_BUCKET_NAME, partials, metadata.get("filetype"))
+    except UploadStorageError:
+        await file_repo.mark_failed(file, "Concatenation failed")
+        raise _tus_error(502, "Could not concatenate uploads in file storage")
+    
+    async with UnitOfWork(db):
+        await file_repo.mark_completed(file)
+        await session_repo.delete_many(partial_ids)
+    for partial in partials:
+        await writer.terminate(partial)
     
-    # Return TUS response
-    location = f"/api/v1/files/upload/{tus_upload_id}"
     return Response(
         status_code=201,
         headers={
-            "Location": location,
+            "Location": f"/api/v1/files/upload/{tus_upload_id}",
             "Tus-Resumable": TUS_RESUMABLE,
-            "Upload-Offset": "0",
             "Upload-Length": str(upload_length)
         }
     )
@@ -120,34 +391,39 @@ async def create_upload(
 async def get_upload_info(
     upload_id: str,
     current_user: UserResponse = Depends(get_current_user),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_db)
 ):
     """
     TUS Protocol: Get upload info (HEAD)
-    Returns current upload offset and length
+    Returns current upload offset and length from the upload session
     """
-    repo = FileRepository(db)
-    file = repo.get_by_tus_id(upload_id)
-    
-    if not file:
-        raise HTTPException(status_code=404, detail="Upload not found")
+    session = await UploadSessionRepository(db).get(upload_id)
+    headers = {"Tus-Resumable": TUS_RESUMABLE, "Cache-Control": "no-store"}
     
-    # Verify file belongs to user
-    if str(file.uploaded_by) != current_user.id:
-        raise HTTPException(status_code=403, detail="Access denied")
+    # Direct-to-S3 uploads have no TUS offset to report
+    if session and session.is_direct:
+        raise _tus_error(404, "Upload not found")
     
-    # Calculate upload offset
-    upload_offset = int((file.upload_progress / 100.0) * file.file_size) if file.upload_progress else 0
+    if session:
+        if str(session.uploaded_by) != current_user.id:
+            raise HTTPException(status_code=403, detail="Access denied")
+        if _is_expired(session):
+            raise _tus_error(410, "Upload expired")
+        headers["Upload-Offset"] = str(session.upload_offset)
+        headers["Upload-Length"] = str(session.upload_length)
+        headers["Upload-Expires"] = _upload_expires(session.expires_at)
+        if session.is_partial:
+            headers["Upload-Concat"] = "partial"
+    else:
+        # Sessions are dropped on completion; the file row has the final state
+        file = await FileRepository(db).get_by_tus_id(upload_id)
+        if not file or file.upload_status != "completed":
+            raise _tus_error(404, "Upload not found")
+        if str(file.uploaded_by) != current_user.id:
+            raise HTTPException(status_code=403, detail="Access denied")
+        headers["Upload-Offset"] = headers["Upload-Length"] = str(file.file_size)
     
-    return Response(
-        status_code=200,
-        headers={
-            "Upload-Offset": str(upload_offset),
-            "Upload-Length": str(file.file_size),
-            "Tus-Resumable": TUS_RESUMABLE,
-            "Cache-Control": "no-store"
-        }
-    )
+    return Response(status_code=200, headers=headers)
 
 
 @router.patch("/upload/{upload_id}")
@@ -155,84 +431,291 @@ async def patch_upload(
     upload_id: str,
     request: Request,
     upload_offset: int = Header(..., alias="Upload-Offset"),
+    upload_checksum: Optional[str] = Header(None, alias="Upload-Checksum"),
     content_type: Optional[str] = Header(None, alias="Content-Type"),
     current_user: UserResponse = Depends(get_current_user),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_db),
+    s3 = Depends(get_s3_service)
 ):
     """
     TUS Protocol: Resume upload (PATCH)
-    Uploads file chunk
+    Appends the chunk at Upload-Offset; with Upload-Checksum the chunk is
+    verified and rejected with 460 on mismatch, leaving the offset unchanged
     """
-    repo = FileRepository(db)
-    file = repo.get_by_tus_id(upload_id)
+    if content_type != TUS_CONTENT_TYPE:
+        raise _tus_error(415, f"Content-Type must be {TUS_CONTENT_TYPE}")
     
-    if not file:
-        raise HTTPException(status_code=404, detail="Upload not found")
+    session = await UploadSessionRepository(db).get(upload_id)
     
-    # Verify file belongs to user
-    if str(file.uploaded_by) != current_user.id:
+    if not session or session.is_direct:
+        raise _tus_error(404, "Upload not found")
+    
+    # Verify upload belongs to user
+    if str(session.uploaded_by) != current_user.id:
         raise HTTPException(status_code=403, detail="Access denied")
     
-    # Read chunk data
-    chunk_data = await request.body()
-    chunk_size = len(chunk_data)
+    if _is_expired(session):
+        raise _tus_error(410, "Upload expired")
     
     # Verify offset matches
-    expected_offset = int((file.upload_progress / 100.0) * file.file_size) if file.upload_progress else 0
-    if upload_offset != expected_offset:
+    if upload_offset != session.upload_offset:
+        raise _tus_error(409, f"Offset mismatch. Expected {session.upload_offset}, got {upload_offset}")
+    
+    # A finished partial waits for concatenation; nothing more to append.
+    # A zero-byte upload is finished by one empty PATCH
+    if not session.s3_upload_id:
+        raise _tus_error(409, "Upload is already complete")
+    
+    checksum = _parse_checksum(upload_checksum)
+    new_offset, expires_at = await _append(db, s3, session, upload_offset, request, checksum)
+    
+    headers = {
+        "Upload-Offset": str(new_offset),
+        "Tus-Resumable": TUS_RESUMABLE
+    }
+    if expires_at:
+        headers["Upload-Expires"] = _upload_expires(expires_at)
+    return Response(status_code=204, headers=headers)
+
+
+@router.delete("/upload/{upload_id}")
+async def terminate_upload(
+    upload_id: str,
+    current_user: UserResponse = Depends(get_current_user),
+    db: AsyncSession = Depends(get_db),
+    s3 = Depends(get_s3_service)
+):
+    """
+    TUS Protocol: Terminate upload (DELETE)
+    Drops the session, aborts the S3 multipart upload and cancels the file
+    """
+    session_repo = UploadSessionRepository(db)
+    session = await session_repo.get(upload_id)
+    
+    if not session:
+        raise _tus_error(404, "Upload not found")
+    
+    if str(session.uploaded_by) != current_user.id:
+        raise HTTPException(status_code=403, detail="Access denied")
+    
+    # Database first: a PATCH racing with this fails its conditional UPDATE
+    file_repo = FileRepository(db)
+    async with UnitOfWork(db):
+        await session_repo.delete(upload_id)
+        if session.file_id:
+            file = await file_repo.get_by_id(str(session.file_id))
+            if file:
+                await file_repo.update(file, {"upload_status": "cancelled"})
+    
+    await TusMultipartWriter(s3).terminate(session)
+    
+    return Response(status_code=204, headers={"Tus-Resumable": TUS_RESUMABLE})
+
+
+def _file_response(f) -> FileResponse:
+    return FileResponse(
+        id=str(f.id),
+        case_id=str(f.case_id) if f.case_id else None,
+        uploaded_by=str(f.uploaded_by),
+        file_name=f.file_name,
+        original_file_name=f.original_file_name,
+        file_type=f.file_type,
+        file_size=f.file_size,
+        s3_key=f.s3_key,
+        s3_bucket=f.s3_bucket,
+        s3_region=f.s3_region,
+        mime_type=f.mime_type,
+        upload_status=f.upload_status,
+        tus_upload_id=f.tus_upload_id,
+        upload_progress=f.upload_progress,
+        quality_score=f.quality_score,
+        quality_issues=f.quality_issues,
+        is_analyzed=f.is_analyzed,
+        created_at=f.created_at,
+        completed_at=f.completed_at
+    )
+
+
+# Direct-to-S3 uploads
+# The client PUTs parts straight to presigned S3 URLs, so upload bytes never
+# pass through the API workers. Sessions share upload_sessions (and expiry)
+# with TUS uploads; DELETE /upload/{upload_id} aborts them as well
+
+async def _get_direct_session(upload_id: str, current_user: UserResponse, db: AsyncSession):
+    session = await UploadSessionRepository(db).get(upload_id)
+    if not session or not session.is_direct:
+        raise HTTPException(status_code=404, detail="Upload not found")
+    if str(session.uploaded_by) != current_user.id:
+        raise HTTPException(status_code=403, detail="Access denied")
+    if _is_expired(session):
+        raise HTTPException(status_code=410, detail="Upload expired")
+    return session
+
+
+def _direct_part_count(file_size: int) -> int:
+    return max(1, -(-file_size // settings.S3_DIRECT_UPLOAD_PART_SIZE))
+
+
+@router.post("/direct-uploads", response_model=DirectUploadResponse, status_code=201)
+async def create_direct_upload(
+    upload_data: DirectUploadCreate,
+    current_user: UserResponse = Depends(get_current_user),
+    db: AsyncSession = Depends(get_db),
+    s3 = Depends(get_s3_service)
+):
+    """
+    Start a direct-to-S3 multipart upload
+    Returns the part size and count the client must use; part URLs come from
+    /direct-uploads/{upload_id}/parts
+    """
+    if not s3.enabled:
+        raise HTTPException(status_code=503, detail="File storage is not configured")
+    
+    # S3 multipart needs a part to complete; empty files go through TUS
+    if upload_data.file_size <= 0:
+        raise HTTPException(status_code=400, detail="file_size must be positive")
+    if upload_data.file_size > settings.TUS_MAX_FILE_SIZE:
         raise HTTPException(
-            status_code=409,
-            detail=f"Offset mismatch. Expected {expected_offset}, got {upload_offset}",
-            headers={"Tus-Resumable": TUS_RESUMABLE}
+            status_code=413,
+            detail=f"File size exceeds maximum allowed size of {settings.TUS_MAX_FILE_SIZE} bytes"
         )
     
-    # Update progress
-    new_offset = upload_offset + chunk_size
-    new_progress = min(100.0, (new_offset / file.file_size) * 100.0)
-    repo.update_upload_progress(file, new_offset, file.file_size)
+    upload_id = str(uuid4())
+    s3_key = f"uploads/{current_user.id}/{upload_id}/{upload_data.file_name}"
+    
+    try:
+        s3_upload_id = await TusMultipartWriter(s3).start(s3_key, settings.S3_BUCKET_NAME, upload_data.mime_type)
+    except UploadStorageError:
+        raise HTTPException(status_code=502, detail="Could not start upload in file storage")
+    
+    metadata = {"filename": upload_data.file_name}
+    if upload_data.case_id:
+        metadata["case_id"] = upload_data.case_id
+    file_data = await _file_data(metadata, upload_data.file_name, upload_data.file_size, s3_key, upload_id, current_user, db)
+    file_data["file_type"] = upload_data.file_type
+    file_data["mime_type"] = upload_data.mime_type
+    
+    async with UnitOfWork(db):
+        file = await FileRepository(db).create(file_data)
+        session = await UploadSessionRepository(db).create({
+            "tus_upload_id": upload_id,
+            "file_id": file.id,
+            "uploaded_by": UUID(current_user.id),
+            "s3_key": s3_key,
+            "s3_bucket": settings.S3_BUCKET_NAME,
+            "s3_upload_id": s3_upload_id,
+            "upload_length": upload_data.file_size,
+            "is_direct": True,
+        })
+    
+    return DirectUploadResponse(
+        upload_id=upload_id,
+        file_id=str(file.id),
+        part_size=settings.S3_DIRECT_UPLOAD_PART_SIZE,
+        part_count=_direct_part_count(upload_data.file_size),
+        expires_at=session.expires_at
+    )
+
+
+@router.post("/direct-uploads/{upload_id}/parts", response_model=PresignedPartsResponse)
+async def presign_direct_upload_parts(
+    upload_id: str,
+    parts_request: PresignedPartsRequest,
+    current_user: UserResponse = Depends(get_current_user),
+    db: AsyncSession = Depends(get_db),
+    s3 = Depends(get_s3_service)
+):
+    """Presigned PUT URLs for a batch of part numbers (signed locally, no S3 round trip)"""
+    session = await _get_direct_session(upload_id, current_user, db)
     
-    # If this is the first chunk, update status
-    if file.upload_status == "pending":
-        repo.update(file, {"upload_status": "uploading"})
+    part_numbers = sorted(set(parts_request.part_numbers))
+    if not part_numbers or len(part_numbers) > settings.S3_DIRECT_UPLOAD_MAX_URLS:
+        raise HTTPException(
+            status_code=400,
+            detail=f"Request between 1 and {settings.S3_DIRECT_UPLOAD_MAX_URLS} part numbers"
+        )
+    part_count = _direct_part_count(session.upload_length)
+    if part_numbers[0] < 1 or part_numbers[-1] > part_count:
+        raise HTTPException(status_code=400, detail=f"Part numbers must be between 1 and {part_count}")
+    
+    try:
+        urls = await run_in_threadpool(lambda: [
+            s3.presign_upload_part(session.s3_key, session.s3_upload_id, number, session.s3_bucket)
+            for number in part_numbers
+        ])
+    except Exception:
+        raise HTTPException(status_code=502, detail="Could not sign upload URLs")
+    
+    # Handing out URLs counts as activity for expiry
+    await UploadSessionRepository(db).extend(upload_id)
+    
+    return PresignedPartsResponse(
+        parts=[PresignedPart(part_number=number, url=url) for number, url in zip(part_numbers, urls)],
+        expires_in=settings.S3_PRESIGNED_URL_EXPIRATION
+    )
+
+
+@router.post("/direct-uploads/{upload_id}/complete", response_model=FileResponse)
+async def complete_direct_upload(
+    upload_id: str,
+    complete_request: DirectUploadCompleteRequest,
+    current_user: UserResponse = Depends(get_current_user),
+    db: AsyncSession = Depends(get_db),
+    s3 = Depends(get_s3_service)
+):
+    """
+    Complete a direct upload from the ETags S3 returned for each part
+    S3 checks the ETags and part sizes; the assembled size is checked
+    against the declared file_size before the file is marked completed
+    """
+    session = await _get_direct_session(upload_id, current_user, db)
+    
+    parts = sorted(complete_request.parts, key=lambda part: part.part_number)
+    if [part.part_number for part in parts] != list(range(1, _direct_part_count(session.upload_length) + 1)):
+        raise HTTPException(status_code=400, detail="Every part must be listed exactly once")
+    
+    try:
+        await run_in_threadpool(
+            s3.complete_multipart_upload,
+            session.s3_key,
+            session.s3_upload_id,
+            [{'PartNumber': part.part_number, 'ETag': part.etag} for part in parts],
+            session.s3_bucket
+        )
+        size = await run_in_threadpool(s3.get_object_size, session.s3_key, session.s3_bucket)
+    except Exception as e:
+        logger.warning(f"Direct upload {upload_id} could not be completed: {e}")
+        raise HTTPException(status_code=400, detail="Upload could not be completed; check the parts and ETags")
     
-    # Upload chunk to S3 (in production, you'd use multipart upload)
-    # For now, we'll store chunks temporarily and assemble at completion
-    # In production, use S3 multipart upload API
+    file_repo = FileRepository(db)
+    file = await file_repo.get_by_id(str(session.file_id))
     
-    # Check if upload is complete
-    if new_offset >= file.file_size:
-        # Mark as completed
-        repo.mark_completed(file)
-        
-        # TODO: In production, complete S3 multipart upload here
-        # For now, we'll mark it as completed
-        
-        return Response(
-            status_code=204,
-            headers={
-                "Upload-Offset": str(new_offset),
-                "Tus-Resumable": TUS_RESUMABLE
-            }
+    async with UnitOfWork(db):
+        await UploadSessionRepository(db).delete(upload_id)
+        if size != session.upload_length:
+            await file_repo.mark_failed(file, f"Uploaded {size} bytes, expected {session.upload_length}")
+        else:
+            await file_repo.mark_completed(file)
+    
+    if size != session.upload_length:
+        await run_in_threadpool(s3.delete_file, session.s3_key, session.s3_bucket)
+        raise HTTPException(
+            status_code=400,
+            detail=f"Uploaded {size} bytes, expected {session.upload_length}"
         )
     
-    return Response(
-        status_code=204,
-        headers={
-            "Upload-Offset": str(new_offset),
-            "Tus-Resumable": TUS_RESUMABLE
-        }
-    )
+    return _file_response(file)
 
 
 @router.get("/{file_id}", response_model=FileResponse)
 async def get_file(
     file_id: str,
     current_user: UserResponse = Depends(get_current_user),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_db)
 ):
     """Get file metadata"""
     repo = FileRepository(db)
-    file = repo.get_by_id(file_id)
+    file = await repo.get_by_id(file_id)
     
     if not file:
         raise HTTPException(status_code=404, detail="File not found")
@@ -242,74 +725,34 @@ async def get_file(
         # Check if user has access via case
         if file.case_id:
             case_repo = CaseRepository(db)
-            case = case_repo.get_by_id(str(file.case_id), doctor_id=current_user.id)
+            case = await case_repo.get_by_id(str(file.case_id), doctor_id=current_user.id)
             if not case:
                 raise HTTPException(status_code=403, detail="Access denied")
         else:
             raise HTTPException(status_code=403, detail="Access denied")
     
-    return FileResponse(
-        id=str(file.id),
-        case_id=str(file.case_id) if file.case_id else None,
-        uploaded_by=str(file.uploaded_by),
-        file_name=file.file_name,
-        original_file_name=file.original_file_name,
-        file_type=file.file_type,
-        file_size=file.file_size,
-        s3_key=file.s3_key,
-        s3_bucket=file.s3_bucket,
-        s3_region=file.s3_region,
-        mime_type=file.mime_type,
-        upload_status=file.upload_status,
-        tus_upload_id=file.tus_upload_id,
-        upload_progress=file.upload_progress,
-        quality_score=file.quality_score,
-        quality_issues=file.quality_issues,
-        is_analyzed=file.is_analyzed,
-        created_at=file.created_at,
-        completed_at=file.completed_at
-    )
+    return _file_response(file)
 
 
 @router.get("/case/{case_id}")
 async def list_case_files(
     case_id: str,
     current_user: UserResponse = Depends(get_current_user),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_read_db)
 ):
     """List all files for a case"""
     # Verify case access
     case_repo = CaseRepository(db)
-    case = case_repo.get_by_id(case_id, doctor_id=current_user.id)
+    case = await case_repo.get_by_id(case_id, doctor_id=current_user.id)
     
     if not case:
         raise HTTPException(status_code=404, detail="Case not found")
     
     file_repo = FileRepository(db)
-    files = file_repo.get_by_case(case_id)
+    files = await file_repo.get_by_case(case_id)
     
     return [
-        FileResponse(
-            id=str(f.id),
-            case_id=str(f.case_id) if f.case_id else None,
-            uploaded_by=str(f.uploaded_by),
-            file_name=f.file_name,
-            original_file_name=f.original_file_name,
-            file_type=f.file_type,
-            file_size=f.file_size,
-            s3_key=f.s3_key,
-            s3_bucket=f.s3_bucket,
-            s3_region=f.s3_region,
-            mime_type=f.mime_type,
-            upload_status=f.upload_status,
-            tus_upload_id=f.tus_upload_id,
-            upload_progress=f.upload_progress,
-            quality_score=f.quality_score,
-            quality_issues=f.quality_issues,
-            is_analyzed=f.is_analyzed,
-            created_at=f.created_at,
-            completed_at=f.completed_at
-        )
+        _file_response(f)
         for f in files
     ]
 
@@ -318,11 +761,11 @@ async def list_case_files(
 async def analyze_image(
     file_id: str,
     current_user: UserResponse = Depends(get_current_user),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_db)
 ):
     """Analyze image quality"""
     repo = FileRepository(db)
-    file = repo.get_by_id(file_id)
+    file = await repo.get_by_id(file_id)
     
     if not file:
         raise HTTPException(status_code=404, detail="File not found")
@@ -348,7 +791,7 @@ async def analyze_image(
     issues = ["Image quality is good"]
     
     from datetime import datetime, timezone
-    repo.update(file, {
+    await repo.update(file, {
         "quality_score": quality_score,
         "quality_issues": issues,
         "is_analyzed": True,
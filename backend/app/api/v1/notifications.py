@@ -2,14 +2,17 @@
 Notifications API Endpoints
 """
 
-from fastapi import APIRouter, Depends, HTTPException, status, Query
-from sqlalchemy.orm import Session
+from fastapi import APIRouter, Depends, HTTPException, status, Query, Response
+from sqlalchemy.ext.asyncio import AsyncSession
 from typing import Optional
 from datetime import datetime, timezone
 
 from app.core.database import get_db
+from app.core.db_routing import get_read_db
+from app.core.pagination import InvalidCursorError
 from app.api.v1.auth import get_current_user
 from app.schemas.auth import UserResponse
+from app.schemas.notification import NotificationBulkRequest, NotificationBulkResponse
 from app.repositories.notification_repository import NotificationRepository
 
 router = APIRouter()
@@ -20,7 +23,7 @@ async def register_device_token(
     device_token: str,
     platform: str,
     current_user: UserResponse = Depends(get_current_user),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_db)
 ):
     """Register device token for push notifications"""
     # TODO: Store device token in database
@@ -32,18 +35,31 @@ async def register_device_token(
 async def list_notifications(
     page: int = Query(1, ge=1),
     page_size: int = Query(20, ge=1, le=100),
+    after: Optional[str] = Query(None, description="next_cursor from the previous page"),
+    include_total: Optional[bool] = Query(None, description="Defaults to true only without a cursor"),
     is_read: Optional[bool] = Query(None),
     current_user: UserResponse = Depends(get_current_user),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_read_db)
 ):
     """List notifications for current user"""
+    if include_total is None:
+        include_total = after is None
+    
     repo = NotificationRepository(db)
-    notifications, total = repo.list_notifications(
-        user_id=current_user.id,
-        is_read=is_read,
-        page=page,
-        page_size=page_size
-    )
+    try:
+        notifications, total, next_cursor = await repo.list_notifications(
+            user_id=current_user.id,
+            is_read=is_read,
+            page=page,
+            page_size=page_size,
+            after=after,
+            include_total=include_total
+        )
+    except InvalidCursorError:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Invalid pagination cursor"
+        )
     
     return {
         "notifications": [
@@ -62,6 +78,7 @@ async def list_notifications(
         "total": total,
         "page": page,
         "page_size": page_size,
+        "next_cursor": next_cursor,
     }
 
 
@@ -69,11 +86,11 @@ async def list_notifications(
 async def mark_notification_as_read(
     notification_id: str,
     current_user: UserResponse = Depends(get_current_user),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_db)
 ):
     """Mark a notification as read"""
     repo = NotificationRepository(db)
-    notification = repo.get_by_id(notification_id)
+    notification = await repo.get_by_id(notification_id)
     
     if not notification or str(notification.user_id) != current_user.id:
         raise HTTPException(
@@ -81,30 +98,70 @@ async def mark_notification_as_read(
             detail="Notification not found"
         )
     
-    repo.mark_as_read(notification)
+    await repo.mark_as_read(notification)
     return {"message": "Notification marked as read"}
 
 
 @router.post("/mark-all-read")
 async def mark_all_as_read(
     current_user: UserResponse = Depends(get_current_user),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_db)
 ):
     """Mark all notifications as read for current user"""
     repo = NotificationRepository(db)
-    repo.mark_all_as_read(user_id=current_user.id)
-    return {"message": "All notifications marked as read"}
+    count = await repo.mark_all_as_read(user_id=current_user.id)
+    return {"message": "All notifications marked as read", "count": count}
+
+
+@router.post("/bulk/read", response_model=NotificationBulkResponse)
+async def bulk_mark_as_read(
+    request: NotificationBulkRequest,
+    current_user: UserResponse = Depends(get_current_user),
+    db: AsyncSession = Depends(get_db)
+):
+    """Mark notifications as read by id list, type and/or age"""
+    repo = NotificationRepository(db)
+    count = await repo.mark_many_as_read(
+        user_id=current_user.id,
+        ids=request.ids,
+        type=request.type,
+        older_than=request.older_than
+    )
+    return NotificationBulkResponse(count=count)
+
+
+@router.post("/bulk/delete", response_model=NotificationBulkResponse)
+async def bulk_delete(
+    request: NotificationBulkRequest,
+    current_user: UserResponse = Depends(get_current_user),
+    db: AsyncSession = Depends(get_db)
+):
+    """Delete notifications by id list, type and/or age"""
+    if not request.has_filter:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Specify ids, type or older_than"
+        )
+    
+    repo = NotificationRepository(db)
+    count = await repo.delete_many(
+        user_id=current_user.id,
+        ids=request.ids,
+        type=request.type,
+        older_than=request.older_than
+    )
+    return NotificationBulkResponse(count=count)
 
 
 @router.delete("/{notification_id}")
 async def delete_notification(
     notification_id: str,
     current_user: UserResponse = Depends(get_current_user),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_db)
 ):
     """Delete a notification"""
     repo = NotificationRepository(db)
-    notification = repo.get_by_id(notification_id)
+    notification = await repo.get_by_id(notification_id)
     
     if not notification or str(notification.user_id) != current_user.id:
         raise HTTPException(
@@ -112,6 +169,6 @@ async def delete_notification(
             detail="Notification not found"
         )
     
-    repo.delete(notification)
+    await repo.delete(notification)
     return Response(status_code=status.HTTP_204_NO_CONTENT)
 
@@ -3,12 +3,19 @@ Scheduling API Endpoints
 """
 
 from fastapi import APIRouter, Depends, HTTPException, status, Query
-from sqlalchemy.orm import Session
-from typing import Optional
-from datetime import datetime
-from uuid import UUID
+from sqlalchemy.ext.asyncio import AsyncSession
+from typing import Optional, List, Tuple
+from datetime import datetime, timedelta, timezone
+from uuid import UUID, uuid4
+from sqlalchemy.exc import IntegrityError
+import logging
 
 from app.core.database import get_db
+from app.core.db_routing import get_read_db
+from app.core.pagination import InvalidCursorError
+from app.core.unit_of_work import UnitOfWork
+from app.core.localization import localize_models
+from app.core.config import settings
 from app.api.v1.auth import get_current_user
 from app.schemas.auth import UserResponse
 from app.schemas.scheduling import (
@@ -16,11 +23,30 @@ from app.schemas.scheduling import (
     AvailabilityBlockResponse,
     AppointmentSlotResponse,
     AppointmentSlotListResponse,
+    FreeWindowResponse,
+    FreeWindowListResponse,
+    MatchedWindowResponse,
+    MatchedWindowListResponse,
+    CommonFreeWindowResponse,
+    CommonFreeWindowListResponse,
+    GroupAppointmentRequest,
     BookAppointmentRequest
 )
-from app.repositories.scheduling_repository import SchedulingRepository
+from app.repositories.scheduling_repository import (
+    SchedulingRepository,
+    SlotUnavailableError,
+    BookedSlotConflictError
+)
 from app.repositories.consultation_repository import ConsultationRepository
 from app.repositories.case_repository import CaseRepository
+from app.repositories.user_repository import UserRepository
+from app.services.recurrence_service import RecurrenceService, InvalidRecurrenceError
+from app.services.slot_materializer import slot_materializer
+from app.services.availability_index import availability_index
+from app.services.volunteer_matching import volunteer_capabilities, match_free_windows
+from app.services.free_busy import free_busy, is_aligned, GRANULARITY
+
+logger = logging.getLogger(__name__)
 
 router = APIRouter()
 
@@ -29,7 +55,7 @@ router = APIRouter()
 async def create_availability_block(
     block_data: AvailabilityBlockCreate,
     current_user: UserResponse = Depends(get_current_user),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_db)
 ):
     """Create availability block (volunteers only)"""
     if current_user.role != 'volunteer_physician':
@@ -45,6 +71,20 @@ async def create_availability_block(
             detail="end_time must be after start_time"
         )
     
+    if block_data.is_recurring:
+        if not block_data.recurrence_pattern:
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail="recurrence_pattern is required for recurring blocks"
+            )
+        try:
+            RecurrenceService.validate(block_data.recurrence_pattern, block_data.start_time, block_data.timezone)
+        except InvalidRecurrenceError as e:
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail=str(e)
+            )
+    
     repo = SchedulingRepository(db)
     
     block_dict = {
@@ -58,10 +98,19 @@ async def create_availability_block(
         "status": "active"
     }
     
-    block = repo.create_availability_block(block_dict)
+    # Block and its slots are written together in one transaction
+    async with UnitOfWork(db):
+        block = await repo.create_availability_block(block_dict)
+        
+        # Generate appointment slots from the block; recurring blocks get
+        # occurrences up to the rolling horizon, the background job extends them
+        if block.is_recurring:
+            slots = await slot_materializer.materialize_block(repo, block, slot_materializer.horizon())
+        else:
+            slots = await repo.generate_slots_from_block(block)
     
-    # Generate appointment slots from the block
-    slots = repo.generate_slots_from_block(block)
+    availability_index.add_block(block)
+    free_busy.invalidate_user(block.volunteer_id)
     
     return AvailabilityBlockResponse(
         id=str(block.id),
@@ -81,7 +130,7 @@ async def create_availability_block(
 @router.get("/availability", response_model=list[AvailabilityBlockResponse])
 async def list_availability_blocks(
     current_user: UserResponse = Depends(get_current_user),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_db)
 ):
     """List availability blocks for current user"""
     if current_user.role != 'volunteer_physician':
@@ -91,7 +140,7 @@ async def list_availability_blocks(
         )
     
     repo = SchedulingRepository(db)
-    blocks = repo.list_availability_blocks(volunteer_id=current_user.id)
+    blocks = await repo.list_availability_blocks(volunteer_id=current_user.id)
     
     return [
         AvailabilityBlockResponse(
@@ -116,7 +165,7 @@ async def update_availability_block(
     block_id: str,
     block_update: AvailabilityBlockCreate,
     current_user: UserResponse = Depends(get_current_user),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_db)
 ):
     """Update an availability block"""
     if current_user.role != 'volunteer_physician':
@@ -126,7 +175,7 @@ async def update_availability_block(
         )
     
     repo = SchedulingRepository(db)
-    block = repo.get_availability_block(block_id)
+    block = await repo.get_availability_block(block_id)
     
     if not block:
         raise HTTPException(
@@ -141,6 +190,27 @@ async def update_availability_block(
             detail="You can only update your own availability blocks"
         )
     
+    # Validate the new shape
+    if block_update.end_time <= block_update.start_time:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="end_time must be after start_time"
+        )
+    
+    if block_update.is_recurring:
+        if not block_update.recurrence_pattern:
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail="recurrence_pattern is required for recurring blocks"
+            )
+        try:
+            RecurrenceService.validate(block_update.recurrence_pattern, block_update.start_time, block_update.timezone)
+        except InvalidRecurrenceError as e:
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail=str(e)
+            )
+    
     # Update block
     update_data = {
         "start_time": block_update.start_time,
@@ -151,7 +221,23 @@ async def update_availability_block(
         "recurrence_pattern": block_update.recurrence_pattern,
     }
     
-    updated_block = repo.update_availability_block(block, update_data)
+    # Block and its slots change in one transaction: slots that still fit
+    # are kept, stale unbooked ones cancelled and missing ones inserted
+    async with UnitOfWork(db):
+        updated_block = await repo.update_availability_block(block, update_data)
+        try:
+            await slot_materializer.reconcile_block(repo, updated_block)
+        except BookedSlotConflictError as e:
+            raise HTTPException(
+                status_code=status.HTTP_409_CONFLICT,
+                detail={
+                    "message": "Booked appointments fall outside the updated block; cancel or move them first",
+                    "booked_slots": [_slot_response(s).model_dump(mode="json") for s in e.slots],
+                }
+            )
+    
+    await availability_index.refresh_volunteer(db, updated_block.volunteer_id)
+    free_busy.invalidate_user(updated_block.volunteer_id)
     
     return AvailabilityBlockResponse(
         id=str(updated_block.id),
@@ -168,6 +254,20 @@ async def update_availability_block(
     )
 
 
+def _slot_response(s) -> AppointmentSlotResponse:
+    return AppointmentSlotResponse(
+        id=str(s.id),
+        availability_block_id=str(s.availability_block_id) if s.availability_block_id else None,
+        volunteer_id=str(s.volunteer_id),
+        start_time=s.start_time,
+        end_time=s.end_time,
+        timezone=s.timezone,
+        status=s.status,
+        consultation_id=str(s.consultation_id) if s.consultation_id else None,
+        created_at=s.created_at
+    )
+
+
 @router.get("/slots", response_model=AppointmentSlotListResponse)
 async def get_available_slots(
     volunteer_id: Optional[str] = Query(None),
@@ -175,8 +275,10 @@ async def get_available_slots(
     end_date: Optional[datetime] = Query(None),
     page: int = Query(1, ge=1),
     page_size: int = Query(50, ge=1, le=100),
+    after: Optional[str] = Query(None, description="next_cursor from the previous page"),
+    include_total: Optional[bool] = Query(None, description="Defaults to true only without a cursor"),
     current_user: UserResponse = Depends(get_current_user),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_read_db)
 ):
     """Get available appointment slots"""
     # Only requesting doctors can view available slots
@@ -186,35 +288,215 @@ async def get_available_slots(
             detail="Only requesting doctors can view available slots"
         )
     
+    if include_total is None:
+        include_total = after is None
+    
     repo = SchedulingRepository(db)
-    slots, total = repo.get_available_slots(
-        volunteer_id=volunteer_id,
-        start_date=start_date,
-        end_date=end_date,
-        page=page,
-        page_size=page_size
-    )
+    try:
+        slots, total, next_cursor = await repo.get_available_slots(
+            volunteer_id=volunteer_id,
+            start_date=start_date,
+            end_date=end_date,
+            page=page,
+            page_size=page_size,
+            after=after,
+            include_total=include_total
+        )
+    except InvalidCursorError:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Invalid pagination cursor"
+        )
     
-    slot_responses = [
-        AppointmentSlotResponse(
-            id=str(s.id),
-            availability_block_id=str(s.availability_block_id) if s.availability_block_id else None,
-            volunteer_id=str(s.volunteer_id),
-            start_time=s.start_time,
-            end_time=s.end_time,
-            timezone=s.timezone,
-            status=s.status,
-            consultation_id=str(s.consultation_id) if s.consultation_id else None,
-            created_at=s.created_at
-        )
-        for s in slots
-    ]
+    slot_responses = [_slot_response(s) for s in slots]
+    localize_models(slot_responses, ["start_time", "end_time"], current_user.timezone)
     
     return AppointmentSlotListResponse(
         slots=slot_responses,
         total=total,
         page=page,
-        page_size=page_size
+        page_size=page_size,
+        next_cursor=next_cursor
+    )
+
+
+def _search_range(
+    start_date: Optional[datetime],
+    end_date: Optional[datetime]
+) -> Tuple[datetime, datetime]:
+    """Default to the next 7 days; naive datetimes are taken as UTC"""
+    start_date = start_date or datetime.now(timezone.utc)
+    end_date = end_date or start_date + timedelta(days=7)
+    if start_date.tzinfo is None:
+        start_date = start_date.replace(tzinfo=timezone.utc)
+    if end_date.tzinfo is None:
+        end_date = end_date.replace(tzinfo=timezone.utc)
+    if end_date <= start_date:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="end_date must be after start_date"
+        )
+    return start_date, end_date
+
+
+@router.get("/free-windows", response_model=FreeWindowListResponse)
+async def get_free_windows(
+    duration_minutes: int = Query(30, ge=5, le=480),
+    start_date: Optional[datetime] = Query(None),
+    end_date: Optional[datetime] = Query(None),
+    volunteer_id: Optional[str] = Query(None),
+    limit: int = Query(50, ge=1, le=200),
+    current_user: UserResponse = Depends(get_current_user),
+    db: AsyncSession = Depends(get_read_db)
+):
+    """
+    Find free windows of at least duration_minutes across volunteers
+    Served from the in-memory availability index, not appointment_slots
+    """
+    if current_user.role != 'requesting_doctor':
+        raise HTTPException(
+            status_code=status.HTTP_403_FORBIDDEN,
+            detail="Only requesting doctors can search availability"
+        )
+    
+    start_date, end_date = _search_range(start_date, end_date)
+    
+    volunteer_ids = None
+    if volunteer_id:
+        try:
+            volunteer_ids = [UUID(volunteer_id)]
+        except ValueError:
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail="Invalid volunteer_id format"
+            )
+    
+    await availability_index.ensure_built(db)
+    windows = availability_index.free_windows(
+        duration_minutes,
+        start_date,
+        end_date,
+        volunteer_ids=volunteer_ids,
+        limit=limit
+    )
+    
+    window_responses = [
+        FreeWindowResponse(volunteer_id=str(vid), start_time=start, end_time=end)
+        for vid, start, end in windows
+    ]
+    localize_models(window_responses, ["start_time", "end_time"], current_user.timezone)
+    
+    return FreeWindowListResponse(windows=window_responses, duration_minutes=duration_minutes)
+
+
+@router.get("/match", response_model=MatchedWindowListResponse)
+async def match_volunteers(
+    specialization: Optional[str] = Query(None),
+    language: Optional[List[str]] = Query(None, description="Repeat for several; all must be spoken"),
+    duration_minutes: int = Query(30, ge=5, le=480),
+    start_date: Optional[datetime] = Query(None),
+    end_date: Optional[datetime] = Query(None),
+    limit: int = Query(20, ge=1, le=100),
+    current_user: UserResponse = Depends(get_current_user),
+    db: AsyncSession = Depends(get_read_db)
+):
+    """
+    Earliest free windows for volunteers matching specialization and languages
+    e.g. ?specialization=cardiology&language=fr
+    """
+    if current_user.role != 'requesting_doctor':
+        raise HTTPException(
+            status_code=status.HTTP_403_FORBIDDEN,
+            detail="Only requesting doctors can search availability"
+        )
+    
+    start_date, end_date = _search_range(start_date, end_date)
+    windows = await match_free_windows(
+        db,
+        duration_minutes,
+        start_date,
+        end_date,
+        specialization=specialization,
+        languages=language,
+        limit=limit
+    )
+    
+    matched = []
+    for vid, start, end in windows:
+        volunteer_specialization, languages_spoken = volunteer_capabilities.profile(vid)
+        matched.append(MatchedWindowResponse(
+            volunteer_id=str(vid),
+            start_time=start,
+            end_time=end,
+            specialization=volunteer_specialization,
+            languages_spoken=languages_spoken
+        ))
+    
+    localize_models(matched, ["start_time", "end_time"], current_user.timezone)
+    
+    return MatchedWindowListResponse(windows=matched, duration_minutes=duration_minutes)
+
+
+def _parse_user_ids(values: List[str], field: str) -> List[UUID]:
+    try:
+        return list(dict.fromkeys(UUID(value) for value in values))
+    except ValueError:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"Invalid {field} format"
+        )
+
+
+@router.get("/common-free", response_model=CommonFreeWindowListResponse)
+async def get_common_free_windows(
+    user_id: List[str] = Query(..., description="Repeat for each participant"),
+    duration_minutes: int = Query(30, ge=5, le=480),
+    start_date: Optional[datetime] = Query(None),
+    end_date: Optional[datetime] = Query(None),
+    limit: int = Query(50, ge=1, le=200),
+    current_user: UserResponse = Depends(get_current_user),
+    db: AsyncSession = Depends(get_read_db)
+):
+    """
+    Windows when every listed user is free, e.g. doctor, volunteer and interpreter
+    ?user_id=...&user_id=...&user_id=...&duration_minutes=30
+    """
+    if current_user.role not in ('requesting_doctor', 'volunteer_physician', 'site_admin'):
+        raise HTTPException(
+            status_code=status.HTTP_403_FORBIDDEN,
+            detail="Not allowed to search availability"
+        )
+    
+    user_ids = _parse_user_ids(user_id, "user_id")
+    start_date, end_date = _search_range(start_date, end_date)
+    if end_date - start_date > timedelta(days=settings.FREE_BUSY_MAX_DAYS):
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"Search range cannot exceed {settings.FREE_BUSY_MAX_DAYS} days"
+        )
+    
+    try:
+        windows = await free_busy.common_free_windows(
+            db,
+            user_ids,
+            start_date,
+            end_date,
+            duration_minutes,
+            limit=limit
+        )
+    except LookupError as e:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail=f"Unknown or inactive users: {e}"
+        )
+    
+    window_responses = [CommonFreeWindowResponse(start_time=start, end_time=end) for start, end in windows]
+    localize_models(window_responses, ["start_time", "end_time"], current_user.timezone)
+    
+    return CommonFreeWindowListResponse(
+        windows=window_responses,
+        user_ids=[str(uid) for uid in user_ids],
+        duration_minutes=duration_minutes
     )
 
 
@@ -222,7 +504,7 @@ async def get_available_slots(
 async def create_appointment(
     appointment_data: BookAppointmentRequest,
     current_user: UserResponse = Depends(get_current_user),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_db)
 ):
     """Book an appointment (create consultation from slot)"""
     if current_user.role != 'requesting_doctor':
@@ -231,24 +513,17 @@ async def create_appointment(
             detail="Only requesting doctors can book appointments"
         )
     
-    scheduling_repo = SchedulingRepository(db)
-    slot = scheduling_repo.get_slot(appointment_data.slot_id)
-    
-    if not slot:
+    try:
+        slot_uuid = UUID(appointment_data.slot_id)
+    except ValueError:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
             detail="Appointment slot not found"
         )
     
-    if slot.status != 'available':
-        raise HTTPException(
-            status_code=status.HTTP_400_BAD_REQUEST,
-            detail="Slot is not available"
-        )
-    
     # Verify case exists and belongs to user
     case_repo = CaseRepository(db)
-    case = case_repo.get_by_id(appointment_data.case_id, doctor_id=current_user.id)
+    case = await case_repo.get_by_id(appointment_data.case_id, doctor_id=current_user.id)
     
     if not case:
         raise HTTPException(
@@ -258,42 +533,78 @@ async def create_appointment(
     
     # Check if consultation already exists for this case
     consultation_repo = ConsultationRepository(db)
-    existing = consultation_repo.get_by_case(appointment_data.case_id)
+    existing = await consultation_repo.get_by_case(appointment_data.case_id)
     if existing:
         raise HTTPException(
             status_code=status.HTTP_400_BAD_REQUEST,
             detail="Consultation already exists for this case"
         )
     
-    # Create consultation
-    consultation_dict = {
-        "case_id": UUID(appointment_data.case_id),
-        "volunteer_id": slot.volunteer_id,
-        "requesting_doctor_id": UUID(current_user.id),
-        "scheduled_start": slot.start_time,
-        "scheduled_end": slot.end_time,
-        "status": "scheduled"
-    }
-    
+    patient_uuid = None
     if appointment_data.patient_id:
         try:
-            consultation_dict["patient_id"] = UUID(appointment_data.patient_id)
+            patient_uuid = UUID(appointment_data.patient_id)
         except ValueError:
             raise HTTPException(
                 status_code=status.HTTP_400_BAD_REQUEST,
                 detail="Invalid patient_id format"
             )
     
-    consultation = consultation_repo.create(consultation_dict)
+    scheduling_repo = SchedulingRepository(db)
+    # The id is chosen up front so the claim can link the slot in the same UPDATE
+    consultation_id = uuid4()
     
-    # Book the slot
-    scheduling_repo.book_slot(slot, str(consultation.id))
+    # Claim, consultation and case change together or not at all
+    try:
+        async with UnitOfWork(db):
+            # Conditional UPDATE decides concurrent bookings before anything else is written
+            slot = await scheduling_repo.claim_slot(slot_uuid, consultation_id)
+            if slot is None:
+                raise SlotUnavailableError(appointment_data.slot_id)
+            
+            consultation_dict = {
+                "id": consultation_id,
+                "case_id": case.id,
+                "volunteer_id": slot.volunteer_id,
+                "requesting_doctor_id": UUID(current_user.id),
+                "scheduled_start": slot.start_time,
+                "scheduled_end": slot.end_time,
+                "status": "scheduled"
+            }
+            if patient_uuid:
+                consultation_dict["patient_id"] = patient_uuid
+            consultation = await consultation_repo.create(consultation_dict)
+            
+            # Update case status
+            await case_repo.update(case, {
+                "status": "assigned",
+                "assigned_volunteer_id": slot.volunteer_id
+            })
+    except IntegrityError:
+        # A volunteer claimed the case concurrently (unique live consultation per case)
+        raise HTTPException(
+            status_code=status.HTTP_409_CONFLICT,
+            detail="Consultation already exists for this case"
+        )
+    except SlotUnavailableError:
+        # Lost the race (or the slot never existed): answer at once with alternatives
+        slot = await scheduling_repo.get_slot(appointment_data.slot_id)
+        if not slot:
+            raise HTTPException(
+                status_code=status.HTTP_404_NOT_FOUND,
+                detail="Appointment slot not found"
+            )
+        alternatives = await scheduling_repo.find_alternative_slots(slot.volunteer_id, slot.start_time)
+        raise HTTPException(
+            status_code=status.HTTP_409_CONFLICT,
+            detail={
+                "message": "Slot is no longer available",
+                "alternatives": [_slot_response(a).model_dump(mode="json") for a in alternatives],
+            }
+        )
     
-    # Update case status
-    case_repo.update(case, {
-        "status": "assigned",
-        "assigned_volunteer_id": str(slot.volunteer_id)
-    })
+    availability_index.reserve(slot.volunteer_id, slot.start_time, slot.end_time)
+    free_busy.invalidate([slot.volunteer_id, UUID(current_user.id)], slot.start_time, slot.end_time)
     
     return {
         "consultation_id": str(consultation.id),
@@ -303,3 +614,162 @@ async def create_appointment(
         "message": "Appointment booked successfully"
     }
 
+
+
+def _group_booking_conflict(error: IntegrityError) -> HTTPException:
+    """Map the constraint a group booking violated to the error the caller can act on"""
+    message = str(error.orig)
+    if "uq_consultations_active_case" in message:
+        return HTTPException(
+            status_code=status.HTTP_409_CONFLICT,
+            detail="Consultation already exists for this case"
+        )
+    if "consultations_patient_id_fkey" in message:
+        return HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Patient not found"
+        )
+    if "consultation_participants_user_id_fkey" in message:
+        return HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Participant not found"
+        )
+    logger.error(f"Group appointment violated an unexpected constraint: {message}")
+    return HTTPException(
+        status_code=status.HTTP_409_CONFLICT,
+        detail="Appointment conflicts with existing data"
+    )
+
+
+@router.post("/group-appointments", response_model=dict, status_code=status.HTTP_201_CREATED)
+async def create_group_appointment(
+    appointment_data: GroupAppointmentRequest,
+    current_user: UserResponse = Depends(get_current_user),
+    db: AsyncSession = Depends(get_db)
+):
+    """
+    Book a consultation with extra participants (e.g. an interpreter) at a
+    time taken from /common-free
+    """
+    if current_user.role != 'requesting_doctor':
+        raise HTTPException(
+            status_code=status.HTTP_403_FORBIDDEN,
+            detail="Only requesting doctors can book appointments"
+        )
+    
+    start_time = appointment_data.start_time
+    if start_time.tzinfo is None:
+        start_time = start_time.replace(tzinfo=timezone.utc)
+    duration = timedelta(minutes=appointment_data.duration_minutes)
+    if duration <= timedelta(0) or duration % GRANULARITY or not is_aligned(start_time):
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"start_time and duration must align to {settings.FREE_BUSY_GRANULARITY_MINUTES}-minute boundaries"
+        )
+    end_time = start_time + duration
+    # Recurring availability only has slots up to the materialization
+    # horizon; booking past it would leave nothing to claim below
+    if end_time > slot_materializer.horizon():
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"Appointments can be booked at most {settings.SLOT_MATERIALIZATION_HORIZON_DAYS} days ahead"
+        )
+    
+    doctor_id = UUID(current_user.id)
+    volunteer_id = _parse_user_ids([appointment_data.volunteer_id], "volunteer_id")[0]
+    # One row per user (UNIQUE(consultation_id, user_id)); repeats of the
+    # same (user, role) pair collapse, conflicting roles are rejected
+    roles_by_user = {doctor_id: 'requesting_doctor', volunteer_id: 'volunteer'}
+    for participant in appointment_data.participants:
+        uid = _parse_user_ids([participant.user_id], "participant user_id")[0]
+        if uid in (doctor_id, volunteer_id):
+            continue
+        if roles_by_user.setdefault(uid, participant.role) != participant.role:
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail=f"Participant {uid} is listed with more than one role"
+            )
+    participants = list(roles_by_user.items())
+    user_ids = [uid for uid, _ in participants]
+    
+    roles = await UserRepository(db).get_roles([volunteer_id])
+    if roles.get(volunteer_id) != 'volunteer_physician':
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Volunteer not found"
+        )
+    
+    case_repo = CaseRepository(db)
+    case = await case_repo.get_by_id(appointment_data.case_id, doctor_id=current_user.id)
+    if not case:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Case not found"
+        )
+    
+    patient_uuid = None
+    if appointment_data.patient_id:
+        patient_uuid = _parse_user_ids([appointment_data.patient_id], "patient_id")[0]
+    
+    consultation_repo = ConsultationRepository(db)
+    scheduling_repo = SchedulingRepository(db)
+    consultation_id = uuid4()
+    
+    try:
+        async with UnitOfWork(db):
+            # Serialize with other group bookings sharing anyone, then
+            # re-check against the database rather than the cache
+            await consultation_repo.lock_participants(user_ids)
+            try:
+                windows = await free_busy.common_free_windows(
+                    db, user_ids, start_time, end_time, appointment_data.duration_minutes, limit=1, use_cache=False
+                )
+            except LookupError as e:
+                raise HTTPException(
+                    status_code=status.HTTP_404_NOT_FOUND,
+                    detail=f"Unknown or inactive users: {e}"
+                )
+            if not windows:
+                raise HTTPException(
+                    status_code=status.HTTP_409_CONFLICT,
+                    detail="Not every participant is free for the requested time"
+                )
+            
+            consultation_dict = {
+                "id": consultation_id,
+                "case_id": case.id,
+                "volunteer_id": volunteer_id,
+                "requesting_doctor_id": doctor_id,
+                "scheduled_start": start_time,
+                "scheduled_end": end_time,
+                "status": "scheduled"
+            }
+            if patient_uuid:
+                consultation_dict["patient_id"] = patient_uuid
+            consultation = await consultation_repo.create(consultation_dict)
+            await consultation_repo.add_participants(consultation.id, participants)
+            
+            # Single-slot bookings race on the slot rows, not the advisory locks
+            if not await scheduling_repo.claim_slots_in_range(volunteer_id, start_time, end_time, consultation.id):
+                raise HTTPException(
+                    status_code=status.HTTP_409_CONFLICT,
+                    detail="The volunteer was booked for this time concurrently"
+                )
+            
+            await case_repo.update(case, {
+                "status": "assigned",
+                "assigned_volunteer_id": volunteer_id
+            })
+    except IntegrityError as e:
+        raise _group_booking_conflict(e)
+    
+    availability_index.reserve(volunteer_id, start_time, end_time)
+    free_busy.invalidate(user_ids, start_time, end_time)
+    
+    return {
+        "consultation_id": str(consultation.id),
+        "participants": [{"user_id": str(uid), "role": role} for uid, role in participants],
+        "scheduled_start": start_time.isoformat(),
+        "scheduled_end": end_time.isoformat(),
+        "message": "Appointment booked successfully"
+    }
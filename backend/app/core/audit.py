@@ -0,0 +1,203 @@
+"""
+Audit Logging
+Records PHI access into audit_logs through an in-memory buffer flushed in batches
+"""
+
+from datetime import datetime, timezone
+from typing import Dict, List, Optional
+from uuid import UUID, uuid4
+from sqlalchemy import insert, text
+from app.core.config import settings
+from app.core.database import engine
+from app.core.security import get_token_subject
+from app.core.tasks import PeriodicTask
+from app.models.audit_log import AuditLog
+import hashlib
+import logging
+
+logger = logging.getLogger(__name__)
+
+# Path prefix -> audited resource type
+PHI_RESOURCES = {
+    "/api/v1/cases": "case",
+    "/api/v1/consultations": "consultation",
+    "/api/v1/files": "file",
+    "/api/v1/scheduling/appointments": "appointment",
+    "/api/v1/scheduling/group-appointments": "appointment",
+}
+
+# PostgreSQL caps bind parameters per statement at 32767
+MAX_INSERT_ROWS = 32767 // len(AuditLog.__table__.columns)
+
+METHOD_ACTIONS = {
+    "GET": "view",
+    "HEAD": "view",
+    "POST": "create",
+    "PUT": "update",
+    "PATCH": "update",
+    "DELETE": "delete",
+}
+
+
+class AuditLogBuffer:
+    """
+    Collects audit records in memory and writes them with multi-row INSERTs
+
+    Requests only append to a list; a background task flushes every
+    AUDIT_LOG_FLUSH_INTERVAL_SECONDS, or sooner once AUDIT_LOG_BATCH_SIZE
+    records are waiting. Failed batches are kept for the next flush, up to
+    AUDIT_LOG_MAX_BUFFER records.
+    """
+
+    def __init__(self):
+        self._records: List[Dict] = []
+        self._dropped = 0
+        self._flush_task = PeriodicTask(
+            "audit-log-flush",
+            self.flush,
+            settings.AUDIT_LOG_FLUSH_INTERVAL_SECONDS
+        )
+        self._partition_task = PeriodicTask(
+            "audit-log-partitions",
+            self.ensure_partitions,
+            24 * 3600,
+            run_immediately=True
+        )
+
+    def record(self, entry: Dict) -> None:
+        """Queue one audit record"""
+        if len(self._records) >= settings.AUDIT_LOG_MAX_BUFFER:
+            self._dropped += 1
+            if self._dropped % 1000 == 1:
+                logger.error(f"Audit log buffer full, {self._dropped} records dropped")
+            return
+
+        self._records.append(entry)
+        if len(self._records) >= settings.AUDIT_LOG_BATCH_SIZE:
+            self._flush_task.wake()
+
+    async def flush(self) -> None:
+        """Write all buffered records"""
+        batch_size = min(settings.AUDIT_LOG_BATCH_SIZE, MAX_INSERT_ROWS)
+        while self._records:
+            batch = self._records[:batch_size]
+            del self._records[:len(batch)]
+            try:
+                async with engine.begin() as conn:
+                    # One INSERT ... VALUES (...), (...) statement per batch
+                    await conn.execute(insert(AuditLog.__table__).values(batch))
+            except Exception as e:
+                logger.error(f"Failed to write {len(batch)} audit records: {e}")
+                # Keep them for the next attempt
+                self._records[:0] = batch[:max(0, settings.AUDIT_LOG_MAX_BUFFER - len(self._records))]
+                return
+
+    async def ensure_partitions(self) -> None:
+        """Create this month's and upcoming monthly partitions"""
+        async with engine.begin() as conn:
+            await conn.execute(
+                text("SELECT ensure_audit_log_partitions(:months_ahead)"),
+                {"months_ahead": settings.AUDIT_LOG_PARTITION_MONTHS_AHEAD}
+            )
+
+    def start(self) -> None:
+        """Start background flushing and partition maintenance"""
+        self._flush_task.start()
+        self._partition_task.start()
+
+    async def stop(self) -> None:
+        """Stop background work and write whatever is left"""
+        await self._partition_task.stop()
+        await self._flush_task.stop()
+        await self.flush()
+
+
+audit_log_buffer = AuditLogBuffer()
+
+
+def _audited_resource(path: str) -> Optional[str]:
+    for prefix, resource_type in PHI_RESOURCES.items():
+        if path == prefix or path.startswith(prefix + "/"):
+            return resource_type
+    return None
+
+
+def _resource_ids(path: str) -> List[str]:
+    """UUID segments of the request path, in order"""
+    ids = []
+    for segment in path.split("/"):
+        try:
+            ids.append(str(UUID(segment)))
+        except ValueError:
+            continue
+    return ids
+
+
+class AuditMiddleware:
+    """
+    ASGI middleware that audits every request touching PHI routes
+
+    The request body is hashed incrementally as the handler reads it, so
+    streamed uploads are never buffered here.
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or not settings.AUDIT_LOG_ENABLED:
+            await self.app(scope, receive, send)
+            return
+
+        path = scope["path"]
+        resource_type = _audited_resource(path)
+        if resource_type is None or scope["method"] == "OPTIONS":
+            await self.app(scope, receive, send)
+            return
+
+        body_hash = hashlib.sha256()
+        body_seen = False
+        status_code = None
+
+        async def audited_receive():
+            nonlocal body_seen
+            message = await receive()
+            if message["type"] == "http.request" and message.get("body"):
+                body_hash.update(message["body"])
+                body_seen = True
+            return message
+
+        async def audited_send(message):
+            nonlocal status_code
+            if message["type"] == "http.response.start":
+                status_code = message["status"]
+            await send(message)
+
+        try:
+            await self.app(scope, audited_receive, audited_send)
+        finally:
+            headers = {key.decode("latin-1").lower(): value.decode("latin-1") for key, value in scope.get("headers", [])}
+            user_id = get_token_subject(headers.get("authorization"))
+            resource_ids = _resource_ids(path)
+            client = scope.get("client")
+
+            try:
+                user_uuid = UUID(user_id) if user_id else None
+            except ValueError:
+                user_uuid = None
+
+            audit_log_buffer.record({
+                "id": uuid4(),
+                "created_at": datetime.now(timezone.utc),
+                "user_id": user_uuid,
+                "action": METHOD_ACTIONS.get(scope["method"], scope["method"].lower()),
+                "resource_type": resource_type,
+                "resource_id": UUID(resource_ids[0]) if resource_ids else None,
+                "ip_address": client[0] if client else None,
+                "user_agent": headers.get("user-agent"),
+                "request_method": scope["method"],
+                "request_path": path,
+                "request_body_hash": body_hash.hexdigest() if body_seen else None,
+                "response_status": status_code,
+                "details": {"resource_ids": resource_ids} if len(resource_ids) > 1 else None,
+            })
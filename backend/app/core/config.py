@@ -22,6 +22,8 @@ class Settings(BaseSettings):
     ALGORITHM: str = "HS256"
     ACCESS_TOKEN_EXPIRE_MINUTES: int = 60 * 24  # 24 hours
     REFRESH_TOKEN_EXPIRE_DAYS: int = 30
+    PASSWORD_HASH_WORKERS: int = 4  # Threads reserved for bcrypt work
+    PASSWORD_HASH_MAX_PENDING: int = 32  # Queued + running bcrypt calls before returning 503
     
     # CORS
     ALLOWED_ORIGINS: str = "http://localhost:3000,http://localhost:8080"
@@ -37,16 +39,48 @@ class Settings(BaseSettings):
     DB_POOL_SIZE: int = 10
     DB_MAX_OVERFLOW: int = 20
     
+    DATABASE_REPLICA_URLS: str = ""  # Comma-separated read replicas (optional)
+    READ_YOUR_WRITES_SECONDS: int = 10  # Pin a user's reads to the primary after they write
+    READ_YOUR_WRITES_USE_REDIS: bool = False  # Share recent-write markers across workers via REDIS_URL
+    
+    @staticmethod
+    def _asyncpg_url(url: str) -> str:
+        """Rewrite a PostgreSQL URL for the asyncpg driver"""
+        for prefix in ("postgresql+psycopg2://", "postgresql://", "postgres://"):
+            if url.startswith(prefix):
+                return "postgresql+asyncpg://" + url[len(prefix):]
+        return url
+    
+    @property
+    def async_database_url(self) -> str:
+        """DATABASE_URL rewritten for the asyncpg driver"""
+        return self._asyncpg_url(self.DATABASE_URL)
+    
+    @property
+    def async_replica_urls(self) -> List[str]:
+        """Parse DATABASE_REPLICA_URLS into asyncpg URLs"""
+        return [self._asyncpg_url(url.strip()) for url in self.DATABASE_REPLICA_URLS.split(",") if url.strip()]
+    
     # Redis
     REDIS_URL: str = "redis://localhost:6379/0"
     REDIS_SESSION_TTL: int = 86400  # 24 hours in seconds
     
+    # Principal cache (resolved users for get_current_user)
+    PRINCIPAL_CACHE_TTL_SECONDS: int = 30
+    PRINCIPAL_CACHE_MAX_SIZE: int = 10000
+    PRINCIPAL_CACHE_USE_REDIS: bool = False  # Share cached principals across workers via REDIS_URL
+    
     # AWS
     AWS_ACCESS_KEY_ID: str = ""
     AWS_SECRET_ACCESS_KEY: str = ""
     AWS_REGION: str = "us-east-1"
     S3_BUCKET_NAME: str = "globalhealth-connect-files"
     S3_USE_TRANSFER_ACCELERATION: bool = True
+    S3_ENDPOINT_URL: str = ""  # S3-compatible stand-in (e.g. http://localhost:9000 for MinIO); uses path-style addressing
+    S3_SERVER_SIDE_ENCRYPTION: str = "AES256"  # Empty to disable (stand-ins without KMS reject SSE headers)
+    S3_PRESIGNED_URL_EXPIRATION: int = 3600  # Lifetime of presigned part URLs for direct uploads
+    S3_DIRECT_UPLOAD_PART_SIZE: int = 8 * 1024 * 1024  # Part size clients must use for direct uploads (>= 5 MiB)
+    S3_DIRECT_UPLOAD_MAX_URLS: int = 100  # Presigned part URLs per request
     
     # Agora.io
     AGORA_APP_ID: str = ""
@@ -64,7 +98,12 @@ class Settings(BaseSettings):
     
     # TUS Protocol
     TUS_MAX_FILE_SIZE: int = 100 * 1024 * 1024  # 100MB
-    TUS_UPLOAD_EXPIRATION: int = 86400  # 24 hours
+    TUS_UPLOAD_EXPIRATION: int = 86400  # 24 hours of inactivity before an upload expires
+    TUS_EXPIRY_CHECK_SECONDS: int = 900  # How often expired uploads are cleaned up
+    TUS_EXPIRY_BATCH_SIZE: int = 100
+    TUS_MAX_CONCAT_PARTS: int = 32  # Partial uploads one final upload may merge
+    TUS_S3_PART_SIZE: int = 8 * 1024 * 1024  # Bytes buffered per S3 part; S3 requires >= 5 MiB for all but the last
+    TUS_PROGRESS_MILESTONE_PERCENT: int = 10  # files.upload_progress is written each time progress crosses a multiple
     
     # Notifications - Firebase Cloud Messaging
     FIREBASE_PROJECT_ID: str = ""
@@ -85,8 +124,32 @@ class Settings(BaseSettings):
     # Timezone
     DEFAULT_TIMEZONE: str = "UTC"
     
+    # Scheduling
+    SLOT_MATERIALIZATION_HORIZON_DAYS: int = 28  # Recurring blocks get slots this far ahead
+    SLOT_MATERIALIZATION_INTERVAL_SECONDS: int = 3600
+    SLOT_MATERIALIZATION_BATCH_SIZE: int = 100  # Blocks per transaction
+    SLOT_RETENTION_DAYS: int = 1  # Unbooked slots are deleted this long after they end
+    AVAILABILITY_INDEX_REFRESH_SECONDS: int = 60  # Full rebuild of the in-memory free-time index
+    VOLUNTEER_CAPABILITY_TTL_SECONDS: int = 300  # Cached specialization/language map for matching
+    FREE_BUSY_GRANULARITY_MINUTES: int = 10  # One bit per this many minutes of a UTC day
+    FREE_BUSY_CACHE_SECONDS: int = 30
+    FREE_BUSY_CACHE_MAX_SIZE: int = 50000  # (user, day) bitsets
+    FREE_BUSY_MAX_DAYS: int = 31  # Longest range a common-free search may span
+    
+    # Case queue
+    CASE_PRIORITY_REFRESH_SECONDS: int = 300  # Rescore waiting cases so they escalate with age
+    
     # Logging
     LOG_LEVEL: str = "INFO"
+    SLOW_QUERY_THRESHOLD_MS: int = 200  # Log statements slower than this
+    N_PLUS_ONE_THRESHOLD: int = 5  # Warn when one statement shape runs this often in a request
+    
+    # Audit Logging
+    AUDIT_LOG_ENABLED: bool = True
+    AUDIT_LOG_FLUSH_INTERVAL_SECONDS: float = 2.0
+    AUDIT_LOG_BATCH_SIZE: int = 500  # Rows per multi-row INSERT
+    AUDIT_LOG_MAX_BUFFER: int = 50000  # Records held in memory before new ones are dropped
+    AUDIT_LOG_PARTITION_MONTHS_AHEAD: int = 2
     
     class Config:
         env_file = ".env"
@@ -0,0 +1,119 @@
+"""
+Database Routing
+Sends read-only handlers to replicas with read-your-writes pinning
+"""
+
+from fastapi import Request
+from typing import Dict, Optional
+from app.core.cache import get_redis
+from app.core.config import settings
+from app.core.database import SessionLocal, ReplicaSessionLocals
+from app.core.security import get_token_subject
+import itertools
+import logging
+import time
+
+logger = logging.getLogger(__name__)
+
+READ_ONLY_METHODS = {"GET", "HEAD", "OPTIONS"}
+
+
+class RecentWriteTracker:
+    """
+    Remembers which users wrote recently so their next reads go to the primary
+
+    Markers live in the worker and, when READ_YOUR_WRITES_USE_REDIS is set,
+    in Redis so a write handled by one worker pins reads on every worker.
+    """
+
+    def __init__(self, window_seconds: int):
+        self.window_seconds = window_seconds
+        self._expiry_by_user: Dict[str, float] = {}
+
+    @staticmethod
+    def _redis_key(user_id: str) -> str:
+        return f"recent_write:{user_id}"
+
+    async def mark(self, user_id: str) -> None:
+        """Record that a user just wrote"""
+        now = time.monotonic()
+        self._expiry_by_user[user_id] = now + self.window_seconds
+
+        # Drop stale markers so the map stays bounded by active writers
+        if len(self._expiry_by_user) > 10000:
+            self._expiry_by_user = {
+                uid: expiry for uid, expiry in self._expiry_by_user.items() if expiry > now
+            }
+
+        if not settings.READ_YOUR_WRITES_USE_REDIS:
+            return
+
+        redis = get_redis()
+        if redis is None:
+            return
+
+        try:
+            await redis.set(self._redis_key(user_id), "1", ex=self.window_seconds)
+        except Exception as e:
+            logger.warning(f"Recent-write marker Redis write failed: {e}")
+
+    async def wrote_recently(self, user_id: str) -> bool:
+        """Check whether a user's reads should stay on the primary"""
+        expiry = self._expiry_by_user.get(user_id)
+        if expiry is not None and expiry > time.monotonic():
+            return True
+
+        if not settings.READ_YOUR_WRITES_USE_REDIS:
+            return False
+
+        redis = get_redis()
+        if redis is None:
+            return False
+
+        try:
+            return bool(await redis.exists(self._redis_key(user_id)))
+        except Exception as e:
+            # Fail safe: if we cannot tell, read from the primary
+            logger.warning(f"Recent-write marker Redis lookup failed: {e}")
+            return True
+
+
+recent_writes = RecentWriteTracker(settings.READ_YOUR_WRITES_SECONDS)
+_replica_cycle = itertools.cycle(ReplicaSessionLocals) if ReplicaSessionLocals else None
+
+
+def _user_id_from_request(request: Request) -> Optional[str]:
+    """Read the user id from the bearer token without touching the database"""
+    return get_token_subject(request.headers.get("Authorization"))
+
+
+async def record_recent_writes(request: Request, call_next):
+    """Middleware: mark users whose write requests succeeded"""
+    response = await call_next(request)
+
+    if (
+        _replica_cycle is not None
+        and request.method not in READ_ONLY_METHODS
+        and response.status_code < 400
+    ):
+        user_id = _user_id_from_request(request)
+        if user_id:
+            await recent_writes.mark(user_id)
+
+    return response
+
+
+async def get_read_db(request: Request):
+    """
+    Dependency for read-only handlers
+    Yields a replica session, or a primary session when no replicas are
+    configured or the caller wrote within READ_YOUR_WRITES_SECONDS
+    """
+    session_factory = SessionLocal
+    if _replica_cycle is not None:
+        user_id = _user_id_from_request(request)
+        if user_id is None or not await recent_writes.wrote_recently(user_id):
+            session_factory = next(_replica_cycle)
+
+    async with session_factory() as db:
+        yield db
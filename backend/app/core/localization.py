@@ -0,0 +1,46 @@
+"""
+Time Localization
+Renders UTC timestamps in a viewer's timezone
+"""
+
+from datetime import datetime, timezone
+from functools import lru_cache
+from typing import Iterable, List, Optional, Sequence
+from zoneinfo import ZoneInfo, ZoneInfoNotFoundError
+import logging
+
+logger = logging.getLogger(__name__)
+
+
+@lru_cache(maxsize=512)
+def get_zone(name: Optional[str]) -> ZoneInfo:
+    """ZoneInfo for a name, falling back to UTC for unknown zones"""
+    try:
+        return ZoneInfo(name or "UTC")
+    except (ZoneInfoNotFoundError, ValueError):
+        logger.warning(f"Unknown timezone '{name}', using UTC")
+        return ZoneInfo("UTC")
+
+
+def localize(value: Optional[datetime], zone_name: Optional[str]) -> Optional[datetime]:
+    """One timestamp as an aware datetime in the named zone (ZoneInfo caches its transitions)"""
+    if value is None:
+        return None
+    if value.tzinfo is None:
+        value = value.replace(tzinfo=timezone.utc)
+    return value.astimezone(get_zone(zone_name))
+
+
+def localize_many(values: Iterable[Optional[datetime]], zone_name: Optional[str]) -> List[Optional[datetime]]:
+    """Localize a batch of timestamps into one zone"""
+    return [localize(value, zone_name) for value in values]
+
+
+def localize_models(items: Sequence, fields: Sequence[str], zone_name: Optional[str]) -> None:
+    """Rewrite the given datetime fields of a page of response models in place"""
+    if not items:
+        return
+    for field in fields:
+        localized = localize_many((getattr(item, field) for item in items), zone_name)
+        for item, value in zip(items, localized):
+            setattr(item, field, value)
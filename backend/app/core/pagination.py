@@ -0,0 +1,96 @@
+"""
+Pagination Utilities
+Opaque keyset cursors for list endpoints
+"""
+
+from sqlalchemy import and_, literal, or_, tuple_
+from typing import Any, List, Optional, Sequence, Tuple, Union
+from datetime import datetime
+from uuid import UUID
+import base64
+import json
+
+
+class InvalidCursorError(ValueError):
+    """Raised when a client sends a cursor we did not issue"""
+    pass
+
+
+def encode_cursor(*values: Any) -> str:
+    """Encode sort key values (datetime, int, UUID) into an opaque cursor"""
+    parts = [v.isoformat() if isinstance(v, datetime) else v if isinstance(v, int) else str(v) for v in values]
+    raw = json.dumps(parts, separators=(",", ":")).encode("utf-8")
+    return base64.urlsafe_b64encode(raw).decode("ascii").rstrip("=")
+
+
+def decode_cursor(cursor: str, *types: type) -> Tuple[Any, ...]:
+    """Decode a cursor back into sort key values of the given types"""
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        parts = json.loads(base64.urlsafe_b64decode(padded.encode("ascii")))
+        if not isinstance(parts, list) or len(parts) != len(types):
+            raise ValueError("Cursor shape mismatch")
+        values = []
+        for part, kind in zip(parts, types):
+            if kind is datetime:
+                values.append(datetime.fromisoformat(part))
+            elif kind is UUID:
+                values.append(UUID(part))
+            else:
+                values.append(kind(part))
+        return tuple(values)
+    except Exception:
+        raise InvalidCursorError("Invalid pagination cursor")
+
+
+def apply_keyset(
+    stmt,
+    columns: Sequence,
+    after: Optional[str],
+    descending: Union[bool, Sequence[bool]] = False
+):
+    """
+    Order a select by the given columns (last one must be unique, e.g. id)
+    and, when a cursor is given, start right after it
+    `descending` may be a per-column list for mixed sort orders
+    """
+    if isinstance(descending, bool):
+        directions = [descending] * len(columns)
+    else:
+        directions = list(descending)
+    
+    if after:
+        values = decode_cursor(after, *[col.type.python_type for col in columns])
+        bounds = [literal(value, col.type) for value, col in zip(values, columns)]
+        if all(directions) or not any(directions):
+            # Uniform order: a row comparison matches the index directly
+            if directions[0]:
+                stmt = stmt.where(tuple_(*columns) < tuple_(*bounds))
+            else:
+                stmt = stmt.where(tuple_(*columns) > tuple_(*bounds))
+        else:
+            # Mixed order: expand to (c0 beyond b0) OR (c0 = b0 AND c1 beyond b1) ...
+            # plus a plain range on the leading column so the index can seek
+            def beyond(col, bound, desc):
+                return col < bound if desc else col > bound
+            
+            branches = []
+            for i, (col, bound, desc) in enumerate(zip(columns, bounds, directions)):
+                equal_prefix = [columns[j] == bounds[j] for j in range(i)]
+                branches.append(and_(*equal_prefix, beyond(col, bound, desc)))
+            leading = columns[0] <= bounds[0] if directions[0] else columns[0] >= bounds[0]
+            stmt = stmt.where(leading, or_(*branches))
+    
+    return stmt.order_by(*[col.desc() if desc else col for col, desc in zip(columns, directions)])
+
+
+def split_page(rows: List[Any], page_size: int, key_attrs: Sequence[str]) -> Tuple[List[Any], Optional[str]]:
+    """
+    Trim a page_size + 1 result to page_size rows
+    Returns the rows and the cursor for the next page (None on the last page)
+    """
+    if len(rows) <= page_size:
+        return rows, None
+    rows = rows[:page_size]
+    last = rows[-1]
+    return rows, encode_cursor(*[getattr(last, attr) for attr in key_attrs])
@@ -0,0 +1,113 @@
+"""
+Query Instrumentation
+Per-request SQL statement counts, timings, slow-query log and N+1 detection
+"""
+
+from collections import Counter
+from contextvars import ContextVar
+from typing import Optional
+from fastapi import Request
+from sqlalchemy import event
+from sqlalchemy.ext.asyncio import AsyncEngine
+from app.core.config import settings
+import logging
+import time
+
+logger = logging.getLogger(__name__)
+metrics_logger = logging.getLogger("app.metrics.db")
+slow_query_logger = logging.getLogger("app.db.slow_queries")
+
+
+class RequestQueryStats:
+    """SQL activity recorded while handling one request"""
+
+    def __init__(self):
+        self.query_count = 0
+        self.duration_ms = 0.0
+        self.row_count = 0
+        # Parameterised SQL text -> executions; repeats of one shape hint at N+1
+        self.shapes: Counter = Counter()
+
+    def record(self, statement: str, duration_ms: float, row_count: int) -> None:
+        self.query_count += 1
+        self.duration_ms += duration_ms
+        if row_count > 0:
+            self.row_count += row_count
+        self.shapes[statement] += 1
+
+    def repeated_shapes(self, threshold: int) -> list:
+        """Statement shapes executed at least `threshold` times"""
+        return [(statement, count) for statement, count in self.shapes.most_common() if count >= threshold]
+
+
+_current_stats: ContextVar[Optional[RequestQueryStats]] = ContextVar("request_query_stats", default=None)
+
+
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    conn.info.setdefault("query_start_time", []).append(time.perf_counter())
+
+
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    duration_ms = (time.perf_counter() - conn.info["query_start_time"].pop()) * 1000.0
+
+    stats = _current_stats.get()
+    if stats is not None:
+        stats.record(statement, duration_ms, getattr(cursor, "rowcount", -1))
+
+    if duration_ms >= settings.SLOW_QUERY_THRESHOLD_MS:
+        slow_query_logger.warning(
+            f"Slow query ({duration_ms:.1f} ms): {statement}",
+            extra={"duration_ms": round(duration_ms, 1), "statement": statement}
+        )
+
+
+def instrument_engine(engine: AsyncEngine) -> None:
+    """Attach statement timing hooks to an async engine"""
+    sync_engine = engine.sync_engine
+    if event.contains(sync_engine, "before_cursor_execute", _before_cursor_execute):
+        return
+    event.listen(sync_engine, "before_cursor_execute", _before_cursor_execute)
+    event.listen(sync_engine, "after_cursor_execute", _after_cursor_execute)
+
+
+async def collect_query_stats(request: Request, call_next):
+    """
+    Middleware: count statements, DB time and rows per request
+    Adds X-DB-* headers in debug mode and logs per-route metrics
+    """
+    stats = RequestQueryStats()
+    token = _current_stats.set(stats)
+    try:
+        response = await call_next(request)
+    finally:
+        _current_stats.reset(token)
+
+    route = request.scope.get("route")
+    route_path = getattr(route, "path", request.url.path)
+
+    if settings.DEBUG:
+        response.headers["X-DB-Query-Count"] = str(stats.query_count)
+        response.headers["X-DB-Time-Ms"] = f"{stats.duration_ms:.1f}"
+        response.headers["X-DB-Rows"] = str(stats.row_count)
+
+    if stats.query_count:
+        metrics_logger.info(
+            f"{request.method} {route_path}: {stats.query_count} queries, "
+            f"{stats.duration_ms:.1f} ms, {stats.row_count} rows",
+            extra={
+                "method": request.method,
+                "route": route_path,
+                "status_code": response.status_code,
+                "db_query_count": stats.query_count,
+                "db_time_ms": round(stats.duration_ms, 1),
+                "db_rows": stats.row_count,
+            }
+        )
+
+    for statement, count in stats.repeated_shapes(settings.N_PLUS_ONE_THRESHOLD):
+        logger.warning(
+            f"Possible N+1 on {request.method} {route_path}: statement ran {count} times: {statement}",
+            extra={"route": route_path, "repeat_count": count, "statement": statement}
+        )
+
+    return response
@@ -6,8 +6,21 @@ JWT tokens, password hashing, etc.
 from datetime import datetime, timedelta
 from typing import Optional
 from jose import JWTError, jwt
+import asyncio
 import bcrypt
 from app.core.config import settings
+from app.core.services import services
+
+
+class PasswordHashingBusyError(Exception):
+    """Raised when too much password hashing work is already queued"""
+    pass
+
+
+# bcrypt releases the GIL, so a small dedicated pool (the "password_executor"
+# service) keeps it off the event loop without letting a login burst take
+# over the default executor
+_password_pending = 0
 
 
 def verify_password(plain_password: str, hashed_password: str) -> bool:
@@ -28,6 +41,33 @@ def get_password_hash(password: str) -> str:
     return hashed.decode('utf-8')
 
 
+async def _run_password_work(func, *args):
+    """
+    Run bcrypt work on the password pool
+    Raises PasswordHashingBusyError instead of queueing past PASSWORD_HASH_MAX_PENDING
+    """
+    global _password_pending
+    if _password_pending >= settings.PASSWORD_HASH_MAX_PENDING:
+        raise PasswordHashingBusyError()
+    
+    _password_pending += 1
+    try:
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(services.get("password_executor"), func, *args)
+    finally:
+        _password_pending -= 1
+
+
+async def verify_password_async(plain_password: str, hashed_password: str) -> bool:
+    """Verify a password against a hash without blocking the event loop"""
+    return await _run_password_work(verify_password, plain_password, hashed_password)
+
+
+async def get_password_hash_async(password: str) -> str:
+    """Hash a password without blocking the event loop"""
+    return await _run_password_work(get_password_hash, password)
+
+
 def create_access_token(data: dict, expires_delta: Optional[timedelta] = None) -> str:
     """Create JWT access token"""
     to_encode = data.copy()
@@ -62,3 +102,14 @@ def decode_token(token: str) -> Optional[dict]:
     except JWTError:
         return None
 
+
+
+def get_token_subject(authorization: Optional[str]) -> Optional[str]:
+    """Get the user id from an 'Authorization: Bearer <jwt>' header value (no DB lookup)"""
+    scheme, _, token = (authorization or "").partition(" ")
+    if scheme.lower() != "bearer" or not token:
+        return None
+    payload = decode_token(token)
+    if payload is None:
+        return None
+    return payload.get("sub")
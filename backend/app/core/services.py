@@ -0,0 +1,121 @@
+"""
+Service Registry
+Lazily created shared services, torn down by the application lifespan
+"""
+
+from typing import Any, Callable, Dict, Optional
+import inspect
+import logging
+
+logger = logging.getLogger(__name__)
+
+
+class ServiceRegistry:
+    """
+    Creates each service on first use instead of at import time
+
+    Factories import their service module themselves, so heavy dependencies
+    (boto3, cv2, firebase_admin) load only when a request first needs them.
+    A factory may return None for a service that is unavailable (e.g. the
+    redis package is missing); that result is remembered too.
+    """
+
+    def __init__(self):
+        self._factories: Dict[str, Callable[[], Any]] = {}
+        self._closers: Dict[str, Optional[Callable[[Any], Any]]] = {}
+        self._instances: Dict[str, Any] = {}
+
+    def register(
+        self,
+        name: str,
+        factory: Callable[[], Any],
+        close: Optional[Callable[[Any], Any]] = None
+    ) -> None:
+        """Register a factory (and optional close hook) for a service"""
+        self._factories[name] = factory
+        self._closers[name] = close
+
+    def get(self, name: str) -> Any:
+        """Get a service, creating it on first use"""
+        if name not in self._instances:
+            self._instances[name] = self._factories[name]()
+        return self._instances[name]
+
+    async def shutdown(self) -> None:
+        """Close every service that was created, newest first"""
+        for name, instance in reversed(list(self._instances.items())):
+            close = self._closers.get(name)
+            if close is None or instance is None:
+                continue
+            try:
+                result = close(instance)
+                if inspect.isawaitable(result):
+                    await result
+            except Exception as e:
+                logger.error(f"Error closing service '{name}': {e}")
+        self._instances.clear()
+
+
+services = ServiceRegistry()
+
+
+def _create_redis_client():
+    from app.core.config import settings
+    try:
+        import redis.asyncio as redis
+    except ImportError:
+        logger.warning("redis package not installed. Redis cache tier disabled.")
+        return None
+    return redis.from_url(settings.REDIS_URL, decode_responses=True)
+
+
+def _close_redis_client(client):
+    # redis-py 5 renamed close() to aclose()
+    close = getattr(client, "aclose", None) or client.close
+    return close()
+
+
+def _create_password_executor():
+    from concurrent.futures import ThreadPoolExecutor
+    from app.core.config import settings
+    return ThreadPoolExecutor(
+        max_workers=settings.PASSWORD_HASH_WORKERS,
+        thread_name_prefix="password-hash"
+    )
+
+
+def _create_s3_service():
+    from app.services.s3_service import S3Service
+    return S3Service()
+
+
+def _create_quality_service():
+    from app.services.image_quality_service import ImageQualityService
+    return ImageQualityService()
+
+
+def _create_agora_service():
+    from app.services.agora_service import AgoraService
+    return AgoraService()
+
+
+services.register("redis", _create_redis_client, close=_close_redis_client)
+services.register("password_executor", _create_password_executor, close=lambda executor: executor.shutdown(wait=False))
+services.register("s3", _create_s3_service, close=lambda s3: s3.close())
+services.register("image_quality", _create_quality_service)
+services.register("agora", _create_agora_service)
+
+
+def get_s3_service():
+    """Dependency for the shared S3 service"""
+    return services.get("s3")
+
+
+def get_quality_service():
+    """Dependency for the shared image quality service"""
+    return services.get("image_quality")
+
+
+def get_agora_service():
+    """Dependency for the shared Agora service"""
+    return services.get("agora")
@@ -0,0 +1,79 @@
+"""
+Background Tasks
+Periodic in-process jobs started and stopped by the application lifespan
+"""
+
+from typing import Awaitable, Callable, Optional
+import asyncio
+import logging
+
+logger = logging.getLogger(__name__)
+
+
+class PeriodicTask:
+    """
+    Runs a coroutine function every `interval_seconds` on the event loop
+
+    Errors are logged and the loop keeps going. `wake()` runs the job early
+    (e.g. when a buffer fills up) without waiting for the interval.
+    """
+
+    def __init__(
+        self,
+        name: str,
+        func: Callable[[], Awaitable[None]],
+        interval_seconds: float,
+        run_immediately: bool = False
+    ):
+        self.name = name
+        self.func = func
+        self.interval_seconds = interval_seconds
+        self.run_immediately = run_immediately
+        self._task: Optional[asyncio.Task] = None
+        self._wake_event: Optional[asyncio.Event] = None
+
+    @property
+    def running(self) -> bool:
+        return self._task is not None and not self._task.done()
+
+    def start(self) -> None:
+        """Start the loop on the running event loop"""
+        if self.running:
+            return
+        self._wake_event = asyncio.Event()
+        self._task = asyncio.create_task(self._run(), name=self.name)
+
+    def wake(self) -> None:
+        """Run the job as soon as possible"""
+        if self._wake_event is not None:
+            self._wake_event.set()
+
+    async def stop(self) -> None:
+        """Cancel the loop and wait for it to finish"""
+        if self._task is None:
+            return
+        self._task.cancel()
+        try:
+            await self._task
+        except asyncio.CancelledError:
+            pass
+        self._task = None
+
+    async def _run(self) -> None:
+        if not self.run_immediately:
+            await self._sleep()
+        while True:
+            try:
+                await self.func()
+            except asyncio.CancelledError:
+                raise
+            except Exception:
+                logger.exception(f"Background task '{self.name}' failed")
+            await self._sleep()
+
+    async def _sleep(self) -> None:
+        try:
+            await asyncio.wait_for(self._wake_event.wait(), timeout=self.interval_seconds)
+        except asyncio.TimeoutError:
+            pass
+        self._wake_event.clear()
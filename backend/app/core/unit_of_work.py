@@ -0,0 +1,59 @@
+"""
+Unit of Work
+Groups several repository writes into one database transaction
+"""
+
+from sqlalchemy.ext.asyncio import AsyncSession
+
+_UNIT_OF_WORK_DEPTH = "unit_of_work_depth"
+
+
+class UnitOfWork:
+    """
+    Async context manager for multi-step writes
+
+    While active, repositories flush instead of committing, so every write in the
+    block lands in one transaction. The transaction commits once when the
+    outermost block exits, or rolls back if it raises.
+
+    Usage:
+        async with UnitOfWork(db):
+            consultation = await consultation_repo.create(...)
+            await case_repo.update(case, {...})
+    """
+
+    def __init__(self, db: AsyncSession):
+        self.db = db
+
+    async def __aenter__(self) -> "UnitOfWork":
+        self.db.info[_UNIT_OF_WORK_DEPTH] = self.db.info.get(_UNIT_OF_WORK_DEPTH, 0) + 1
+        return self
+
+    async def __aexit__(self, exc_type, exc, tb) -> bool:
+        depth = self.db.info.get(_UNIT_OF_WORK_DEPTH, 1) - 1
+        if depth > 0:
+            self.db.info[_UNIT_OF_WORK_DEPTH] = depth
+            return False
+
+        self.db.info.pop(_UNIT_OF_WORK_DEPTH, None)
+        if exc_type is None:
+            await self.db.commit()
+        else:
+            await self.db.rollback()
+        return False
+
+
+def in_unit_of_work(db: AsyncSession) -> bool:
+    """Check whether the session is inside a UnitOfWork block"""
+    return db.info.get(_UNIT_OF_WORK_DEPTH, 0) > 0
+
+
+async def commit_or_flush(db: AsyncSession) -> None:
+    """
+    Commit the session, or only flush it when inside a UnitOfWork
+    Repositories call this instead of db.commit()
+    """
+    if in_unit_of_work(db):
+        await db.flush()
+    else:
+        await db.commit()
@@ -3,18 +3,71 @@ GlobalHealth Connect - FastAPI Backend
 Main application entry point
 """
 
+from contextlib import asynccontextmanager
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
 from fastapi.middleware.trustedhost import TrustedHostMiddleware
 from app.core.config import settings
+from app.core.audit import AuditMiddleware, audit_log_buffer
+from app.core.database import engine, replica_engines
+from app.core.db_routing import record_recent_writes
+from app.core.query_stats import collect_query_stats, instrument_engine
+from app.core.services import services
+from app.services.slot_materializer import slot_materializer
+from app.services.availability_index import availability_index
+from app.services.case_priority import case_priority_scorer
+from app.services.tus_upload import upload_expiry_reaper
 from app.api.v1 import auth, cases, consultations, files, scheduling, notifications
 
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    """
+    Application lifespan
+    Services are created lazily on first use (see app.core.services);
+    shutdown closes whatever was created plus the shared pools
+    """
+    # Background audit log flushing and partition maintenance
+    audit_log_buffer.start()
+    
+    # Rolling slot horizon for recurring availability
+    slot_materializer.start()
+    
+    # Periodic rebuild of the in-memory free-time index
+    availability_index.start()
+    
+    # Age-based escalation of case priority scores
+    case_priority_scorer.start()
+    
+    # Abort and clean up resumable uploads past TUS_UPLOAD_EXPIRATION
+    upload_expiry_reaper.start()
+    
+    yield
+    
+    await upload_expiry_reaper.stop()
+    await case_priority_scorer.stop()
+    await availability_index.stop()
+    await slot_materializer.stop()
+    
+    # Write buffered audit records before the pool closes
+    await audit_log_buffer.stop()
+    
+    # Closes the S3 client, the Redis client and the bcrypt worker threads
+    await services.shutdown()
+    
+    # Close pooled database connections
+    await engine.dispose()
+    for replica_engine in replica_engines:
+        await replica_engine.dispose()
+
+
 app = FastAPI(
     title="GlobalHealth Connect API",
     description="Humanitarian Telehealth Platform API",
     version="1.0.0",
     docs_url="/api/docs" if settings.DEBUG else None,
     redoc_url="/api/redoc" if settings.DEBUG else None,
+    lifespan=lifespan,
 )
 
 # CORS Middleware
@@ -33,6 +86,17 @@ if not settings.DEBUG:
         allowed_hosts=settings.ALLOWED_HOSTS,
     )
 
+# Read-your-writes pinning for replica reads
+app.middleware("http")(record_recent_writes)
+
+# PHI access audit trail
+app.add_middleware(AuditMiddleware)
+
+# Per-request SQL instrumentation
+for db_engine in [engine, *replica_engines]:
+    instrument_engine(db_engine)
+app.middleware("http")(collect_query_stats)
+
 # Include API routers
 app.include_router(auth.router, prefix="/api/v1/auth", tags=["Authentication"])
 app.include_router(cases.router, prefix="/api/v1/cases", tags=["Cases"])
@@ -0,0 +1,29 @@
+"""
+Audit Log Model
+SQLAlchemy model for audit_logs table (partitioned by month on created_at)
+"""
+
+from sqlalchemy import Column, String, Integer, Text, DateTime
+from sqlalchemy.dialects.postgresql import UUID, INET, JSONB
+from sqlalchemy.sql import func
+from app.core.database import Base
+import uuid
+
+
+class AuditLog(Base):
+    __tablename__ = "audit_logs"
+
+    # created_at is part of the key because the table is range-partitioned on it
+    id = Column(UUID(as_uuid=True), primary_key=True, default=uuid.uuid4)
+    created_at = Column(DateTime(timezone=True), primary_key=True, server_default=func.now())
+    user_id = Column(UUID(as_uuid=True), index=True)
+    action = Column(String(100), nullable=False)  # 'view', 'create', 'update', 'delete'
+    resource_type = Column(String(50), nullable=False)  # 'case', 'file', 'consultation', 'appointment'
+    resource_id = Column(UUID(as_uuid=True))
+    ip_address = Column(INET)
+    user_agent = Column(Text)
+    request_method = Column(String(10))
+    request_path = Column(Text)
+    request_body_hash = Column(String(64))  # SHA-256 of the request body, never the body itself
+    response_status = Column(Integer)
+    details = Column(JSONB)  # Additional context (non-PHI)
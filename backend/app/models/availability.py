@@ -21,6 +21,7 @@ class AvailabilityBlock(Base):
     slot_duration_minutes = Column(Integer, default=10)
     is_recurring = Column(Boolean, default=False)
     recurrence_pattern = Column(JSONB)
+    materialized_until = Column(DateTime(timezone=True))  # Recurring blocks: slots exist up to here
     status = Column(String(50), default='active', index=True)
     created_at = Column(DateTime(timezone=True), server_default=func.now())
     updated_at = Column(DateTime(timezone=True), server_default=func.now(), onupdate=func.now())
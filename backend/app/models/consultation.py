@@ -41,3 +41,15 @@ class Consultation(Base):
     cancelled_by = Column(UUID(as_uuid=True))
     cancellation_reason = Column(Text)
 
+
+
+class ConsultationParticipant(Base):
+    __tablename__ = "consultation_participants"
+    
+    id = Column(UUID(as_uuid=True), primary_key=True, default=uuid.uuid4)
+    consultation_id = Column(UUID(as_uuid=True), nullable=False, index=True)
+    user_id = Column(UUID(as_uuid=True), nullable=False, index=True)
+    role = Column(String(50), nullable=False)  # 'volunteer', 'patient', 'requesting_doctor', 'interpreter', 'observer'
+    joined_at = Column(DateTime(timezone=True))
+    left_at = Column(DateTime(timezone=True))
+    connection_quality = Column(String(20))
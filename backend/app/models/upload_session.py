@@ -0,0 +1,28 @@
+"""
+Upload Session Model
+SQLAlchemy model for upload_sessions table (in-progress TUS uploads)
+"""
+
+from sqlalchemy import Column, String, BigInteger, Boolean, DateTime
+from sqlalchemy.dialects.postgresql import UUID, JSONB
+from sqlalchemy.sql import func
+from app.core.database import Base
+
+
+class UploadSession(Base):
+    __tablename__ = "upload_sessions"
+
+    tus_upload_id = Column(String(255), primary_key=True)
+    file_id = Column(UUID(as_uuid=True), index=True)  # None for concatenation partials
+    uploaded_by = Column(UUID(as_uuid=True), nullable=False)
+    s3_key = Column(String(500), nullable=False)
+    s3_bucket = Column(String(100), nullable=False)
+    s3_upload_id = Column(String(1024))  # S3 multipart UploadId; None once completed
+    upload_length = Column(BigInteger, nullable=False)
+    upload_offset = Column(BigInteger, nullable=False, default=0)  # Exact bytes received
+    part_etags = Column(JSONB, nullable=False, default=list)  # ETag of part N at index N-1
+    is_partial = Column(Boolean, nullable=False, default=False)  # Upload-Concat: partial
+    is_direct = Column(Boolean, nullable=False, default=False)  # Client PUTs parts to presigned S3 URLs
+    created_at = Column(DateTime(timezone=True), server_default=func.now())
+    updated_at = Column(DateTime(timezone=True), server_default=func.now())
+    expires_at = Column(DateTime(timezone=True), nullable=False)
@@ -6,6 +6,7 @@ SQLAlchemy model for users table
 from sqlalchemy import Column, String, Boolean, DateTime, Date, Text
 from sqlalchemy.dialects.postgresql import UUID
 from sqlalchemy.sql import func
+from sqlalchemy.orm import relationship
 from app.core.database import Base
 import uuid
 
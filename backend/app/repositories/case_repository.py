@@ -3,26 +3,36 @@ Case Repository
 Database operations for cases
 """
 
-from sqlalchemy.orm import Session
-from sqlalchemy import select, and_, or_, desc, func
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy import select, update, and_, or_, desc, func
 from typing import Optional, List
 from uuid import UUID
+from app.core.unit_of_work import commit_or_flush
+from app.core.pagination import apply_keyset, split_page
 from app.models.case import Case
 
 
 class CaseRepository:
-    def __init__(self, db: Session):
+    def __init__(self, db: AsyncSession):
         self.db = db
     
-    def create(self, case_data: dict) -> Case:
+    @staticmethod
+    def _column_values(case_data: dict) -> dict:
+        """Map API field names onto model attributes ("metadata" is reserved by SQLAlchemy)"""
+        values = dict(case_data)
+        if "metadata" in values:
+            values["case_metadata"] = values.pop("metadata")
+        return values
+    
+    async def create(self, case_data: dict) -> Case:
         """Create a new case"""
-        case = Case(**case_data)
+        case = Case(**self._column_values(case_data))
         self.db.add(case)
-        self.db.commit()
-        self.db.refresh(case)
+        await commit_or_flush(self.db)
+        await self.db.refresh(case)
         return case
     
-    def get_by_id(self, case_id: str, doctor_id: Optional[str] = None) -> Optional[Case]:
+    async def get_by_id(self, case_id: str, doctor_id: Optional[str] = None) -> Optional[Case]:
         """Get case by ID, optionally filtered by doctor"""
         try:
             uuid_id = UUID(case_id)
@@ -38,21 +48,28 @@ class CaseRepository:
             except ValueError:
                 return None
         
-        result = self.db.execute(stmt)
+        result = await self.db.execute(stmt)
         return result.scalar_one_or_none()
     
-    def list_by_doctor(
+    async def list_by_doctor(
         self, 
         doctor_id: str, 
         status: Optional[str] = None,
         page: int = 1,
-        page_size: int = 20
-    ) -> tuple[List[Case], int]:
-        """List cases for a doctor with pagination"""
+        page_size: int = 20,
+        after: Optional[str] = None,
+        include_total: bool = True
+    ) -> tuple[List[Case], Optional[int], Optional[str]]:
+        """
+        List cases for a doctor, newest first
+        Pages by keyset cursor (created_at, id) when `after` is given;
+        `page` offsets are kept for older clients
+        Returns (cases, total, next_cursor)
+        """
         try:
             doctor_uuid = UUID(doctor_id)
         except ValueError:
-            return [], 0
+            return [], 0, None
         
         stmt = select(Case).where(Case.requesting_doctor_id == doctor_uuid)
         
@@ -60,29 +77,149 @@ class CaseRepository:
             stmt = stmt.where(Case.status == status)
         
         # Get total count
-        count_stmt = select(func.count()).select_from(stmt.subquery())
-        total = self.db.execute(count_stmt).scalar() or 0
+        total = None
+        if include_total:
+            count_stmt = select(func.count()).select_from(stmt.subquery())
+            total = (await self.db.execute(count_stmt)).scalar() or 0
         
         # Apply pagination and ordering
-        stmt = stmt.order_by(desc(Case.created_at))
-        stmt = stmt.offset((page - 1) * page_size).limit(page_size)
+        stmt = apply_keyset(stmt, [Case.created_at, Case.id], after, descending=True)
+        if not after and page > 1:
+            stmt = stmt.offset((page - 1) * page_size)
+        stmt = stmt.limit(page_size + 1)
+        
+        result = await self.db.execute(stmt)
+        cases, next_cursor = split_page(list(result.scalars().all()), page_size, ["created_at", "id"])
+        
+        return cases, total, next_cursor
+    
+    async def list_available(
+        self,
+        urgency: Optional[str] = None,
+        page: int = 1,
+        page_size: int = 20,
+        after: Optional[str] = None,
+        include_total: bool = True
+    ) -> tuple[List[Case], Optional[int], Optional[str]]:
+        """
+        Submitted, unassigned cases for volunteers: highest priority first,
+        oldest first within a score
+        Pages by keyset cursor (priority_score, created_at, id), which walks
+        idx_cases_available instead of sorting the table
+        Returns (cases, total, next_cursor)
+        """
+        stmt = select(Case).where(
+            Case.status == 'submitted',
+            Case.assigned_volunteer_id.is_(None)
+        )
+        
+        if urgency:
+            stmt = stmt.where(Case.urgency == urgency)
+        
+        total = None
+        if include_total:
+            count_stmt = select(func.count()).select_from(stmt.subquery())
+            total = (await self.db.execute(count_stmt)).scalar() or 0
+        
+        stmt = apply_keyset(
+            stmt,
+            [Case.priority_score, Case.created_at, Case.id],
+            after,
+            descending=[True, False, False]
+        )
+        if not after and page > 1:
+            stmt = stmt.offset((page - 1) * page_size)
+        stmt = stmt.limit(page_size + 1)
         
-        result = self.db.execute(stmt)
-        cases = result.scalars().all()
+        result = await self.db.execute(stmt)
+        cases, next_cursor = split_page(
+            list(result.scalars().all()), page_size, ["priority_score", "created_at", "id"]
+        )
         
-        return list(cases), total
+        return cases, total, next_cursor
     
-    def update(self, case: Case, update_data: dict) -> Case:
+    def _claim_values(self, volunteer_id: UUID) -> dict:
+        return {"status": "assigned", "assigned_volunteer_id": volunteer_id}
+    
+    async def claim(self, case_id: UUID, volunteer_id: UUID) -> Optional[Case]:
+        """
+        Assign an open case to a volunteer if nobody else has
+        Conditional UPDATE ... RETURNING; returns None when the case was
+        already claimed or is not submitted
+        """
+        stmt = (
+            update(Case)
+            .where(
+                Case.id == case_id,
+                Case.status == 'submitted',
+                Case.assigned_volunteer_id.is_(None)
+            )
+            .values(**self._claim_values(volunteer_id))
+            .returning(Case)
+            .execution_options(populate_existing=True, synchronize_session=False)
+        )
+        result = await self.db.execute(stmt)
+        case = result.scalar_one_or_none()
+        if case is not None:
+            await commit_or_flush(self.db)
+        return case
+    
+    async def claim_next(self, volunteer_id: UUID, urgency: Optional[str] = None) -> Optional[Case]:
+        """
+        Claim the highest-priority open case
+        FOR UPDATE SKIP LOCKED passes over cases other volunteers are claiming,
+        so concurrent callers each get a different case without waiting
+        """
+        next_case = (
+            select(Case.id)
+            .where(
+                Case.status == 'submitted',
+                Case.assigned_volunteer_id.is_(None)
+            )
+            .order_by(Case.priority_score.desc(), Case.created_at, Case.id)
+            .limit(1)
+            .with_for_update(skip_locked=True)
+        )
+        if urgency:
+            next_case = next_case.where(Case.urgency == urgency)
+        
+        stmt = (
+            update(Case)
+            .where(Case.id == next_case.scalar_subquery())
+            .values(**self._claim_values(volunteer_id))
+            .returning(Case)
+            .execution_options(populate_existing=True, synchronize_session=False)
+        )
+        result = await self.db.execute(stmt)
+        case = result.scalar_one_or_none()
+        if case is not None:
+            await commit_or_flush(self.db)
+        return case
+    
+    async def update(self, case: Case, update_data: dict) -> Case:
         """Update case"""
-        for key, value in update_data.items():
-            if value is not None:
-                setattr(case, key, value)
-        self.db.commit()
-        self.db.refresh(case)
+        return await self.update_by_id(case.id, update_data) or case
+    
+    async def update_by_id(self, case_id: UUID, update_data: dict) -> Optional[Case]:
+        """Update case by ID in a single UPDATE ... RETURNING round trip"""
+        values = {key: value for key, value in self._column_values(update_data).items() if value is not None}
+        if not values:
+            return await self.db.get(Case, case_id)
+        
+        stmt = (
+            update(Case)
+            .where(Case.id == case_id)
+            .values(**values)
+            .returning(Case)
+            .execution_options(populate_existing=True)
+        )
+        result = await self.db.execute(stmt)
+        case = result.scalar_one_or_none()
+        await commit_or_flush(self.db)
         return case
     
-    def delete(self, case: Case) -> None:
+    async def delete(self, case: Case) -> None:
         """Delete case"""
-        self.db.delete(case)
-        self.db.commit()
+        await self.db.delete(case)
+        await commit_or_flush(self.db)
 
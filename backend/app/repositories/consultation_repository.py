@@ -3,58 +3,157 @@ Consultation Repository
 Database operations for consultations
 """
 
-from sqlalchemy.orm import Session
-from sqlalchemy import select, and_, desc, func
-from typing import Optional, List
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy import select, insert, update, and_, or_, desc, func
+from typing import Optional, List, Tuple
 from uuid import UUID
 from datetime import datetime, timezone
-from app.models.consultation import Consultation
+from app.core.unit_of_work import commit_or_flush
+from app.core.pagination import apply_keyset, split_page
+from app.models.consultation import Consultation, ConsultationParticipant
+
+# Statuses that free a case for a new consultation (uq_consultations_active_case
+# excludes them, so a case may hold any number of these alongside one live row)
+CLOSED_STATUSES = ('cancelled', 'rescheduled')
 
 
 class ConsultationRepository:
-    def __init__(self, db: Session):
+    def __init__(self, db: AsyncSession):
         self.db = db
     
-    def create(self, consultation_data: dict) -> Consultation:
-        """Create a new consultation"""
-        consultation = Consultation(**consultation_data)
-        self.db.add(consultation)
-        self.db.commit()
-        self.db.refresh(consultation)
+    async def create(self, consultation_data: dict) -> Consultation:
+        """Create a new consultation (INSERT ... RETURNING, no re-select)"""
+        stmt = insert(Consultation).values(**consultation_data).returning(Consultation)
+        result = await self.db.execute(stmt)
+        consultation = result.scalar_one()
+        await commit_or_flush(self.db)
         return consultation
     
-    def get_by_id(self, consultation_id: str) -> Optional[Consultation]:
+    async def add_participants(self, consultation_id: UUID, participants: List[Tuple[UUID, str]]) -> None:
+        """Insert (user_id, role) participant rows in one statement"""
+        if not participants:
+            return
+        await self.db.execute(
+            insert(ConsultationParticipant),
+            [
+                {"consultation_id": consultation_id, "user_id": user_id, "role": role}
+                for user_id, role in participants
+            ]
+        )
+        await commit_or_flush(self.db)
+    
+    async def list_busy_intervals(
+        self,
+        user_ids: List[UUID],
+        start: datetime,
+        end: datetime
+    ) -> List[Tuple[UUID, datetime, datetime]]:
+        """
+        (user_id, scheduled_start, scheduled_end) of live consultations
+        overlapping [start, end) in which any of the users takes part, as
+        volunteer, requesting doctor or listed participant
+        """
+        if not user_ids:
+            return []
+        
+        live = and_(
+            Consultation.status.in_(['scheduled', 'in_progress']),
+            Consultation.scheduled_start < end,
+            Consultation.scheduled_end > start
+        )
+        wanted = set(user_ids)
+        
+        direct_stmt = select(
+            Consultation.volunteer_id,
+            Consultation.requesting_doctor_id,
+            Consultation.scheduled_start,
+            Consultation.scheduled_end
+        ).where(
+            live,
+            or_(
+                Consultation.volunteer_id.in_(user_ids),
+                Consultation.requesting_doctor_id.in_(user_ids)
+            )
+        )
+        participant_stmt = select(
+            ConsultationParticipant.user_id,
+            Consultation.scheduled_start,
+            Consultation.scheduled_end
+        ).join(
+            Consultation, Consultation.id == ConsultationParticipant.consultation_id
+        ).where(
+            live,
+            ConsultationParticipant.user_id.in_(user_ids)
+        )
+        
+        intervals = []
+        for volunteer_id, doctor_id, busy_start, busy_end in (await self.db.execute(direct_stmt)).all():
+            for user_id in {volunteer_id, doctor_id} & wanted:
+                intervals.append((user_id, busy_start, busy_end))
+        for user_id, busy_start, busy_end in (await self.db.execute(participant_stmt)).all():
+            intervals.append((user_id, busy_start, busy_end))
+        return intervals
+
+    async def list_participant_ids(self, consultation: Consultation) -> List[UUID]:
+        """Everyone taking part: volunteer, requesting doctor and listed participants"""
+        stmt = select(ConsultationParticipant.user_id).where(
+            ConsultationParticipant.consultation_id == consultation.id
+        )
+        user_ids = {consultation.volunteer_id, consultation.requesting_doctor_id}
+        user_ids.update((await self.db.execute(stmt)).scalars().all())
+        return list(user_ids)
+
+    async def lock_participants(self, user_ids: List[UUID]) -> None:
+        """
+        Transaction-scoped advisory lock per user, taken in a fixed order so
+        concurrent multi-party bookings sharing anyone serialize without deadlock
+        """
+        for user_id in sorted(set(user_ids), key=str):
+            await self.db.execute(
+                select(func.pg_advisory_xact_lock(func.hashtext(f"consultation-participant:{user_id}")))
+            )
+
+    async def get_by_id(self, consultation_id: str) -> Optional[Consultation]:
         """Get consultation by ID"""
         try:
             uuid_id = UUID(consultation_id)
         except ValueError:
             return None
         stmt = select(Consultation).where(Consultation.id == uuid_id)
-        result = self.db.execute(stmt)
+        result = await self.db.execute(stmt)
         return result.scalar_one_or_none()
     
-    def get_by_case(self, case_id: str) -> Optional[Consultation]:
-        """Get consultation for a case"""
+    async def get_by_case(self, case_id: str) -> Optional[Consultation]:
+        """Get the live (not cancelled or rescheduled) consultation for a case"""
         try:
             uuid_id = UUID(case_id)
         except ValueError:
             return None
-        stmt = select(Consultation).where(Consultation.case_id == uuid_id)
-        result = self.db.execute(stmt)
+        stmt = select(Consultation).where(
+            Consultation.case_id == uuid_id,
+            Consultation.status.not_in(CLOSED_STATUSES)
+        )
+        result = await self.db.execute(stmt)
         return result.scalar_one_or_none()
     
-    def list_by_doctor(
+    async def list_by_doctor(
         self,
         doctor_id: str,
         status: Optional[str] = None,
         page: int = 1,
-        page_size: int = 20
-    ) -> tuple[List[Consultation], int]:
-        """List consultations for a requesting doctor"""
+        page_size: int = 20,
+        after: Optional[str] = None,
+        include_total: bool = True
+    ) -> tuple[List[Consultation], Optional[int], Optional[str]]:
+        """
+        List consultations for a requesting doctor, latest scheduled first
+        Pages by keyset cursor (scheduled_start, id) when `after` is given
+        Returns (consultations, total, next_cursor)
+        """
         try:
             doctor_uuid = UUID(doctor_id)
         except ValueError:
-            return [], 0
+            return [], 0, None
         
         stmt = select(Consultation).where(Consultation.requesting_doctor_id == doctor_uuid)
         
@@ -62,30 +161,42 @@ class ConsultationRepository:
             stmt = stmt.where(Consultation.status == status)
         
         # Get total count
-        count_stmt = select(func.count()).select_from(stmt.subquery())
-        total = self.db.execute(count_stmt).scalar() or 0
+        total = None
+        if include_total:
+            count_stmt = select(func.count()).select_from(stmt.subquery())
+            total = (await self.db.execute(count_stmt)).scalar() or 0
         
         # Apply pagination and ordering
-        stmt = stmt.order_by(desc(Consultation.scheduled_start))
-        stmt = stmt.offset((page - 1) * page_size).limit(page_size)
+        stmt = apply_keyset(stmt, [Consultation.scheduled_start, Consultation.id], after, descending=True)
+        if not after and page > 1:
+            stmt = stmt.offset((page - 1) * page_size)
+        stmt = stmt.limit(page_size + 1)
         
-        result = self.db.execute(stmt)
-        consultations = result.scalars().all()
+        result = await self.db.execute(stmt)
+        consultations, next_cursor = split_page(
+            list(result.scalars().all()), page_size, ["scheduled_start", "id"]
+        )
         
-        return list(consultations), total
+        return consultations, total, next_cursor
     
-    def list_by_volunteer(
+    async def list_by_volunteer(
         self,
         volunteer_id: str,
         status: Optional[str] = None,
         page: int = 1,
-        page_size: int = 20
-    ) -> tuple[List[Consultation], int]:
-        """List consultations for a volunteer"""
+        page_size: int = 20,
+        after: Optional[str] = None,
+        include_total: bool = True
+    ) -> tuple[List[Consultation], Optional[int], Optional[str]]:
+        """
+        List consultations for a volunteer, latest scheduled first
+        Pages by keyset cursor (scheduled_start, id) when `after` is given
+        Returns (consultations, total, next_cursor)
+        """
         try:
             volunteer_uuid = UUID(volunteer_id)
         except ValueError:
-            return [], 0
+            return [], 0, None
         
         stmt = select(Consultation).where(Consultation.volunteer_id == volunteer_uuid)
         
@@ -93,19 +204,25 @@ class ConsultationRepository:
             stmt = stmt.where(Consultation.status == status)
         
         # Get total count
-        count_stmt = select(func.count()).select_from(stmt.subquery())
-        total = self.db.execute(count_stmt).scalar() or 0
+        total = None
+        if include_total:
+            count_stmt = select(func.count()).select_from(stmt.subquery())
+            total = (await self.db.execute(count_stmt)).scalar() or 0
         
         # Apply pagination and ordering
-        stmt = stmt.order_by(desc(Consultation.scheduled_start))
-        stmt = stmt.offset((page - 1) * page_size).limit(page_size)
+        stmt = apply_keyset(stmt, [Consultation.scheduled_start, Consultation.id], after, descending=True)
+        if not after and page > 1:
+            stmt = stmt.offset((page - 1) * page_size)
+        stmt = stmt.limit(page_size + 1)
         
-        result = self.db.execute(stmt)
-        consultations = result.scalars().all()
+        result = await self.db.execute(stmt)
+        consultations, next_cursor = split_page(
+            list(result.scalars().all()), page_size, ["scheduled_start", "id"]
+        )
         
-        return list(consultations), total
+        return consultations, total, next_cursor
     
-    def list_upcoming(
+    async def list_upcoming(
         self,
         user_id: str,
         role: str,
@@ -139,22 +256,30 @@ class ConsultationRepository:
             return []
         
         stmt = stmt.order_by(Consultation.scheduled_start).limit(limit)
-        result = self.db.execute(stmt)
+        result = await self.db.execute(stmt)
         return list(result.scalars().all())
     
-    def update(self, consultation: Consultation, update_data: dict) -> Consultation:
-        """Update consultation"""
-        for key, value in update_data.items():
-            if value is not None:
-                setattr(consultation, key, value)
+    async def update(self, consultation: Consultation, update_data: dict) -> Consultation:
+        """Update consultation (UPDATE ... RETURNING, no re-select)"""
+        values = {key: value for key, value in update_data.items() if value is not None}
         
         # Calculate duration if both start and end are provided
         if 'actual_start' in update_data and 'actual_end' in update_data:
             if update_data['actual_start'] and update_data['actual_end']:
                 delta = update_data['actual_end'] - update_data['actual_start']
-                consultation.duration_minutes = int(delta.total_seconds() / 60)
+                values['duration_minutes'] = int(delta.total_seconds() / 60)
         
-        self.db.commit()
-        self.db.refresh(consultation)
-        return consultation
-
+        if not values:
+            return consultation
+        
+        stmt = (
+            update(Consultation)
+            .where(Consultation.id == consultation.id)
+            .values(**values)
+            .returning(Consultation)
+            .execution_options(populate_existing=True)
+        )
+        result = await self.db.execute(stmt)
+        updated = result.scalar_one()
+        await commit_or_flush(self.db)
+        return updated
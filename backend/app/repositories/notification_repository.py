@@ -3,49 +3,57 @@ Notification Repository
 Database operations for notifications
 """
 
-from sqlalchemy.orm import Session
-from sqlalchemy import select, and_, desc, func
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy import select, update, delete, desc, func
 from typing import Optional, List, Tuple
 from uuid import UUID
 from datetime import datetime, timezone
 
+from app.core.unit_of_work import commit_or_flush
+from app.core.pagination import apply_keyset, split_page
 from app.models.notification import Notification
 
 
 class NotificationRepository:
-    def __init__(self, db: Session):
+    def __init__(self, db: AsyncSession):
         self.db = db
     
-    def create(self, notification_data: dict) -> Notification:
+    async def create(self, notification_data: dict) -> Notification:
         """Create a new notification"""
         notification = Notification(**notification_data)
         self.db.add(notification)
-        self.db.commit()
-        self.db.refresh(notification)
+        await commit_or_flush(self.db)
+        await self.db.refresh(notification)
         return notification
     
-    def get_by_id(self, notification_id: str) -> Optional[Notification]:
+    async def get_by_id(self, notification_id: str) -> Optional[Notification]:
         """Get notification by ID"""
         try:
             uuid_id = UUID(notification_id)
         except ValueError:
             return None
         stmt = select(Notification).where(Notification.id == uuid_id)
-        result = self.db.execute(stmt)
+        result = await self.db.execute(stmt)
         return result.scalar_one_or_none()
     
-    def list_notifications(
+    async def list_notifications(
         self,
         user_id: str,
         is_read: Optional[bool] = None,
         page: int = 1,
-        page_size: int = 20
-    ) -> Tuple[List[Notification], int]:
-        """List notifications for a user"""
+        page_size: int = 20,
+        after: Optional[str] = None,
+        include_total: bool = True
+    ) -> Tuple[List[Notification], Optional[int], Optional[str]]:
+        """
+        List notifications for a user, newest first
+        Pages by keyset cursor (created_at, id) when `after` is given
+        Returns (notifications, total, next_cursor)
+        """
         try:
             user_uuid = UUID(user_id)
         except ValueError:
-            return [], 0
+            return [], 0, None
         
         stmt = select(Notification).where(Notification.user_id == user_uuid)
         
@@ -56,55 +64,108 @@ class NotificationRepository:
                 stmt = stmt.where(Notification.read_at.is_(None))
         
         # Get total count
-        count_stmt = select(func.count()).select_from(
-            stmt.subquery()
-        )
-        total = self.db.execute(count_stmt).scalar() or 0
+        total = None
+        if include_total:
+            count_stmt = select(func.count()).select_from(
+                stmt.subquery()
+            )
+            total = (await self.db.execute(count_stmt)).scalar() or 0
         
         # Apply pagination and ordering
-        stmt = stmt.order_by(desc(Notification.created_at))
-        stmt = stmt.offset((page - 1) * page_size).limit(page_size)
+        stmt = apply_keyset(stmt, [Notification.created_at, Notification.id], after, descending=True)
+        if not after and page > 1:
+            stmt = stmt.offset((page - 1) * page_size)
+        stmt = stmt.limit(page_size + 1)
         
-        result = self.db.execute(stmt)
-        notifications = result.scalars().all()
+        result = await self.db.execute(stmt)
+        notifications, next_cursor = split_page(
+            list(result.scalars().all()), page_size, ["created_at", "id"]
+        )
         
-        return list(notifications), total
+        return notifications, total, next_cursor
     
-    def mark_as_read(self, notification: Notification) -> Notification:
+    async def mark_as_read(self, notification: Notification) -> Notification:
         """Mark notification as read"""
-        notification.is_read = True
+        notification.status = 'read'
         notification.read_at = datetime.now(timezone.utc)
-        self.db.commit()
-        self.db.refresh(notification)
+        await commit_or_flush(self.db)
+        await self.db.refresh(notification)
         return notification
     
-    def mark_all_as_read(self, user_id: str) -> int:
-        """Mark all notifications as read for a user"""
+    @staticmethod
+    def _bulk_conditions(
+        user_uuid: UUID,
+        ids: Optional[List[UUID]] = None,
+        type: Optional[str] = None,
+        older_than: Optional[datetime] = None
+    ) -> list:
+        conditions = [Notification.user_id == user_uuid]
+        if ids is not None:
+            conditions.append(Notification.id.in_(ids))
+        if type is not None:
+            conditions.append(Notification.type == type)
+        if older_than is not None:
+            conditions.append(Notification.created_at < older_than)
+        return conditions
+    
+    async def mark_many_as_read(
+        self,
+        user_id: str,
+        ids: Optional[List[UUID]] = None,
+        type: Optional[str] = None,
+        older_than: Optional[datetime] = None
+    ) -> int:
+        """
+        Mark a user's unread notifications as read in one UPDATE
+        Optional filters narrow the set; returns the number updated
+        """
         try:
             user_uuid = UUID(user_id)
         except ValueError:
             return 0
         
-        stmt = select(Notification).where(
-            and_(
-                Notification.user_id == user_uuid,
-                Notification.is_read == False
+        stmt = (
+            update(Notification)
+            .where(
+                *self._bulk_conditions(user_uuid, ids, type, older_than),
+                Notification.read_at.is_(None)
             )
+            .values(read_at=func.now(), status='read')
+            .execution_options(synchronize_session=False)
         )
-        result = self.db.execute(stmt)
-        notifications = result.scalars().all()
-        
-        count = 0
-        for notification in notifications:
-            notification.is_read = True
-            notification.read_at = datetime.now(timezone.utc)
-            count += 1
-        
-        self.db.commit()
+        result = await self.db.execute(stmt)
+        count = result.rowcount
+        await commit_or_flush(self.db)
         return count
     
-    def delete(self, notification: Notification) -> None:
+    async def mark_all_as_read(self, user_id: str) -> int:
+        """Mark all notifications as read for a user"""
+        return await self.mark_many_as_read(user_id)
+    
+    async def delete(self, notification: Notification) -> None:
         """Delete a notification"""
-        self.db.delete(notification)
-        self.db.commit()
-
+        await self.db.delete(notification)
+        await commit_or_flush(self.db)
+    
+    async def delete_many(
+        self,
+        user_id: str,
+        ids: Optional[List[UUID]] = None,
+        type: Optional[str] = None,
+        older_than: Optional[datetime] = None
+    ) -> int:
+        """Delete a user's notifications matching the filters in one DELETE"""
+        try:
+            user_uuid = UUID(user_id)
+        except ValueError:
+            return 0
+        
+        stmt = (
+            delete(Notification)
+            .where(*self._bulk_conditions(user_uuid, ids, type, older_than))
+            .execution_options(synchronize_session=False)
+        )
+        result = await self.db.execute(stmt)
+        count = result.rowcount
+        await commit_or_flush(self.db)
+        return count
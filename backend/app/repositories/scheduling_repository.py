@@ -3,38 +3,70 @@ Scheduling Repository
 Database operations for availability and appointment slots
 """
 
-from sqlalchemy.orm import Session
-from sqlalchemy import select, and_, or_, desc, func
-from typing import Optional, List
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy import select, insert, update, delete, and_, or_, desc, func, literal, bindparam, column, exists, DateTime
+from sqlalchemy.dialects.postgresql import ARRAY
+from sqlalchemy.orm import aliased
+from typing import Optional, List, Tuple
 from uuid import UUID
 from datetime import datetime, timezone, timedelta
+from app.core.unit_of_work import commit_or_flush
+from app.core.pagination import apply_keyset, split_page
 from app.models.availability import AvailabilityBlock, AppointmentSlot
+import uuid
+
+
+class SlotUnavailableError(Exception):
+    """Raised when a slot was booked (or removed) before this request could claim it"""
+
+
+class BookedSlotConflictError(Exception):
+    """Raised when a block edit would leave booked slots outside the block"""
+    
+    def __init__(self, slots: List[AppointmentSlot]):
+        super().__init__(f"{len(slots)} booked slots no longer fit the block")
+        self.slots = slots
+
+
+def split_into_slots(
+    windows: List[Tuple[datetime, datetime]],
+    slot_duration_minutes: int
+) -> List[Tuple[datetime, datetime]]:
+    """Cut (start, end) windows into consecutive slot intervals; remainders are dropped"""
+    slot_duration = timedelta(minutes=slot_duration_minutes or 10)
+    intervals = []
+    for window_start, window_end in windows:
+        current_time = window_start
+        while current_time + slot_duration <= window_end:
+            intervals.append((current_time, current_time + slot_duration))
+            current_time += slot_duration
+    return intervals
 
 
 class SchedulingRepository:
-    def __init__(self, db: Session):
+    def __init__(self, db: AsyncSession):
         self.db = db
     
     # Availability Block Operations
-    def create_availability_block(self, block_data: dict) -> AvailabilityBlock:
+    async def create_availability_block(self, block_data: dict) -> AvailabilityBlock:
         """Create a new availability block"""
         block = AvailabilityBlock(**block_data)
         self.db.add(block)
-        self.db.commit()
-        self.db.refresh(block)
+        await commit_or_flush(self.db)
+        await self.db.refresh(block)
         return block
     
-    def get_availability_block(self, block_id: str) -> Optional[AvailabilityBlock]:
+    async def get_availability_block(self, block_id: str) -> Optional[AvailabilityBlock]:
         """Get availability block by ID"""
         try:
             uuid_id = UUID(block_id)
         except ValueError:
             return None
         stmt = select(AvailabilityBlock).where(AvailabilityBlock.id == uuid_id)
-        result = self.db.execute(stmt)
+        result = await self.db.execute(stmt)
         return result.scalar_one_or_none()
     
-    def list_availability_blocks(
+    async def list_availability_blocks(
         self,
         volunteer_id: str,
         status: Optional[str] = None
@@ -53,57 +85,307 @@ class SchedulingRepository:
             stmt = stmt.where(AvailabilityBlock.status == 'active')
         
         stmt = stmt.order_by(AvailabilityBlock.start_time)
-        result = self.db.execute(stmt)
+        result = await self.db.execute(stmt)
         return list(result.scalars().all())
     
-    def update_availability_block(self, block: AvailabilityBlock, update_data: dict) -> AvailabilityBlock:
+    async def update_availability_block(self, block: AvailabilityBlock, update_data: dict) -> AvailabilityBlock:
         """Update availability block"""
         for key, value in update_data.items():
             if value is not None:
                 setattr(block, key, value)
-        self.db.commit()
-        self.db.refresh(block)
+        await commit_or_flush(self.db)
+        await self.db.refresh(block)
         return block
     
-    def delete_availability_block(self, block: AvailabilityBlock) -> None:
+    async def lock_blocks_to_materialize(self, horizon: datetime, limit: int = 100) -> List[AvailabilityBlock]:
+        """
+        Lock active recurring blocks whose slots stop short of `horizon`
+        SKIP LOCKED lets several workers share the job without double-generating
+        """
+        stmt = (
+            select(AvailabilityBlock)
+            .where(
+                AvailabilityBlock.is_recurring.is_(True),
+                AvailabilityBlock.status == 'active',
+                or_(
+                    AvailabilityBlock.materialized_until.is_(None),
+                    AvailabilityBlock.materialized_until < horizon
+                )
+            )
+            .order_by(AvailabilityBlock.materialized_until.asc().nullsfirst())
+            .limit(limit)
+            .with_for_update(skip_locked=True)
+        )
+        result = await self.db.execute(stmt)
+        return list(result.scalars().all())
+    
+    async def list_active_blocks(
+        self,
+        until: datetime,
+        volunteer_id: Optional[UUID] = None
+    ) -> List[AvailabilityBlock]:
+        """Active blocks that may contribute availability before `until`"""
+        stmt = select(AvailabilityBlock).where(
+            AvailabilityBlock.status == 'active',
+            AvailabilityBlock.start_time < until,
+            or_(
+                AvailabilityBlock.is_recurring.is_(True),
+                AvailabilityBlock.end_time > func.now()
+            )
+        )
+        if volunteer_id is not None:
+            stmt = stmt.where(AvailabilityBlock.volunteer_id == volunteer_id)
+        result = await self.db.execute(stmt)
+        return list(result.scalars().all())
+    
+    async def list_blocks_for_volunteers(
+        self,
+        volunteer_ids: List[UUID],
+        start: datetime,
+        end: datetime
+    ) -> List[AvailabilityBlock]:
+        """Active blocks of the given volunteers that may overlap [start, end)"""
+        if not volunteer_ids:
+            return []
+        stmt = select(AvailabilityBlock).where(
+            AvailabilityBlock.volunteer_id.in_(volunteer_ids),
+            AvailabilityBlock.status == 'active',
+            AvailabilityBlock.start_time < end,
+            or_(
+                AvailabilityBlock.is_recurring.is_(True),
+                AvailabilityBlock.end_time > start
+            )
+        )
+        result = await self.db.execute(stmt)
+        return list(result.scalars().all())
+    
+    async def set_materialized_until(self, block: AvailabilityBlock, until: Optional[datetime]) -> None:
+        """Record how far ahead a recurring block has slots"""
+        block.materialized_until = until
+        await commit_or_flush(self.db)
+    
+    async def delete_availability_block(self, block: AvailabilityBlock) -> None:
         """Delete availability block"""
-        self.db.delete(block)
-        self.db.commit()
+        await self.db.delete(block)
+        await commit_or_flush(self.db)
     
     # Appointment Slot Operations
-    def generate_slots_from_block(self, block: AvailabilityBlock) -> List[AppointmentSlot]:
+    async def generate_slots_from_block(self, block: AvailabilityBlock) -> List[AppointmentSlot]:
         """Generate appointment slots from an availability block"""
-        slots = []
-        current_time = block.start_time
-        slot_duration = timedelta(minutes=block.slot_duration_minutes)
-        
-        while current_time + slot_duration <= block.end_time:
-            slot = AppointmentSlot(
-                availability_block_id=block.id,
-                volunteer_id=block.volunteer_id,
-                start_time=current_time,
-                end_time=current_time + slot_duration,
-                timezone=block.timezone,
-                status='available'
+        return await self.generate_slots_from_blocks([block.id])
+    
+    async def generate_slots_from_blocks(self, block_ids: List[UUID]) -> List[AppointmentSlot]:
+        """
+        Generate appointment slots for many availability blocks at once
+        A single INSERT ... SELECT generate_series(...) RETURNING builds every
+        slot in the database, so a block costs one round trip, not one per slot
+        """
+        if not block_ids:
+            return []
+        
+        step = func.make_interval(0, 0, 0, 0, 0, AvailabilityBlock.slot_duration_minutes)
+        # Set-returning functions in FROM are implicitly LATERAL in PostgreSQL
+        slot_start = func.generate_series(
+            AvailabilityBlock.start_time,
+            AvailabilityBlock.end_time - step,
+            step
+        ).column_valued("slot_start")
+        
+        slot_rows = (
+            select(
+                func.gen_random_uuid(),
+                AvailabilityBlock.id,
+                AvailabilityBlock.volunteer_id,
+                slot_start,
+                slot_start + step,
+                AvailabilityBlock.timezone,
+                literal('available'),
             )
-            self.db.add(slot)
-            slots.append(slot)
-            current_time += slot_duration
+            .where(AvailabilityBlock.id.in_(block_ids))
+        )
+        stmt = (
+            insert(AppointmentSlot)
+            .from_select(
+                ["id", "availability_block_id", "volunteer_id", "start_time", "end_time", "timezone", "status"],
+                slot_rows
+            )
+            .returning(AppointmentSlot)
+        )
+        result = await self.db.execute(stmt)
+        slots = list(result.scalars().all())
+        await commit_or_flush(self.db)
+        
+        slots.sort(key=lambda slot: (slot.start_time, slot.volunteer_id))
+        return slots
+    
+    async def create_slots(
+        self,
+        block: AvailabilityBlock,
+        windows: List[Tuple[datetime, datetime]],
+        busy: List[Tuple[datetime, datetime]] = (),
+        since: Optional[datetime] = None
+    ) -> List[AppointmentSlot]:
+        """
+        Create slots for explicit (start, end) windows of a block, skipping
+        any slot that starts before `since` or overlaps a `busy` interval
+        (time already booked without a slot). Used for recurring occurrences;
+        rows go out as one batched INSERT ... RETURNING
+        """
+        rows = [
+            {
+                "id": uuid.uuid4(),
+                "availability_block_id": block.id,
+                "volunteer_id": block.volunteer_id,
+                "start_time": start,
+                "end_time": end,
+                "timezone": block.timezone,
+                "status": 'available',
+            }
+            for start, end in split_into_slots(windows, block.slot_duration_minutes)
+            if (since is None or start >= since)
+            and not any(start < busy_end and end > busy_start for busy_start, busy_end in busy)
+        ]
         
-        self.db.commit()
-        for slot in slots:
-            self.db.refresh(slot)
+        if not rows:
+            return []
+        
+        result = await self.db.execute(insert(AppointmentSlot).returning(AppointmentSlot), rows)
+        slots = list(result.scalars().all())
+        await commit_or_flush(self.db)
         return slots
     
-    def get_available_slots(
+    async def reconcile_block_slots(
+        self,
+        block: AvailabilityBlock,
+        windows: List[Tuple[datetime, datetime]],
+        since: datetime
+    ) -> Tuple[int, int]:
+        """
+        Make a block's slots starting at or after `since` match `windows`
+        
+        Desired slot intervals are passed once as two arrays and unnested in
+        SQL. Slots that still fit are kept, unbooked ones that do not are
+        cancelled, and missing ones are inserted, each as one statement.
+        Raises BookedSlotConflictError if a booked slot would fall outside the
+        block; run inside a UnitOfWork so the cancellations roll back.
+        Returns (cancelled, created)
+        """
+        intervals = [
+            (start, end) for start, end in split_into_slots(windows, block.slot_duration_minutes)
+            if start >= since
+        ]
+        timestamp_array = ARRAY(DateTime(timezone=True))
+        desired = func.unnest(
+            bindparam("desired_starts", [start for start, _ in intervals], type_=timestamp_array),
+            bindparam("desired_ends", [end for _, end in intervals], type_=timestamp_array)
+        ).table_valued(
+            column("start_time", DateTime(timezone=True)),
+            column("end_time", DateTime(timezone=True))
+        ).render_derived(name="desired")
+        
+        still_fits = exists(
+            select(1).select_from(desired).where(
+                desired.c.start_time == AppointmentSlot.start_time,
+                desired.c.end_time == AppointmentSlot.end_time
+            )
+        )
+        in_scope = and_(
+            AppointmentSlot.availability_block_id == block.id,
+            AppointmentSlot.start_time >= since
+        )
+        
+        # 1. Cancel available slots that no longer fit. This runs first so a
+        #    concurrent claim_slot either committed already (and is seen by
+        #    step 2) or finds the slot cancelled
+        cancel_stmt = (
+            update(AppointmentSlot)
+            .where(in_scope, AppointmentSlot.status == 'available', ~still_fits)
+            .values(status='cancelled')
+            .returning(AppointmentSlot.id)
+            .execution_options(synchronize_session=False)
+        )
+        cancelled = len((await self.db.execute(cancel_stmt)).all())
+        
+        # 2. Booked slots the new shape would orphan
+        conflict_stmt = select(AppointmentSlot).where(
+            in_scope,
+            AppointmentSlot.status == 'booked',
+            ~still_fits
+        )
+        conflicts = list((await self.db.execute(conflict_stmt)).scalars().all())
+        if conflicts:
+            raise BookedSlotConflictError(conflicts)
+        
+        # 3. Insert desired slots that do not exist yet
+        existing = aliased(AppointmentSlot)
+        missing = (
+            select(
+                func.gen_random_uuid(),
+                literal(block.id),
+                literal(block.volunteer_id),
+                desired.c.start_time,
+                desired.c.end_time,
+                literal(block.timezone),
+                literal('available'),
+            )
+            .select_from(desired)
+            .where(
+                ~exists(
+                    select(1).where(
+                        existing.availability_block_id == block.id,
+                        existing.status.in_(['available', 'booked']),
+                        existing.start_time == desired.c.start_time,
+                        existing.end_time == desired.c.end_time
+                    )
+                )
+            )
+        )
+        insert_stmt = (
+            insert(AppointmentSlot)
+            .from_select(
+                ["id", "availability_block_id", "volunteer_id", "start_time", "end_time", "timezone", "status"],
+                missing
+            )
+            .returning(AppointmentSlot.id)
+        )
+        created = len((await self.db.execute(insert_stmt)).all())
+        
+        await commit_or_flush(self.db)
+        return cancelled, created
+    
+    async def prune_past_slots(self, before: datetime) -> int:
+        """Delete unbooked slots that ended before `before`; booked ones are kept for history"""
+        stmt = (
+            delete(AppointmentSlot)
+            .where(
+                AppointmentSlot.status.in_(['available', 'cancelled', 'expired']),
+                # start_time bound lets the (start_time, end_time) index narrow the scan
+                AppointmentSlot.start_time < before,
+                AppointmentSlot.end_time < before
+            )
+            .returning(AppointmentSlot.id)
+            .execution_options(synchronize_session=False)
+        )
+        result = await self.db.execute(stmt)
+        count = len(result.all())
+        await commit_or_flush(self.db)
+        return count
+    
+    async def get_available_slots(
         self,
         volunteer_id: Optional[str] = None,
         start_date: Optional[datetime] = None,
         end_date: Optional[datetime] = None,
         page: int = 1,
-        page_size: int = 50
-    ) -> tuple[List[AppointmentSlot], int]:
-        """Get available appointment slots"""
+        page_size: int = 50,
+        after: Optional[str] = None,
+        include_total: bool = True
+    ) -> tuple[List[AppointmentSlot], Optional[int], Optional[str]]:
+        """
+        Get available appointment slots, earliest first
+        Pages by keyset cursor (start_time, id) when `after` is given
+        Returns (slots, total, next_cursor)
+        """
         now = datetime.now(timezone.utc)
         start_date = start_date or now
         
@@ -119,55 +401,144 @@ class SchedulingRepository:
                 volunteer_uuid = UUID(volunteer_id)
                 stmt = stmt.where(AppointmentSlot.volunteer_id == volunteer_uuid)
             except ValueError:
-                return [], 0
+                return [], 0, None
         
         if end_date:
             stmt = stmt.where(AppointmentSlot.start_time <= end_date)
         
         # Get total count
-        count_stmt = select(func.count()).select_from(stmt.subquery())
-        total = self.db.execute(count_stmt).scalar() or 0
+        total = None
+        if include_total:
+            count_stmt = select(func.count()).select_from(stmt.subquery())
+            total = (await self.db.execute(count_stmt)).scalar() or 0
         
         # Apply pagination and ordering
-        stmt = stmt.order_by(AppointmentSlot.start_time)
-        stmt = stmt.offset((page - 1) * page_size).limit(page_size)
+        stmt = apply_keyset(stmt, [AppointmentSlot.start_time, AppointmentSlot.id], after)
+        if not after and page > 1:
+            stmt = stmt.offset((page - 1) * page_size)
+        stmt = stmt.limit(page_size + 1)
         
-        result = self.db.execute(stmt)
-        slots = result.scalars().all()
+        result = await self.db.execute(stmt)
+        slots, next_cursor = split_page(list(result.scalars().all()), page_size, ["start_time", "id"])
         
-        return list(slots), total
+        return slots, total, next_cursor
     
-    def get_slot(self, slot_id: str) -> Optional[AppointmentSlot]:
+    async def get_slot(self, slot_id: str) -> Optional[AppointmentSlot]:
         """Get appointment slot by ID"""
         try:
             uuid_id = UUID(slot_id)
         except ValueError:
             return None
         stmt = select(AppointmentSlot).where(AppointmentSlot.id == uuid_id)
-        result = self.db.execute(stmt)
+        result = await self.db.execute(stmt)
         return result.scalar_one_or_none()
     
-    def book_slot(self, slot: AppointmentSlot, consultation_id: str) -> AppointmentSlot:
-        """Book an appointment slot"""
+    async def claim_slot(self, slot_id: UUID, consultation_id: UUID) -> Optional[AppointmentSlot]:
+        """
+        Atomically book a slot if it is still available
+        One conditional UPDATE ... WHERE status = 'available' RETURNING; the row
+        lock makes concurrent claims serialize, and losers get None
+        """
+        stmt = (
+            update(AppointmentSlot)
+            .where(
+                AppointmentSlot.id == slot_id,
+                AppointmentSlot.status == 'available'
+            )
+            .values(status='booked', consultation_id=consultation_id)
+            .returning(AppointmentSlot)
+            .execution_options(populate_existing=True, synchronize_session=False)
+        )
+        result = await self.db.execute(stmt)
+        slot = result.scalar_one_or_none()
+        if slot is not None:
+            await commit_or_flush(self.db)
+        return slot
+
+    async def claim_slots_in_range(
+        self,
+        volunteer_id: UUID,
+        start: datetime,
+        end: datetime,
+        consultation_id: UUID
+    ) -> bool:
+        """
+        Book every available slot of the volunteer overlapping [start, end)
+        for one consultation. Returns False if a slot in the range is already
+        booked for another consultation; the caller should roll back
+        """
+        overlapping = and_(
+            AppointmentSlot.volunteer_id == volunteer_id,
+            AppointmentSlot.start_time < end,
+            AppointmentSlot.end_time > start
+        )
+        await self.db.execute(
+            update(AppointmentSlot)
+            .where(overlapping, AppointmentSlot.status == 'available')
+            .values(status='booked', consultation_id=consultation_id)
+            .execution_options(synchronize_session=False)
+        )
+        # Runs after the UPDATE so slots claimed concurrently are seen committed
+        taken = await self.db.execute(
+            select(AppointmentSlot.id)
+            .where(
+                overlapping,
+                AppointmentSlot.status == 'booked',
+                AppointmentSlot.consultation_id.is_distinct_from(consultation_id)
+            )
+            .limit(1)
+        )
+        if taken.scalar_one_or_none() is not None:
+            return False
+        await commit_or_flush(self.db)
+        return True
+
+    async def book_slot(self, slot: AppointmentSlot, consultation_id: str) -> AppointmentSlot:
+        """Book an appointment slot; raises SlotUnavailableError if it was taken"""
         try:
             consultation_uuid = UUID(consultation_id)
         except ValueError:
             raise ValueError("Invalid consultation_id format")
         
-        if slot.status != 'available':
-            raise ValueError("Slot is not available")
-        
-        slot.status = 'booked'
-        slot.consultation_id = consultation_uuid
-        self.db.commit()
-        self.db.refresh(slot)
-        return slot
+        booked = await self.claim_slot(slot.id, consultation_uuid)
+        if booked is None:
+            raise SlotUnavailableError(str(slot.id))
+        return booked
+    
+    async def find_alternative_slots(
+        self,
+        volunteer_id: UUID,
+        target: datetime,
+        limit: int = 5,
+        window: timedelta = timedelta(days=1)
+    ) -> List[AppointmentSlot]:
+        """
+        Available slots nearest to `target`, same volunteer first
+        Bounded to target +/- window so the available-slot index limits the scan
+        """
+        now = datetime.now(timezone.utc)
+        stmt = (
+            select(AppointmentSlot)
+            .where(
+                AppointmentSlot.status == 'available',
+                AppointmentSlot.start_time >= max(now, target - window),
+                AppointmentSlot.start_time <= target + window
+            )
+            .order_by(
+                (AppointmentSlot.volunteer_id != volunteer_id),
+                func.abs(func.extract('epoch', AppointmentSlot.start_time - target)),
+                AppointmentSlot.id
+            )
+            .limit(limit)
+        )
+        result = await self.db.execute(stmt)
+        return list(result.scalars().all())
     
-    def cancel_slot(self, slot: AppointmentSlot) -> AppointmentSlot:
+    async def cancel_slot(self, slot: AppointmentSlot) -> AppointmentSlot:
         """Cancel a booked slot"""
         slot.status = 'available'
         slot.consultation_id = None
-        self.db.commit()
-        self.db.refresh(slot)
+        await commit_or_flush(self.db)
+        await self.db.refresh(slot)
         return slot
 
@@ -0,0 +1,114 @@
+"""
+Upload Session Repository
+Database operations for in-progress TUS upload sessions
+"""
+
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy import select, insert, update, delete, func
+from typing import Optional, List
+from datetime import datetime, timedelta, timezone
+from app.core.config import settings
+from app.core.unit_of_work import commit_or_flush
+from app.models.upload_session import UploadSession
+
+
+class UploadSessionRepository:
+    def __init__(self, db: AsyncSession):
+        self.db = db
+
+    async def create(self, session_data: dict) -> UploadSession:
+        """Create a session (INSERT ... RETURNING, no re-select)"""
+        session_data.setdefault(
+            "expires_at",
+            datetime.now(timezone.utc) + timedelta(seconds=settings.TUS_UPLOAD_EXPIRATION)
+        )
+        stmt = insert(UploadSession).values(**session_data).returning(UploadSession)
+        result = await self.db.execute(stmt)
+        session = result.scalar_one()
+        await commit_or_flush(self.db)
+        return session
+
+    async def get(self, tus_upload_id: str) -> Optional[UploadSession]:
+        """Get session by TUS upload ID (primary key lookup)"""
+        return await self.db.get(UploadSession, tus_upload_id)
+
+    async def get_many(self, tus_upload_ids: List[str]) -> List[UploadSession]:
+        """Sessions for the given IDs, in the order requested (missing ones skipped)"""
+        if not tus_upload_ids:
+            return []
+        stmt = select(UploadSession).where(UploadSession.tus_upload_id.in_(tus_upload_ids))
+        by_id = {s.tus_upload_id: s for s in (await self.db.execute(stmt)).scalars().all()}
+        return [by_id[tus_id] for tus_id in tus_upload_ids if tus_id in by_id]
+
+    async def list_expired(self, now: datetime, limit: int) -> List[UploadSession]:
+        """Oldest sessions past expires_at (served by idx_upload_sessions_expires)"""
+        stmt = (
+            select(UploadSession)
+            .where(UploadSession.expires_at < now)
+            .order_by(UploadSession.expires_at)
+            .limit(limit)
+        )
+        result = await self.db.execute(stmt)
+        return list(result.scalars().all())
+
+    async def advance(
+        self,
+        tus_upload_id: str,
+        expected_offset: int,
+        new_offset: int,
+        part_etags: List[str],
+        completed: bool = False
+    ) -> Optional[UploadSession]:
+        """
+        Record received bytes with one conditional UPDATE ... RETURNING.
+        `completed` clears s3_upload_id once the multipart upload is closed.
+        None if another request moved the offset first
+        """
+        values = {}
+        if completed:
+            values["s3_upload_id"] = None
+        stmt = (
+            update(UploadSession)
+            .where(
+                UploadSession.tus_upload_id == tus_upload_id,
+                UploadSession.upload_offset == expected_offset
+            )
+            .values(
+                upload_offset=new_offset,
+                part_etags=part_etags,
+                updated_at=func.now(),
+                expires_at=datetime.now(timezone.utc) + timedelta(seconds=settings.TUS_UPLOAD_EXPIRATION),
+                **values
+            )
+            .returning(UploadSession)
+            .execution_options(populate_existing=True, synchronize_session=False)
+        )
+        result = await self.db.execute(stmt)
+        session = result.scalar_one_or_none()
+        if session is not None:
+            await commit_or_flush(self.db)
+        return session
+
+    async def extend(self, tus_upload_id: str) -> None:
+        """Push expires_at out again (activity that does not move the offset)"""
+        stmt = (
+            update(UploadSession)
+            .where(UploadSession.tus_upload_id == tus_upload_id)
+            .values(
+                updated_at=func.now(),
+                expires_at=datetime.now(timezone.utc) + timedelta(seconds=settings.TUS_UPLOAD_EXPIRATION)
+            )
+            .execution_options(synchronize_session=False)
+        )
+        await self.db.execute(stmt)
+        await commit_or_flush(self.db)
+
+    async def delete(self, tus_upload_id: str) -> None:
+        """Drop a finished or abandoned session"""
+        await self.delete_many([tus_upload_id])
+
+    async def delete_many(self, tus_upload_ids: List[str]) -> None:
+        if not tus_upload_ids:
+            return
+        await self.db.execute(delete(UploadSession).where(UploadSession.tus_upload_id.in_(tus_upload_ids)))
+        await commit_or_flush(self.db)
@@ -0,0 +1,35 @@
+"""
+User Profile Repository
+Database operations for user profiles
+"""
+
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy import select
+from typing import Optional, List, Tuple
+from uuid import UUID
+from app.models.user import User
+from app.models.user_profile import UserProfile
+
+
+class UserProfileRepository:
+    def __init__(self, db: AsyncSession):
+        self.db = db
+    
+    async def list_volunteer_capabilities(self) -> List[Tuple[UUID, Optional[str], List[str]]]:
+        """
+        (user_id, specialization, languages_spoken) for every active volunteer
+        Loaded whole for the in-memory capability map; matching filters there
+        """
+        stmt = (
+            select(UserProfile.user_id, UserProfile.specialization, UserProfile.languages_spoken)
+            .join(User, User.id == UserProfile.user_id)
+            .where(
+                User.role == 'volunteer_physician',
+                User.is_active.is_(True)
+            )
+        )
+        result = await self.db.execute(stmt)
+        return [
+            (user_id, spec, list(langs or []))
+            for user_id, spec, langs in result.all()
+        ]
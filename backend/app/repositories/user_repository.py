@@ -3,45 +3,63 @@ User Repository
 Database operations for users
 """
 
-from sqlalchemy.orm import Session
-from typing import Optional
+from sqlalchemy.ext.asyncio import AsyncSession
+from typing import Optional, Dict, List
 from sqlalchemy import select
+from app.core.unit_of_work import commit_or_flush
 from app.models.user import User
 import uuid
 
 
 class UserRepository:
-    def __init__(self, db: Session):
+    def __init__(self, db: AsyncSession):
         self.db = db
     
-    def get_by_email(self, email: str) -> Optional[User]:
+    async def get_by_email(self, email: str) -> Optional[User]:
         """Get user by email"""
         stmt = select(User).where(User.email == email)
-        result = self.db.execute(stmt)
+        result = await self.db.execute(stmt)
         return result.scalar_one_or_none()
     
-    def get_by_id(self, user_id: str) -> Optional[User]:
+    async def get_by_id(self, user_id: str) -> Optional[User]:
         """Get user by ID"""
         try:
             user_uuid = uuid.UUID(user_id)
         except ValueError:
             return None
         stmt = select(User).where(User.id == user_uuid)
-        result = self.db.execute(stmt)
+        result = await self.db.execute(stmt)
         return result.scalar_one_or_none()
     
-    def create(self, user_data: dict) -> User:
+    async def get_roles(self, user_ids: List[uuid.UUID]) -> Dict[uuid.UUID, str]:
+        """Map active user IDs to roles; unknown or inactive users are left out"""
+        if not user_ids:
+            return {}
+        stmt = select(User.id, User.role).where(User.id.in_(user_ids), User.is_active.is_(True))
+        result = await self.db.execute(stmt)
+        return {user_id: role for user_id, role in result.all()}
+    
+    async def create(self, user_data: dict) -> User:
         """Create new user"""
         user = User(**user_data)
         self.db.add(user)
-        self.db.commit()
-        self.db.refresh(user)
+        await commit_or_flush(self.db)
+        await self.db.refresh(user)
+        return user
+    
+    async def update(self, user: User, update_data: dict) -> User:
+        """Update user"""
+        for key, value in update_data.items():
+            if value is not None:
+                setattr(user, key, value)
+        await commit_or_flush(self.db)
+        await self.db.refresh(user)
         return user
     
-    def update_last_login(self, user: User):
+    async def update_last_login(self, user: User):
         """Update user's last login timestamp"""
         from datetime import datetime, timezone
         user.last_login_at = datetime.now(timezone.utc)
-        self.db.commit()
-        self.db.refresh(user)
+        await commit_or_flush(self.db)
+        await self.db.refresh(user)
 
@@ -26,12 +26,18 @@ class UserResponse(BaseModel):
     first_name: Optional[str]
     last_name: Optional[str]
     is_active: bool
+    timezone: str = "UTC"  # Times in responses are rendered in this zone
     created_at: datetime
     
     class Config:
         from_attributes = True
 
 
+class UserAdminUpdate(BaseModel):
+    role: Optional[str] = None
+    is_active: Optional[bool] = None
+
+
 class Token(BaseModel):
     access_token: str
     refresh_token: str
@@ -53,7 +53,8 @@ class CaseResponse(BaseModel):
 
 class CaseListResponse(BaseModel):
     cases: list[CaseResponse]
-    total: int
+    total: Optional[int] = None  # Only counted when include_total is set
     page: int
     page_size: int
+    next_cursor: Optional[str] = None
 
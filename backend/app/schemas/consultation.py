@@ -15,6 +15,12 @@ class ConsultationCreate(BaseModel):
     patient_id: Optional[str] = None
 
 
+class ConsultationClaimNext(BaseModel):
+    scheduled_start: datetime
+    scheduled_end: datetime
+    urgency: Optional[str] = None  # Only claim cases of this urgency
+
+
 class ConsultationUpdate(BaseModel):
     status: Optional[str] = None
     actual_start: Optional[datetime] = None
@@ -68,7 +74,8 @@ class ConsultationStartResponse(BaseModel):
 
 class ConsultationListResponse(BaseModel):
     consultations: list[ConsultationResponse]
-    total: int
+    total: Optional[int] = None  # Only counted when include_total is set
     page: int
     page_size: int
+    next_cursor: Optional[str] = None
 
@@ -61,3 +61,43 @@ class TUSPatchResponse(BaseModel):
     """TUS Protocol: Response to PATCH request"""
     upload_offset: int
 
+
+
+class DirectUploadCreate(BaseModel):
+    """Start a direct-to-S3 multipart upload"""
+    file_name: str
+    file_size: int
+    file_type: str = "document"  # 'xray', 'lab_result', 'photo', 'document', 'dicom'
+    mime_type: Optional[str] = None
+    case_id: Optional[str] = None
+
+
+class DirectUploadResponse(BaseModel):
+    upload_id: str
+    file_id: str
+    part_size: int  # Every part but the last must be exactly this size
+    part_count: int
+    expires_at: datetime
+
+
+class PresignedPartsRequest(BaseModel):
+    part_numbers: List[int]
+
+
+class PresignedPart(BaseModel):
+    part_number: int
+    url: str  # PUT the part body here; keep the ETag response header
+
+
+class PresignedPartsResponse(BaseModel):
+    parts: List[PresignedPart]
+    expires_in: int
+
+
+class CompletedPart(BaseModel):
+    part_number: int
+    etag: str
+
+
+class DirectUploadCompleteRequest(BaseModel):
+    parts: List[CompletedPart]
@@ -0,0 +1,24 @@
+"""
+Notification Schemas
+Pydantic models for notification request/response validation
+"""
+
+from pydantic import BaseModel, Field
+from typing import Optional, List
+from datetime import datetime
+from uuid import UUID
+
+
+class NotificationBulkRequest(BaseModel):
+    """Selects the current user's notifications; filters are combined with AND"""
+    ids: Optional[List[UUID]] = Field(None, max_length=1000)
+    type: Optional[str] = None
+    older_than: Optional[datetime] = None
+    
+    @property
+    def has_filter(self) -> bool:
+        return self.ids is not None or self.type is not None or self.older_than is not None
+
+
+class NotificationBulkResponse(BaseModel):
+    count: int
@@ -4,7 +4,7 @@ Pydantic models for scheduling request/response validation
 """
 
 from pydantic import BaseModel
-from typing import Optional, List, Dict, Any
+from typing import Optional, List, Dict, Any, Literal
 from datetime import datetime
 
 
@@ -51,9 +51,31 @@ class AppointmentSlotResponse(BaseModel):
 
 class AppointmentSlotListResponse(BaseModel):
     slots: List[AppointmentSlotResponse]
-    total: int
+    total: Optional[int] = None  # Only counted when include_total is set
     page: int
     page_size: int
+    next_cursor: Optional[str] = None
+
+
+class FreeWindowResponse(BaseModel):
+    volunteer_id: str
+    start_time: datetime
+    end_time: datetime
+
+
+class FreeWindowListResponse(BaseModel):
+    windows: List[FreeWindowResponse]
+    duration_minutes: int
+
+
+class MatchedWindowResponse(FreeWindowResponse):
+    specialization: Optional[str] = None
+    languages_spoken: List[str] = []
+
+
+class MatchedWindowListResponse(BaseModel):
+    windows: List[MatchedWindowResponse]
+    duration_minutes: int
 
 
 class BookAppointmentRequest(BaseModel):
@@ -61,3 +83,29 @@ class BookAppointmentRequest(BaseModel):
     case_id: str
     patient_id: Optional[str] = None
 
+
+
+class CommonFreeWindowResponse(BaseModel):
+    start_time: datetime
+    end_time: datetime
+
+
+class CommonFreeWindowListResponse(BaseModel):
+    windows: List[CommonFreeWindowResponse]
+    user_ids: List[str]
+    duration_minutes: int
+
+
+class GroupParticipant(BaseModel):
+    user_id: str
+    # The requesting doctor and volunteer are added by the endpoint itself
+    role: Literal["interpreter", "observer", "patient"] = "interpreter"
+
+
+class GroupAppointmentRequest(BaseModel):
+    case_id: str
+    volunteer_id: str
+    start_time: datetime
+    duration_minutes: int
+    participants: List[GroupParticipant] = []
+    patient_id: Optional[str] = None
@@ -0,0 +1,243 @@
+"""
+Availability Index
+Per-volunteer sorted free intervals for searching open time without scanning slot rows
+"""
+
+from bisect import bisect_left, bisect_right
+from datetime import datetime, timedelta, timezone
+from typing import Dict, List, Optional, Tuple
+from uuid import UUID
+from sqlalchemy.ext.asyncio import AsyncSession
+from app.core.config import settings
+from app.core.database import SessionLocal
+from app.core.tasks import PeriodicTask
+from app.models.availability import AvailabilityBlock
+from app.repositories.consultation_repository import ConsultationRepository
+from app.repositories.scheduling_repository import SchedulingRepository
+from app.services.recurrence_service import RecurrenceService, InvalidRecurrenceError
+import asyncio
+import logging
+
+logger = logging.getLogger(__name__)
+
+# (starts, ends) as epoch seconds; sorted, non-overlapping, non-touching
+Intervals = Tuple[List[float], List[float]]
+
+
+def _add(intervals: Intervals, start: float, end: float) -> None:
+    """Union [start, end) into the interval list, merging neighbours"""
+    starts, ends = intervals
+    i = bisect_left(ends, start)
+    j = bisect_right(starts, end)
+    if i < j:
+        start = min(start, starts[i])
+        end = max(end, ends[j - 1])
+    starts[i:j] = [start]
+    ends[i:j] = [end]
+
+
+def _subtract(intervals: Intervals, start: float, end: float) -> None:
+    """Remove [start, end) from the interval list, splitting as needed"""
+    starts, ends = intervals
+    i = bisect_right(ends, start)
+    j = bisect_left(starts, end)
+    if i >= j:
+        return
+    new_starts, new_ends = [], []
+    if starts[i] < start:
+        new_starts.append(starts[i])
+        new_ends.append(start)
+    if ends[j - 1] > end:
+        new_starts.append(end)
+        new_ends.append(ends[j - 1])
+    starts[i:j] = new_starts
+    ends[i:j] = new_ends
+
+
+class AvailabilityIndex:
+    """
+    Free time per volunteer: active availability blocks (recurring ones
+    expanded up to the materialization horizon) minus live consultations
+
+    Queries are a bisect per volunteer plus a walk over matching intervals.
+    Writes in this worker update the index in place; a periodic rebuild
+    picks up writes made by other workers. All updates are idempotent, so
+    updates that arrive during a rebuild are replayed onto the new index.
+    """
+
+    def __init__(self):
+        self._free: Dict[UUID, Intervals] = {}
+        self._horizon: Optional[datetime] = None
+        self._pending: Optional[List[Tuple[str, UUID, object]]] = None
+        self._build_lock = asyncio.Lock()
+        self._task = PeriodicTask(
+            "availability-index-refresh",
+            self.refresh,
+            settings.AVAILABILITY_INDEX_REFRESH_SECONDS
+        )
+
+    @property
+    def built(self) -> bool:
+        return self._horizon is not None
+
+    @staticmethod
+    def _block_intervals(
+        block: AvailabilityBlock,
+        window_start: datetime,
+        window_end: datetime
+    ) -> List[Tuple[datetime, datetime]]:
+        if block.is_recurring and block.recurrence_pattern:
+            try:
+                occurrences = RecurrenceService.expand(
+                    block.start_time,
+                    block.end_time,
+                    block.timezone,
+                    block.recurrence_pattern,
+                    window_start - (block.end_time - block.start_time),
+                    window_end
+                )
+            except InvalidRecurrenceError:
+                return []
+        else:
+            occurrences = [(block.start_time, block.end_time)]
+        return [
+            (max(start, window_start), min(end, window_end))
+            for start, end in occurrences
+            if end > window_start and start < window_end
+        ]
+
+    async def _load(
+        self,
+        db: AsyncSession,
+        volunteer_id: Optional[UUID] = None
+    ) -> Tuple[Dict[UUID, Intervals], datetime]:
+        now = datetime.now(timezone.utc)
+        horizon = now + timedelta(days=settings.SLOT_MATERIALIZATION_HORIZON_DAYS)
+        repo = SchedulingRepository(db)
+
+        free: Dict[UUID, Intervals] = {}
+        for block in await repo.list_active_blocks(horizon, volunteer_id):
+            intervals = free.setdefault(block.volunteer_id, ([], []))
+            for start, end in self._block_intervals(block, now, horizon):
+                _add(intervals, start.timestamp(), end.timestamp())
+
+        # Consultations, not slot rows: bookings made without a slot (direct
+        # or claim-next consultations, group appointments) occupy time too
+        busy = await ConsultationRepository(db).list_busy_intervals(list(free), now, horizon)
+        for busy_volunteer, start, end in busy:
+            intervals = free.get(busy_volunteer)
+            if intervals is not None:
+                _subtract(intervals, start.timestamp(), end.timestamp())
+
+        return free, horizon
+
+    def _apply(self, free: Dict[UUID, Intervals], op: str, volunteer_id: UUID, arg) -> None:
+        if op == "replace":
+            if arg[0]:
+                free[volunteer_id] = arg
+            else:
+                free.pop(volunteer_id, None)
+            return
+        intervals = free.setdefault(volunteer_id, ([], []))
+        if op == "add":
+            _add(intervals, *arg)
+        else:
+            _subtract(intervals, *arg)
+
+    def _record(self, op: str, volunteer_id: UUID, arg) -> None:
+        self._apply(self._free, op, volunteer_id, arg)
+        if self._pending is not None:
+            self._pending.append((op, volunteer_id, arg))
+
+    async def rebuild(self, db: AsyncSession) -> None:
+        """Reload the whole index from the database"""
+        async with self._build_lock:
+            self._pending = []
+            try:
+                free, horizon = await self._load(db)
+                for op, volunteer_id, arg in self._pending:
+                    self._apply(free, op, volunteer_id, arg)
+                self._free, self._horizon = free, horizon
+            finally:
+                self._pending = None
+
+    async def refresh(self) -> None:
+        """Periodic rebuild on its own session"""
+        async with SessionLocal() as db:
+            await self.rebuild(db)
+
+    async def ensure_built(self, db: AsyncSession) -> None:
+        if not self.built:
+            await self.rebuild(db)
+
+    # Incremental updates
+    def add_block(self, block: AvailabilityBlock) -> None:
+        """A block was created in this worker"""
+        if not self.built:
+            return
+        now = datetime.now(timezone.utc)
+        for start, end in self._block_intervals(block, now, self._horizon):
+            self._record("add", block.volunteer_id, (start.timestamp(), end.timestamp()))
+
+    def reserve(self, volunteer_id: UUID, start: datetime, end: datetime) -> None:
+        """Time was booked"""
+        if self.built:
+            self._record("subtract", volunteer_id, (start.timestamp(), end.timestamp()))
+
+    async def refresh_volunteer(self, db: AsyncSession, volunteer_id: UUID) -> None:
+        """Recompute one volunteer after their blocks changed or a booking was cancelled"""
+        if not self.built:
+            return
+        free, _ = await self._load(db, volunteer_id)
+        self._record("replace", volunteer_id, free.get(volunteer_id, ([], [])))
+
+    # Queries
+    def free_windows(
+        self,
+        duration_minutes: int,
+        start: datetime,
+        end: datetime,
+        volunteer_ids: Optional[List[UUID]] = None,
+        limit: int = 50
+    ) -> List[Tuple[UUID, datetime, datetime]]:
+        """
+        Free windows of at least `duration_minutes` overlapping [start, end),
+        clipped to the range, earliest first, across all (or the given) volunteers
+        """
+        range_start = start.timestamp()
+        range_end = min(end, self._horizon).timestamp() if self._horizon else end.timestamp()
+        min_length = duration_minutes * 60
+
+        volunteers = volunteer_ids if volunteer_ids is not None else list(self._free)
+        windows = []
+        for volunteer_id in volunteers:
+            intervals = self._free.get(volunteer_id)
+            if not intervals:
+                continue
+            starts, ends = intervals
+            i = bisect_right(ends, range_start)
+            while i < len(starts) and starts[i] < range_end:
+                window_start = max(starts[i], range_start)
+                window_end = min(ends[i], range_end)
+                if window_end - window_start >= min_length:
+                    windows.append((window_start, window_end, volunteer_id))
+                i += 1
+
+        windows.sort(key=lambda window: (window[0], str(window[2])))
+        return [
+            (
+                volunteer_id,
+                datetime.fromtimestamp(window_start, timezone.utc),
+                datetime.fromtimestamp(window_end, timezone.utc),
+            )
+            for window_start, window_end, volunteer_id in windows[:limit]
+        ]
+
+    def start(self) -> None:
+        self._task.start()
+
+    async def stop(self) -> None:
+        await self._task.stop()
+
+
+availability_index = AvailabilityIndex()
@@ -0,0 +1,116 @@
+"""
+Case Priority Service
+Scores cases by urgency and waiting time; a background job keeps scores current
+"""
+
+from datetime import datetime, timezone
+from typing import Optional
+from sqlalchemy import case as sql_case, func, literal, update
+from app.core.config import settings
+from app.core.database import SessionLocal
+from app.core.tasks import PeriodicTask
+from app.core.unit_of_work import commit_or_flush
+from app.models.case import Case
+import logging
+
+logger = logging.getLogger(__name__)
+
+# urgency -> (base score, points per hour waiting, max age points)
+# Caps keep an old routine case below a fresh priority one, and an old
+# priority case below a fresh critical one
+URGENCY_WEIGHTS = {
+    "critical": (1000, 100, 1000),
+    "priority": (500, 20, 480),
+    "routine": (100, 5, 380),
+}
+
+
+def compute_priority_score(
+    urgency: str,
+    submitted_at: Optional[datetime],
+    created_at: Optional[datetime],
+    now: Optional[datetime] = None
+) -> int:
+    """
+    Score for one case, matching priority_score_expression(): the wait is
+    counted from coalesce(submitted_at, created_at), and no start at all
+    (a case not yet inserted) scores the base only
+    """
+    base, per_hour, cap = URGENCY_WEIGHTS.get(urgency, URGENCY_WEIGHTS["routine"])
+    waiting_since = submitted_at or created_at
+    if waiting_since is None:
+        return base
+    now = now or datetime.now(timezone.utc)
+    hours = max(0.0, (now - waiting_since).total_seconds() / 3600)
+    return base + min(int(hours * per_hour), cap)
+
+
+def priority_score_expression(now: datetime):
+    """SQL expression computing the same score for every row"""
+    hours = func.greatest(
+        func.extract("epoch", literal(now) - func.coalesce(Case.submitted_at, Case.created_at)) / 3600,
+        0
+    )
+
+    def escalated(weights):
+        base, per_hour, cap = weights
+        return base + func.least(func.floor(hours * per_hour), cap)
+
+    return sql_case(
+        *[
+            (Case.urgency == urgency, escalated(weights))
+            for urgency, weights in URGENCY_WEIGHTS.items()
+            if urgency != "routine"
+        ],
+        else_=escalated(URGENCY_WEIGHTS["routine"])
+    ).cast(Case.priority_score.type)
+
+
+class CasePriorityScorer:
+    """
+    Recomputes priority_score for open cases with one set-based UPDATE
+
+    Only rows whose score actually changed are written, so a run over a
+    quiet queue touches almost nothing.
+    """
+
+    def __init__(self):
+        self._task = PeriodicTask(
+            "case-priority-scoring",
+            self.run,
+            settings.CASE_PRIORITY_REFRESH_SECONDS,
+            run_immediately=True
+        )
+
+    async def rescore(self, db) -> int:
+        """Rescore submitted, unassigned cases; returns rows updated"""
+        score = priority_score_expression(datetime.now(timezone.utc))
+        stmt = (
+            update(Case)
+            .where(
+                Case.status == 'submitted',
+                Case.assigned_volunteer_id.is_(None),
+                Case.priority_score.is_distinct_from(score)
+            )
+            # Keep updated_at: rescoring is not an edit of the case
+            .values(priority_score=score, updated_at=Case.updated_at)
+            .execution_options(synchronize_session=False)
+        )
+        result = await db.execute(stmt)
+        await commit_or_flush(db)
+        return result.rowcount
+
+    async def run(self) -> None:
+        async with SessionLocal() as db:
+            updated = await self.rescore(db)
+        if updated:
+            logger.info(f"Case priority scoring: updated {updated} cases")
+
+    def start(self) -> None:
+        self._task.start()
+
+    async def stop(self) -> None:
+        await self._task.stop()
+
+
+case_priority_scorer = CasePriorityScorer()
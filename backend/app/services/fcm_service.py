@@ -10,13 +10,26 @@ import logging
 
 logger = logging.getLogger(__name__)
 
-try:
-    import firebase_admin
-    from firebase_admin import credentials, messaging
-    FIREBASE_AVAILABLE = True
-except ImportError:
-    FIREBASE_AVAILABLE = False
-    logger.warning("Firebase Admin SDK not installed. Push notifications disabled.")
+# firebase_admin is imported on first use, not at application startup
+firebase_admin = None
+credentials = None
+messaging = None
+FIREBASE_AVAILABLE: Optional[bool] = None
+
+
+def _load_firebase() -> bool:
+    """Import the Firebase Admin SDK once, on first use"""
+    global firebase_admin, credentials, messaging, FIREBASE_AVAILABLE
+    if FIREBASE_AVAILABLE is None:
+        try:
+            import firebase_admin as _firebase_admin
+            from firebase_admin import credentials as _credentials, messaging as _messaging
+            firebase_admin, credentials, messaging = _firebase_admin, _credentials, _messaging
+            FIREBASE_AVAILABLE = True
+        except ImportError:
+            FIREBASE_AVAILABLE = False
+            logger.warning("Firebase Admin SDK not installed. Push notifications disabled.")
+    return FIREBASE_AVAILABLE
 
 
 class FCMService:
@@ -27,7 +40,7 @@ class FCMService:
     @classmethod
     def initialize(cls) -> bool:
         """Initialize Firebase Admin SDK"""
-        if not FIREBASE_AVAILABLE:
+        if not _load_firebase():
             logger.error("Firebase Admin SDK not available")
             return False
         
@@ -0,0 +1,220 @@
+"""
+Free/Busy Service
+Per-user, per-day bitsets of free time for multi-party scheduling
+"""
+
+from datetime import date, datetime, timedelta, timezone
+from typing import Dict, Iterator, List, Optional, Tuple
+from uuid import UUID
+from sqlalchemy.ext.asyncio import AsyncSession
+from app.core.cache import TTLCache
+from app.core.config import settings
+from app.repositories.consultation_repository import ConsultationRepository
+from app.repositories.scheduling_repository import SchedulingRepository
+from app.repositories.user_repository import UserRepository
+from app.services.recurrence_service import RecurrenceService, InvalidRecurrenceError
+import math
+
+GRANULARITY = timedelta(minutes=settings.FREE_BUSY_GRANULARITY_MINUTES)
+SLOTS_PER_DAY = (24 * 60) // settings.FREE_BUSY_GRANULARITY_MINUTES
+FULL_DAY = (1 << SLOTS_PER_DAY) - 1
+
+Interval = Tuple[datetime, datetime]
+
+
+def _day_start(day: date) -> datetime:
+    return datetime(day.year, day.month, day.day, tzinfo=timezone.utc)
+
+
+def _slot_index(day_start: datetime, moment: datetime, round_up: bool) -> int:
+    """Slot boundary index of `moment` within the day, clamped to [0, SLOTS_PER_DAY]"""
+    offset = (moment - day_start) / GRANULARITY
+    index = math.ceil(offset) if round_up else math.floor(offset)
+    return max(0, min(SLOTS_PER_DAY, index))
+
+
+def _range_mask(first: int, last: int) -> int:
+    return ((1 << (last - first)) - 1) << first if last > first else 0
+
+
+def free_mask(day_start: datetime, intervals: List[Interval]) -> int:
+    """Bits for slots lying entirely inside any of the intervals"""
+    mask = 0
+    for start, end in intervals:
+        mask |= _range_mask(_slot_index(day_start, start, True), _slot_index(day_start, end, False))
+    return mask
+
+
+def busy_mask(day_start: datetime, intervals: List[Interval]) -> int:
+    """Bits for slots touched by any of the intervals"""
+    mask = 0
+    for start, end in intervals:
+        mask |= _range_mask(_slot_index(day_start, start, False), _slot_index(day_start, end, True))
+    return mask
+
+
+def iter_runs(mask: int) -> Iterator[Tuple[int, int]]:
+    """(first slot, length) of each run of set bits, lowest first"""
+    position = 0
+    while mask:
+        gap = (mask & -mask).bit_length() - 1
+        mask >>= gap
+        position += gap
+        inverted = ~mask
+        length = (inverted & -inverted).bit_length() - 1
+        yield position, length
+        mask >>= length
+        position += length
+
+
+def is_aligned(moment: datetime) -> bool:
+    """Whether the instant falls on a slot boundary"""
+    utc = moment.astimezone(timezone.utc)
+    return (utc - _day_start(utc.date())) % GRANULARITY == timedelta(0)
+
+
+def days_between(start: datetime, end: datetime) -> List[date]:
+    """UTC days touched by [start, end)"""
+    first = start.astimezone(timezone.utc).date()
+    last = (end.astimezone(timezone.utc) - timedelta(microseconds=1)).date()
+    return [first + timedelta(days=i) for i in range((last - first).days + 1)]
+
+
+class FreeBusyService:
+    """
+    Free time as one SLOTS_PER_DAY-bit integer per user per UTC day
+
+    Volunteers are free inside their availability blocks; everyone else is
+    free unless busy. Live consultations a user takes part in (as volunteer,
+    requesting doctor or participant) clear bits. Finding time for N people
+    is then N-1 ANDs per day plus a scan of set-bit runs. Bitsets are cached
+    briefly and dropped for the people and days a booking touches.
+    """
+
+    def __init__(self):
+        self._cache = TTLCache(
+            max_size=settings.FREE_BUSY_CACHE_MAX_SIZE,
+            ttl_seconds=settings.FREE_BUSY_CACHE_SECONDS
+        )
+
+    def invalidate(self, user_ids: List[UUID], start: datetime, end: datetime) -> None:
+        for day in days_between(start, end):
+            for user_id in user_ids:
+                self._cache.delete((user_id, day))
+
+    def invalidate_user(self, user_id: UUID) -> None:
+        """Drop every cached day for a user (their availability blocks changed)"""
+        self._cache.delete_where(lambda key: key[0] == user_id)
+
+    async def _load(
+        self,
+        db: AsyncSession,
+        roles: Dict[UUID, str],
+        days: List[date]
+    ) -> Dict[UUID, List[int]]:
+        range_start = _day_start(days[0])
+        range_end = _day_start(days[-1]) + timedelta(days=1)
+        user_ids = list(roles)
+        volunteer_ids = [user_id for user_id, role in roles.items() if role == 'volunteer_physician']
+
+        free: Dict[UUID, List[Interval]] = {user_id: [] for user_id in volunteer_ids}
+        for block in await SchedulingRepository(db).list_blocks_for_volunteers(volunteer_ids, range_start, range_end):
+            if block.is_recurring and block.recurrence_pattern:
+                try:
+                    free[block.volunteer_id].extend(RecurrenceService.expand(
+                        block.start_time,
+                        block.end_time,
+                        block.timezone,
+                        block.recurrence_pattern,
+                        range_start - (block.end_time - block.start_time),
+                        range_end
+                    ))
+                except InvalidRecurrenceError:
+                    continue
+            else:
+                free[block.volunteer_id].append((block.start_time, block.end_time))
+
+        busy: Dict[UUID, List[Interval]] = {user_id: [] for user_id in user_ids}
+        for user_id, start, end in await ConsultationRepository(db).list_busy_intervals(user_ids, range_start, range_end):
+            busy[user_id].append((start, end))
+
+        masks = {}
+        for user_id in user_ids:
+            user_masks = []
+            for day in days:
+                day_start = _day_start(day)
+                mask = free_mask(day_start, free[user_id]) if user_id in free else FULL_DAY
+                mask &= ~busy_mask(day_start, busy[user_id])
+                user_masks.append(mask)
+            masks[user_id] = user_masks
+        return masks
+
+    async def day_masks(
+        self,
+        db: AsyncSession,
+        roles: Dict[UUID, str],
+        days: List[date],
+        use_cache: bool = True
+    ) -> Dict[UUID, List[int]]:
+        """Bitsets per user for each day; loads only users with a cache miss"""
+        masks: Dict[UUID, List[int]] = {}
+        missing: Dict[UUID, str] = {}
+        for user_id, role in roles.items():
+            cached = [self._cache.get((user_id, day)) for day in days] if use_cache else [None]
+            if any(mask is None for mask in cached):
+                missing[user_id] = role
+            else:
+                masks[user_id] = cached
+
+        if missing:
+            loaded = await self._load(db, missing, days)
+            for user_id, user_masks in loaded.items():
+                for day, mask in zip(days, user_masks):
+                    self._cache.set((user_id, day), mask)
+            masks.update(loaded)
+        return masks
+
+    async def common_free_windows(
+        self,
+        db: AsyncSession,
+        user_ids: List[UUID],
+        start: datetime,
+        end: datetime,
+        duration_minutes: int,
+        limit: int = 50,
+        use_cache: bool = True
+    ) -> List[Interval]:
+        """
+        Windows of at least duration_minutes inside [start, end) when every
+        user is free, earliest first. Raises LookupError for unknown users
+        """
+        roles = await UserRepository(db).get_roles(user_ids)
+        unknown = set(user_ids) - set(roles)
+        if unknown:
+            raise LookupError(", ".join(sorted(str(user_id) for user_id in unknown)))
+
+        days = days_between(start, end)
+        masks = await self.day_masks(db, roles, days, use_cache=use_cache)
+
+        windows: List[Interval] = []
+        for index, day in enumerate(days):
+            day_start = _day_start(day)
+            combined = free_mask(day_start, [(start, end)])
+            for user_masks in masks.values():
+                combined &= user_masks[index]
+                if not combined:
+                    break
+            for first, length in iter_runs(combined):
+                window_start = day_start + first * GRANULARITY
+                window_end = window_start + length * GRANULARITY
+                # Join runs that continue across midnight
+                if windows and windows[-1][1] == window_start:
+                    windows[-1] = (windows[-1][0], window_end)
+                else:
+                    windows.append((window_start, window_end))
+
+        min_length = timedelta(minutes=duration_minutes)
+        return [window for window in windows if window[1] - window[0] >= min_length][:limit]
+
+
+free_busy = FreeBusyService()
@@ -3,22 +3,31 @@ Image Quality Service
 Analyzes medical images for quality issues
 """
 
-try:
-    import cv2
-    import numpy as np
-    CV2_AVAILABLE = True
-except (ImportError, AttributeError):
-    CV2_AVAILABLE = False
-    cv2 = None
-    np = None
-
-from PIL import Image
 from typing import List, Tuple, Optional
 import io
 import logging
 
 logger = logging.getLogger(__name__)
 
+# cv2/numpy are imported on first analysis, not at application startup
+cv2 = None
+np = None
+CV2_AVAILABLE: Optional[bool] = None
+
+
+def _load_cv2() -> bool:
+    """Import OpenCV and numpy once, on first use"""
+    global cv2, np, CV2_AVAILABLE
+    if CV2_AVAILABLE is None:
+        try:
+            import cv2 as _cv2
+            import numpy as _np
+            cv2, np = _cv2, _np
+            CV2_AVAILABLE = True
+        except (ImportError, AttributeError):
+            CV2_AVAILABLE = False
+    return CV2_AVAILABLE
+
 
 class ImageQualityService:
     """Analyze image quality for medical images"""
@@ -31,9 +40,10 @@ class ImageQualityService:
         quality_score: 0.0 to 1.0 (1.0 = perfect quality)
         issues: List of quality issues found
         """
-        if not CV2_AVAILABLE:
+        if not _load_cv2():
             logger.warning("OpenCV not available, using basic image analysis")
             try:
+                from PIL import Image
                 img = Image.open(io.BytesIO(image_data))
                 width, height = img.size
                 score = 0.7 if width >= 512 and height >= 512 else 0.5
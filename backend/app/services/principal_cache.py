@@ -0,0 +1,148 @@
+"""
+Principal Cache Service
+Caches resolved users for get_current_user so authenticated requests skip the users lookup
+"""
+
+from typing import Optional, Tuple
+from app.core.cache import TTLCache, get_redis
+from app.core.config import settings
+from app.schemas.auth import UserResponse
+import logging
+
+logger = logging.getLogger(__name__)
+
+
+class PrincipalCache:
+    """
+    Two-tier principal cache keyed by user id and token iat
+
+    The local tier lives in each worker. The optional Redis tier is shared, so a
+    principal resolved by one worker is reused by the others. Invalidation drops
+    the Redis entry immediately; other workers' local entries expire within
+    PRINCIPAL_CACHE_TTL_SECONDS.
+
+    A request that loaded a principal before an invalidation must not write
+    it back afterwards. Callers take a snapshot() before the users lookup
+    and hand it to set(), which skips the write if the user was invalidated
+    in between: locally by invalidation sequence number, in Redis by a
+    compare-and-set on a per-user version key.
+    """
+
+    def __init__(self):
+        self._local = TTLCache(
+            max_size=settings.PRINCIPAL_CACHE_MAX_SIZE,
+            ttl_seconds=settings.PRINCIPAL_CACHE_TTL_SECONDS
+        )
+        # user id -> sequence number of its last local invalidation; bounded
+        # like the entries it guards
+        self._invalidated = TTLCache(
+            max_size=settings.PRINCIPAL_CACHE_MAX_SIZE,
+            ttl_seconds=settings.PRINCIPAL_CACHE_TTL_SECONDS
+        )
+        self._sequence = 0
+
+    @staticmethod
+    def _redis_key(user_id: str) -> str:
+        return f"principal:{user_id}"
+
+    @staticmethod
+    def _version_key(user_id: str) -> str:
+        return f"principal-version:{user_id}"
+
+    async def snapshot(self, user_id: str) -> Tuple[int, Optional[str]]:
+        """Invalidation state to pass to set(); take it before loading the user"""
+        version = None
+        redis = get_redis() if settings.PRINCIPAL_CACHE_USE_REDIS else None
+        if redis is not None:
+            try:
+                version = await redis.get(self._version_key(user_id))
+            except Exception as e:
+                logger.warning(f"Principal cache Redis version lookup failed: {e}")
+        return self._sequence, version
+
+    async def get(self, user_id: str, iat) -> Optional[UserResponse]:
+        """Get cached principal for a user id and token iat"""
+        principal = self._local.get((user_id, iat))
+        if principal is not None:
+            return principal
+
+        if not settings.PRINCIPAL_CACHE_USE_REDIS:
+            return None
+
+        redis = get_redis()
+        if redis is None:
+            return None
+
+        try:
+            raw = await redis.hget(self._redis_key(user_id), str(iat))
+        except Exception as e:
+            logger.warning(f"Principal cache Redis lookup failed: {e}")
+            return None
+
+        if raw is None:
+            return None
+
+        principal = UserResponse.model_validate_json(raw)
+        self._local.set((user_id, iat), principal)
+        return principal
+
+    async def set(self, user_id: str, iat, principal: UserResponse, snapshot: Tuple[int, Optional[str]]) -> None:
+        """Cache a resolved principal unless the user was invalidated since `snapshot`"""
+        sequence, version = snapshot
+        invalidated = self._invalidated.get(user_id)
+        if invalidated is not None and invalidated > sequence:
+            return
+        self._local.set((user_id, iat), principal)
+
+        if not settings.PRINCIPAL_CACHE_USE_REDIS:
+            return
+
+        redis = get_redis()
+        if redis is None:
+            return
+
+        from redis.exceptions import WatchError
+
+        key = self._redis_key(user_id)
+        version_key = self._version_key(user_id)
+        try:
+            async with redis.pipeline(transaction=True) as pipe:
+                # WATCH aborts the write if invalidate() bumps the version
+                # between this check and EXEC
+                await pipe.watch(version_key)
+                if await pipe.get(version_key) != version:
+                    return
+                pipe.multi()
+                pipe.hset(key, str(iat), principal.model_dump_json())
+                pipe.expire(key, settings.PRINCIPAL_CACHE_TTL_SECONDS)
+                await pipe.execute()
+        except WatchError:
+            pass
+        except Exception as e:
+            logger.warning(f"Principal cache Redis write failed: {e}")
+
+    async def invalidate(self, user_id: str) -> None:
+        """Drop every cached principal for a user (deactivation, role change)"""
+        self._sequence += 1
+        self._invalidated.set(user_id, self._sequence)
+        # Entries are keyed (user_id, iat); one pass drops every token's entry
+        self._local.delete_where(lambda key: key[0] == user_id)
+
+        if not settings.PRINCIPAL_CACHE_USE_REDIS:
+            return
+
+        redis = get_redis()
+        if redis is None:
+            return
+
+        try:
+            async with redis.pipeline(transaction=True) as pipe:
+                pipe.incr(self._version_key(user_id))
+                pipe.expire(self._version_key(user_id), settings.PRINCIPAL_CACHE_TTL_SECONDS)
+                pipe.delete(self._redis_key(user_id))
+                await pipe.execute()
+        except Exception as e:
+            logger.warning(f"Principal cache Redis invalidation failed: {e}")
+
+
+principal_cache = PrincipalCache()
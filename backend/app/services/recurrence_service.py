@@ -0,0 +1,147 @@
+"""
+Recurrence Service
+Expands recurring availability blocks into concrete occurrences (RRULE semantics)
+"""
+
+from datetime import datetime, timedelta, timezone
+from typing import Any, Dict, List, Tuple
+from zoneinfo import ZoneInfo, ZoneInfoNotFoundError
+from dateutil import rrule
+
+WEEKDAYS = {
+    "MO": rrule.MO,
+    "TU": rrule.TU,
+    "WE": rrule.WE,
+    "TH": rrule.TH,
+    "FR": rrule.FR,
+    "SA": rrule.SA,
+    "SU": rrule.SU,
+}
+
+FREQUENCIES = {
+    "DAILY": rrule.DAILY,
+    "WEEKLY": rrule.WEEKLY,
+    "MONTHLY": rrule.MONTHLY,
+}
+
+
+class InvalidRecurrenceError(ValueError):
+    """Raised when a recurrence pattern cannot be interpreted"""
+
+
+class RecurrenceService:
+    """
+    Interprets AvailabilityBlock.recurrence_pattern
+
+    A pattern is either {"rrule": "FREQ=WEEKLY;BYDAY=MO"} or a dict such as
+    {"freq": "weekly", "interval": 1, "byweekday": ["MO", "WE"],
+    "until": "2026-06-30", "count": 10}. The block's own start/end is the
+    first occurrence. Rules are evaluated in the block's local wall time, so
+    a Monday 14:00-16:00 block in Europe/London stays 14:00-16:00 local on
+    both sides of a DST change.
+    """
+
+    @staticmethod
+    def get_zone(tz_name: str) -> ZoneInfo:
+        try:
+            return ZoneInfo(tz_name)
+        except (ZoneInfoNotFoundError, ValueError):
+            raise InvalidRecurrenceError(f"Unknown timezone: {tz_name}")
+
+    @classmethod
+    def build_rule(cls, pattern: Dict[str, Any], dtstart: datetime) -> rrule.rrule:
+        """Build a dateutil rule; dtstart is the first occurrence in naive local time"""
+        if not isinstance(pattern, dict):
+            raise InvalidRecurrenceError("recurrence_pattern must be an object")
+
+        if "rrule" in pattern:
+            try:
+                return rrule.rrulestr(str(pattern["rrule"]), dtstart=dtstart)
+            except (ValueError, TypeError) as e:
+                raise InvalidRecurrenceError(f"Invalid rrule: {e}")
+
+        freq = FREQUENCIES.get(str(pattern.get("freq", "")).upper())
+        if freq is None:
+            raise InvalidRecurrenceError("freq must be one of daily, weekly, monthly")
+
+        kwargs: Dict[str, Any] = {"dtstart": dtstart}
+        try:
+            kwargs["interval"] = int(pattern.get("interval", 1))
+            if kwargs["interval"] < 1:
+                raise InvalidRecurrenceError("interval must be at least 1")
+            if pattern.get("byweekday"):
+                kwargs["byweekday"] = [WEEKDAYS[str(day).upper()[:2]] for day in pattern["byweekday"]]
+            if pattern.get("bymonthday"):
+                kwargs["bymonthday"] = [int(day) for day in pattern["bymonthday"]]
+            if pattern.get("count") is not None:
+                kwargs["count"] = int(pattern["count"])
+            if pattern.get("until"):
+                # Inclusive local date/time
+                until = datetime.fromisoformat(str(pattern["until"]))
+                if until.tzinfo is not None:
+                    until = until.replace(tzinfo=None)
+                if until.time() == datetime.min.time():
+                    until = until + timedelta(days=1) - timedelta(microseconds=1)
+                kwargs["until"] = until
+        except (KeyError, ValueError, TypeError) as e:
+            raise InvalidRecurrenceError(f"Invalid recurrence_pattern: {e}")
+
+        return rrule.rrule(freq, **kwargs)
+
+    @classmethod
+    def validate(cls, pattern: Dict[str, Any], start_time: datetime, tz_name: str) -> None:
+        """Raise InvalidRecurrenceError if the pattern cannot be expanded"""
+        zone = cls.get_zone(tz_name)
+        cls.build_rule(pattern, cls._to_local(start_time, zone))
+
+    @staticmethod
+    def _to_local(moment: datetime, zone: ZoneInfo) -> datetime:
+        """Aware instant -> naive local wall time"""
+        if moment.tzinfo is None:
+            moment = moment.replace(tzinfo=timezone.utc)
+        return moment.astimezone(zone).replace(tzinfo=None)
+
+    @staticmethod
+    def _to_utc(local: datetime, zone: ZoneInfo) -> datetime:
+        """
+        Naive local wall time -> aware UTC
+        Ambiguous times (DST fall-back) take the first instance; non-existent
+        times (spring-forward gap) resolve with the pre-transition offset,
+        i.e. they land one hour later in wall time
+        """
+        return local.replace(tzinfo=zone, fold=0).astimezone(timezone.utc)
+
+    @classmethod
+    def expand(
+        cls,
+        start_time: datetime,
+        end_time: datetime,
+        tz_name: str,
+        pattern: Dict[str, Any],
+        window_start: datetime,
+        window_end: datetime
+    ) -> List[Tuple[datetime, datetime]]:
+        """
+        Occurrences whose start falls in [window_start, window_end), as UTC
+        (start, end) pairs. Consecutive windows never repeat an occurrence
+        """
+        zone = cls.get_zone(tz_name)
+        local_start = cls._to_local(start_time, zone)
+        # Duration is kept in wall time so DST does not stretch the block
+        local_duration = cls._to_local(end_time, zone) - local_start
+        rule = cls.build_rule(pattern, local_start)
+
+        # Pad the local search range by a day to cover offset differences,
+        # then filter exactly in UTC
+        search_from = cls._to_local(window_start, zone) - timedelta(days=1)
+        search_to = cls._to_local(window_end, zone) + timedelta(days=1)
+
+        occurrences = []
+        for occurrence in rule.between(search_from, search_to, inc=True):
+            occurrence_start = cls._to_utc(occurrence, zone)
+            if not window_start <= occurrence_start < window_end:
+                continue
+            occurrence_end = cls._to_utc(occurrence + local_duration, zone)
+            if occurrence_end > occurrence_start:
+                occurrences.append((occurrence_start, occurrence_end))
+        return occurrences
@@ -3,9 +3,7 @@ AWS S3 Service
 Handles file uploads to S3
 """
 
-import boto3
-from botocore.exceptions import ClientError
-from typing import Optional, BinaryIO
+from typing import Any, BinaryIO, Dict, List, Optional
 from app.core.config import settings
 import logging
 
@@ -16,11 +14,19 @@ class S3Service:
     def __init__(self):
         self.s3_client = None
         if settings.AWS_ACCESS_KEY_ID and settings.AWS_SECRET_ACCESS_KEY:
+            import boto3  # Deferred: boto3 is slow to import
+            from botocore.config import Config
+            client_args = {}
+            if settings.S3_ENDPOINT_URL:
+                # S3-compatible stand-ins (MinIO, LocalStack) serve buckets by path
+                client_args['endpoint_url'] = settings.S3_ENDPOINT_URL
+                client_args['config'] = Config(signature_version='s3v4', s3={'addressing_style': 'path'})
             self.s3_client = boto3.client(
                 's3',
                 aws_access_key_id=settings.AWS_ACCESS_KEY_ID,
                 aws_secret_access_key=settings.AWS_SECRET_ACCESS_KEY,
-                region_name=settings.AWS_REGION
+                region_name=settings.AWS_REGION,
+                **client_args
             )
         else:
             logger.warning("AWS credentials not configured. S3 operations will be disabled.")
@@ -54,7 +60,7 @@ class S3Service:
             )
             logger.info(f"File uploaded to S3: s3://{bucket}/{s3_key}")
             return True
-        except ClientError as e:
+        except Exception as e:
             logger.error(f"Error uploading to S3: {e}")
             return False
     
@@ -76,7 +82,7 @@ class S3Service:
                 ExpiresIn=expiration
             )
             return url
-        except ClientError as e:
+        except Exception as e:
             logger.error(f"Error generating presigned URL: {e}")
             return None
     
@@ -94,7 +100,157 @@ class S3Service:
             self.s3_client.delete_object(Bucket=bucket, Key=s3_key)
             logger.info(f"File deleted from S3: s3://{bucket}/{s3_key}")
             return True
-        except ClientError as e:
+        except Exception as e:
             logger.error(f"Error deleting from S3: {e}")
             return False
 
+    
+    # Multipart uploads
+    # Unlike the helpers above these raise on failure: a resumable upload
+    # must not record progress for bytes that never reached S3
+    def create_multipart_upload(
+        self,
+        s3_key: str,
+        bucket: Optional[str] = None,
+        content_type: Optional[str] = None
+    ) -> str:
+        """Start a multipart upload; returns the S3 UploadId"""
+        bucket = bucket or settings.S3_BUCKET_NAME
+        extra_args = self._encryption_args()
+        if content_type:
+            extra_args['ContentType'] = content_type
+        response = self._client().create_multipart_upload(Bucket=bucket, Key=s3_key, **extra_args)
+        return response['UploadId']
+    
+    def upload_part(
+        self,
+        s3_key: str,
+        upload_id: str,
+        part_number: int,
+        data: bytes,
+        bucket: Optional[str] = None
+    ) -> str:
+        """Upload one part; returns its ETag"""
+        response = self._client().upload_part(
+            Bucket=bucket or settings.S3_BUCKET_NAME,
+            Key=s3_key,
+            UploadId=upload_id,
+            PartNumber=part_number,
+            Body=data
+        )
+        return response['ETag']
+    
+    def upload_part_copy(
+        self,
+        s3_key: str,
+        upload_id: str,
+        part_number: int,
+        source_key: str,
+        first_byte: int,
+        last_byte: int,
+        bucket: Optional[str] = None,
+        source_bucket: Optional[str] = None
+    ) -> str:
+        """Copy a byte range of an existing object in as one part; returns its ETag"""
+        bucket = bucket or settings.S3_BUCKET_NAME
+        source_bucket = source_bucket or bucket
+        response = self._client().upload_part_copy(
+            Bucket=bucket,
+            Key=s3_key,
+            UploadId=upload_id,
+            PartNumber=part_number,
+            CopySource={'Bucket': source_bucket, 'Key': source_key},
+            CopySourceRange=f"bytes={first_byte}-{last_byte}"
+        )
+        return response['CopyPartResult']['ETag']
+    
+    def presign_upload_part(
+        self,
+        s3_key: str,
+        upload_id: str,
+        part_number: int,
+        bucket: Optional[str] = None,
+        expiration: Optional[int] = None
+    ) -> str:
+        """URL the client can PUT one part to directly; no request is made here"""
+        return self._client().generate_presigned_url(
+            'upload_part',
+            Params={
+                'Bucket': bucket or settings.S3_BUCKET_NAME,
+                'Key': s3_key,
+                'UploadId': upload_id,
+                'PartNumber': part_number
+            },
+            ExpiresIn=expiration or settings.S3_PRESIGNED_URL_EXPIRATION
+        )
+    
+    def get_object_size(self, s3_key: str, bucket: Optional[str] = None) -> int:
+        response = self._client().head_object(Bucket=bucket or settings.S3_BUCKET_NAME, Key=s3_key)
+        return response['ContentLength']
+    
+    def complete_multipart_upload(
+        self,
+        s3_key: str,
+        upload_id: str,
+        parts: List[Dict[str, Any]],
+        bucket: Optional[str] = None
+    ) -> None:
+        bucket = bucket or settings.S3_BUCKET_NAME
+        self._client().complete_multipart_upload(
+            Bucket=bucket,
+            Key=s3_key,
+            UploadId=upload_id,
+            MultipartUpload={'Parts': parts}
+        )
+        logger.info(f"Multipart upload completed: s3://{bucket}/{s3_key}")
+    
+    def abort_multipart_upload(self, s3_key: str, upload_id: str, bucket: Optional[str] = None) -> None:
+        self._client().abort_multipart_upload(
+            Bucket=bucket or settings.S3_BUCKET_NAME,
+            Key=s3_key,
+            UploadId=upload_id
+        )
+    
+    def put_bytes(self, s3_key: str, data: bytes, bucket: Optional[str] = None) -> None:
+        """Store a small object"""
+        self._client().put_object(
+            Bucket=bucket or settings.S3_BUCKET_NAME,
+            Key=s3_key,
+            Body=data,
+            **self._encryption_args()
+        )
+    
+    def get_bytes(
+        self,
+        s3_key: str,
+        bucket: Optional[str] = None,
+        first_byte: Optional[int] = None,
+        last_byte: Optional[int] = None
+    ) -> bytes:
+        """Read a small object, or an inclusive byte range of one, into memory"""
+        params = {'Bucket': bucket or settings.S3_BUCKET_NAME, 'Key': s3_key}
+        if first_byte is not None:
+            params['Range'] = f"bytes={first_byte}-{last_byte}"
+        response = self._client().get_object(**params)
+        return response['Body'].read()
+    
+    @staticmethod
+    def _encryption_args() -> Dict[str, Any]:
+        if settings.S3_SERVER_SIDE_ENCRYPTION:
+            return {'ServerSideEncryption': settings.S3_SERVER_SIDE_ENCRYPTION}
+        return {}
+    
+    @property
+    def enabled(self) -> bool:
+        return self.s3_client is not None
+    
+    def close(self) -> None:
+        """Release the client's connection pool"""
+        if self.s3_client:
+            self.s3_client.close()
+            self.s3_client = None
+    
+    def _client(self):
+        if not self.s3_client:
+            raise RuntimeError("S3 client not initialized")
+        return self.s3_client
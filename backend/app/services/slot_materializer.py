@@ -0,0 +1,147 @@
+"""
+Slot Materializer
+Keeps appointment slots for recurring availability up to a rolling horizon
+"""
+
+from datetime import datetime, timedelta, timezone
+from typing import List, Tuple
+from app.core.config import settings
+from app.core.database import SessionLocal
+from app.core.tasks import PeriodicTask
+from app.core.unit_of_work import UnitOfWork
+from app.models.availability import AvailabilityBlock, AppointmentSlot
+from app.repositories.consultation_repository import ConsultationRepository
+from app.repositories.scheduling_repository import SchedulingRepository
+from app.services.recurrence_service import RecurrenceService, InvalidRecurrenceError
+import logging
+
+logger = logging.getLogger(__name__)
+
+
+class SlotMaterializer:
+    """
+    Extends recurring blocks' slots to now + SLOT_MATERIALIZATION_HORIZON_DAYS
+
+    Each run only generates occurrences past a block's materialized_until, so
+    work is incremental, and deletes unbooked slots that ended more than
+    SLOT_RETENTION_DAYS ago so appointment_slots stays bounded.
+    """
+
+    def __init__(self):
+        self._task = PeriodicTask(
+            "slot-materialization",
+            self.run,
+            settings.SLOT_MATERIALIZATION_INTERVAL_SECONDS,
+            run_immediately=True
+        )
+
+    @staticmethod
+    def horizon() -> datetime:
+        return datetime.now(timezone.utc) + timedelta(days=settings.SLOT_MATERIALIZATION_HORIZON_DAYS)
+
+    async def materialize_block(
+        self,
+        repo: SchedulingRepository,
+        block: AvailabilityBlock,
+        horizon: datetime
+    ) -> List[AppointmentSlot]:
+        """
+        Create slots for a block's occurrences between materialized_until and
+        horizon. Time the volunteer is already booked for (group appointments
+        made ahead of materialization, slotless consultations) gets no slot
+        """
+        now = datetime.now(timezone.utc)
+        # Reach back one occurrence length (as reconcile_block does) so an
+        # occurrence already in progress still gets its remaining slots
+        window_start = max(
+            block.materialized_until or block.start_time,
+            now - (block.end_time - block.start_time)
+        )
+        slots = []
+        if window_start < horizon:
+            occurrences = RecurrenceService.expand(
+                block.start_time,
+                block.end_time,
+                block.timezone,
+                block.recurrence_pattern,
+                window_start,
+                horizon
+            )
+            busy = await ConsultationRepository(repo.db).list_busy_intervals(
+                [block.volunteer_id], window_start, horizon
+            )
+            slots = await repo.create_slots(
+                block, occurrences, [(start, end) for _, start, end in busy], since=now
+            )
+        await repo.set_materialized_until(block, horizon)
+        return slots
+
+    async def reconcile_block(
+        self,
+        repo: SchedulingRepository,
+        block: AvailabilityBlock
+    ) -> Tuple[int, int]:
+        """
+        Bring an edited block's future slots in line with its new shape
+        Raises BookedSlotConflictError if booked slots would be orphaned
+        Returns (cancelled, created)
+        """
+        now = datetime.now(timezone.utc)
+        if block.is_recurring:
+            horizon = self.horizon()
+            # Reach back one occurrence length so an in-progress occurrence keeps its later slots
+            windows = RecurrenceService.expand(
+                block.start_time,
+                block.end_time,
+                block.timezone,
+                block.recurrence_pattern,
+                now - (block.end_time - block.start_time),
+                horizon
+            )
+            result = await repo.reconcile_block_slots(block, windows, since=now)
+            await repo.set_materialized_until(block, horizon)
+        else:
+            result = await repo.reconcile_block_slots(block, [(block.start_time, block.end_time)], since=now)
+            await repo.set_materialized_until(block, None)
+        return result
+
+    async def run(self) -> None:
+        """Extend every recurring block that is short of the horizon, then prune"""
+        horizon = self.horizon()
+        extended = 0
+
+        async with SessionLocal() as db:
+            repo = SchedulingRepository(db)
+
+            while True:
+                async with UnitOfWork(db):
+                    blocks = await repo.lock_blocks_to_materialize(
+                        horizon, limit=settings.SLOT_MATERIALIZATION_BATCH_SIZE
+                    )
+                    for block in blocks:
+                        try:
+                            await self.materialize_block(repo, block, horizon)
+                        except InvalidRecurrenceError as e:
+                            # Skip until the next horizon instead of retrying every run
+                            logger.warning(f"Availability block {block.id} has an invalid recurrence: {e}")
+                            await repo.set_materialized_until(block, horizon)
+                extended += len(blocks)
+                if len(blocks) < settings.SLOT_MATERIALIZATION_BATCH_SIZE:
+                    break
+
+            async with UnitOfWork(db):
+                pruned = await repo.prune_past_slots(
+                    datetime.now(timezone.utc) - timedelta(days=settings.SLOT_RETENTION_DAYS)
+                )
+
+        if extended or pruned:
+            logger.info(f"Slot materialization: extended {extended} blocks, pruned {pruned} slots")
+
+    def start(self) -> None:
+        self._task.start()
+
+    async def stop(self) -> None:
+        await self._task.stop()
+
+
+slot_materializer = SlotMaterializer()
@@ -0,0 +1,317 @@
+"""
+TUS Upload Service
+Streams TUS PATCH bodies into S3 multipart uploads with memory bounded by the part size
+"""
+
+from datetime import datetime, timezone
+from typing import AsyncIterator, List, Optional, Tuple
+from fastapi.concurrency import run_in_threadpool
+from starlette.requests import ClientDisconnect
+from app.core.config import settings
+from app.core.database import SessionLocal
+from app.core.services import services
+from app.core.tasks import PeriodicTask
+from app.core.unit_of_work import UnitOfWork
+from app.models.upload_session import UploadSession
+from app.repositories.file_repository import FileRepository
+from app.repositories.upload_session_repository import UploadSessionRepository
+from app.services.s3_service import S3Service
+import base64
+import binascii
+import hashlib
+import logging
+
+logger = logging.getLogger(__name__)
+
+# Smallest part S3 accepts other than the last one
+S3_MIN_PART_SIZE = 5 * 1024 * 1024
+
+# Upload-Checksum algorithms (TUS checksum extension)
+CHECKSUM_ALGORITHMS = ("sha1", "sha256", "md5")
+
+
+class UploadStorageError(Exception):
+    """S3 rejected or failed a multipart operation"""
+
+
+class UploadTooLargeError(Exception):
+    """The request body runs past Upload-Length"""
+
+
+class ChecksumMismatchError(Exception):
+    """The request body does not match its Upload-Checksum header"""
+
+
+def parse_checksum(header: str) -> Tuple[str, bytes]:
+    """
+    Parse an Upload-Checksum header ("<algorithm> <base64 digest>").
+    Raises ValueError for unsupported algorithms or malformed digests
+    """
+    algorithm, _, encoded = header.strip().partition(" ")
+    algorithm = algorithm.lower()
+    if algorithm not in CHECKSUM_ALGORITHMS:
+        raise ValueError(f"Unsupported checksum algorithm '{algorithm}'")
+    try:
+        digest = base64.b64decode(encoded.strip(), validate=True)
+    except (binascii.Error, ValueError):
+        raise ValueError("Malformed checksum digest")
+    if len(digest) != hashlib.new(algorithm).digest_size:
+        raise ValueError("Malformed checksum digest")
+    return algorithm, digest
+
+
+class TusMultipartWriter:
+    """
+    Appends PATCH bodies to the S3 multipart upload behind an upload session
+
+    Every part except the last is exactly TUS_S3_PART_SIZE bytes, so the part
+    number for any offset is offset // part_size + 1 and the session's ETag
+    list always covers exactly the full parts below its offset. Bytes past
+    the last full part are parked in a small side object keyed by the offset
+    they end at; the next PATCH reads it back first. At most one part (plus
+    one network read) is held in memory.
+    """
+
+    def __init__(self, s3: S3Service):
+        self.s3 = s3
+        self.part_size = settings.TUS_S3_PART_SIZE
+
+    @staticmethod
+    def tail_key(session: UploadSession, offset: int) -> str:
+        return f"{session.s3_key}.tus-tail-{offset}"
+
+    async def _call(self, func, *args):
+        # boto3 is blocking; keep it off the event loop
+        try:
+            return await run_in_threadpool(func, *args)
+        except Exception as e:
+            logger.error(f"S3 multipart operation failed for upload: {e}")
+            raise UploadStorageError(str(e)) from e
+
+    async def start(self, s3_key: str, bucket: str, content_type: Optional[str] = None) -> str:
+        """Create the S3 multipart upload; returns its UploadId"""
+        return await self._call(self.s3.create_multipart_upload, s3_key, bucket, content_type)
+
+    async def write(
+        self,
+        session: UploadSession,
+        offset: int,
+        stream: AsyncIterator[bytes],
+        checksum: Optional[Tuple[str, bytes]] = None
+    ) -> Tuple[int, List[str]]:
+        """
+        Upload the stream starting at `offset`; returns the new offset and
+        the ETags of every full part below it. Completes the S3 upload when
+        the last byte arrives. With a checksum, the body is verified before
+        anything that would outlive a rejected request (tail object, final
+        completion). If the client disconnects mid-body, everything received
+        so far is kept (unless a checksum was sent) and returned as the new
+        offset. Nothing here touches the database; the caller records the
+        result
+        """
+        hasher = hashlib.new(checksum[0]) if checksum else None
+        buffer = bytearray()
+        if offset % self.part_size:
+            buffer += await self._call(self.s3.get_bytes, self.tail_key(session, offset), session.s3_bucket)
+        part_number = offset // self.part_size + 1
+        etags = list(session.part_etags[:part_number - 1])
+        received = offset
+
+        try:
+            async for chunk in stream:
+                if not chunk:
+                    continue
+                received += len(chunk)
+                if received > session.upload_length:
+                    raise UploadTooLargeError()
+                if hasher:
+                    hasher.update(chunk)
+                buffer += chunk
+                # Parts past the recorded offset are simply overwritten if this
+                # request is later rejected and retried
+                while len(buffer) >= self.part_size:
+                    part = bytes(buffer[:self.part_size])
+                    del buffer[:self.part_size]
+                    etags.append(await self._upload_part(session, part_number, part))
+                    part_number += 1
+        except ClientDisconnect:
+            # A checksummed chunk can only be accepted whole; the caller
+            # discards it
+            if hasher:
+                raise
+            # Keep what arrived so the client resumes from here, not from
+            # the start of the chunk; HEAD will report this offset
+            logger.info(
+                f"Client disconnected from upload {session.tus_upload_id}; "
+                f"keeping {received - offset} of the chunk's bytes"
+            )
+            hasher = None
+
+        if hasher and hasher.digest() != checksum[1]:
+            raise ChecksumMismatchError()
+
+        if received == session.upload_length:
+            # The last part may be short; a zero-byte file still needs one part
+            if buffer or part_number == 1:
+                etags.append(await self._upload_part(session, part_number, bytes(buffer)))
+            await self._complete(session.s3_key, session.s3_upload_id, etags, session.s3_bucket)
+        elif buffer:
+            await self._call(self.s3.put_bytes, self.tail_key(session, received), bytes(buffer), session.s3_bucket)
+        return received, etags
+
+    async def _upload_part(self, session: UploadSession, part_number: int, data: bytes) -> str:
+        return await self._call(
+            self.s3.upload_part,
+            session.s3_key,
+            session.s3_upload_id,
+            part_number,
+            data,
+            session.s3_bucket
+        )
+
+    async def _complete(self, s3_key: str, upload_id: str, etags: List[str], bucket: str) -> None:
+        await self._call(
+            self.s3.complete_multipart_upload,
+            s3_key,
+            upload_id,
+            [{'PartNumber': i + 1, 'ETag': etag} for i, etag in enumerate(etags)],
+            bucket
+        )
+
+    async def concatenate(
+        self,
+        s3_key: str,
+        bucket: str,
+        partials: List[UploadSession],
+        content_type: Optional[str] = None
+    ) -> None:
+        """
+        Merge completed partial uploads, in order, into a new object.
+        Ranges of at least S3_MIN_PART_SIZE are copied server-side with
+        UploadPartCopy; shorter runs are read into a part-sized buffer
+        """
+        upload_id = await self.start(s3_key, bucket, content_type)
+        etags: List[str] = []
+        buffer = bytearray()
+
+        async def flush() -> None:
+            etags.append(await self._call(
+                self.s3.upload_part, s3_key, upload_id, len(etags) + 1, bytes(buffer), bucket
+            ))
+            buffer.clear()
+
+        try:
+            for partial in partials:
+                position, size = 0, partial.upload_length
+                while position < size:
+                    if not buffer and size - position >= S3_MIN_PART_SIZE:
+                        etags.append(await self._call(
+                            self.s3.upload_part_copy,
+                            s3_key,
+                            upload_id,
+                            len(etags) + 1,
+                            partial.s3_key,
+                            position,
+                            size - 1,
+                            bucket,
+                            partial.s3_bucket
+                        ))
+                        position = size
+                        continue
+                    take = min(self.part_size - len(buffer), size - position)
+                    buffer += await self._call(
+                        self.s3.get_bytes, partial.s3_key, partial.s3_bucket, position, position + take - 1
+                    )
+                    position += take
+                    if len(buffer) >= self.part_size:
+                        await flush()
+            if buffer or not etags:
+                await flush()
+            await self._complete(s3_key, upload_id, etags, bucket)
+        except UploadStorageError:
+            await self._abort(s3_key, upload_id, bucket)
+            raise
+
+    async def _abort(self, s3_key: str, upload_id: str, bucket: str) -> None:
+        try:
+            await run_in_threadpool(self.s3.abort_multipart_upload, s3_key, upload_id, bucket)
+        except Exception as e:
+            logger.warning(f"Could not abort multipart upload for {s3_key}: {e}")
+
+    async def terminate(self, session: UploadSession) -> None:
+        """
+        Best-effort removal of everything a session holds in S3: the open
+        multipart upload and its tail, or the finished object of a partial.
+        The offset alone cannot tell these apart (a zero-byte upload starts
+        at its full length), so an open s3_upload_id decides. Direct
+        sessions are dropped on completion, so theirs is always open
+        """
+        if not (session.is_direct or session.s3_upload_id):
+            await run_in_threadpool(self.s3.delete_file, session.s3_key, session.s3_bucket)
+            return
+        await self._abort(session.s3_key, session.s3_upload_id, session.s3_bucket)
+        await self.discard_tail(session, session.upload_offset)
+
+    async def discard_tail(self, session: UploadSession, offset: int) -> None:
+        """Best-effort removal of the side object for an offset that is no longer current"""
+        if offset % self.part_size == 0:
+            return
+        try:
+            await run_in_threadpool(self.s3.delete_file, self.tail_key(session, offset), session.s3_bucket)
+        except Exception as e:
+            logger.warning(f"Could not delete upload tail {self.tail_key(session, offset)}: {e}")
+
+
+class UploadExpiryReaper:
+    """
+    Periodically removes uploads idle for longer than TUS_UPLOAD_EXPIRATION
+
+    Aborts their S3 multipart uploads (so the stored parts stop being
+    billed), deletes the sessions and marks the file rows failed.
+    """
+
+    def __init__(self):
+        self._task = PeriodicTask(
+            "tus-upload-expiry",
+            self.run,
+            settings.TUS_EXPIRY_CHECK_SECONDS
+        )
+
+    async def reap(self, db, s3: S3Service) -> int:
+        """Expire one batch; returns sessions removed"""
+        repo = UploadSessionRepository(db)
+        expired = await repo.list_expired(datetime.now(timezone.utc), settings.TUS_EXPIRY_BATCH_SIZE)
+        if not expired:
+            return 0
+
+        if s3.enabled:
+            writer = TusMultipartWriter(s3)
+            for session in expired:
+                await writer.terminate(session)
+
+        async with UnitOfWork(db):
+            await repo.delete_many([session.tus_upload_id for session in expired])
+            await FileRepository(db).fail_uploads(
+                [session.file_id for session in expired if session.file_id],
+                "Upload expired"
+            )
+        return len(expired)
+
+    async def run(self) -> None:
+        s3 = services.get("s3")
+        async with SessionLocal() as db:
+            while True:
+                removed = await self.reap(db, s3)
+                if removed:
+                    logger.info(f"Upload expiry: removed {removed} expired uploads")
+                if removed < settings.TUS_EXPIRY_BATCH_SIZE:
+                    break
+
+    def start(self) -> None:
+        self._task.start()
+
+    async def stop(self) -> None:
+        await self._task.stop()
+
+
+upload_expiry_reaper = UploadExpiryReaper()
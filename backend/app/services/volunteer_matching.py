@@ -0,0 +1,108 @@
+"""
+Volunteer Matching
+Cached volunteer capability map joined in memory with the availability index
+"""
+
+from datetime import datetime
+from typing import Dict, FrozenSet, List, Optional, Set, Tuple
+from uuid import UUID
+from sqlalchemy.ext.asyncio import AsyncSession
+from app.core.config import settings
+from app.repositories.user_profile_repository import UserProfileRepository
+from app.services.availability_index import availability_index
+import asyncio
+import time
+
+
+class VolunteerCapabilities:
+    """
+    Denormalised specialization/language map for active volunteers
+
+    Loaded with one query and kept for VOLUNTEER_CAPABILITY_TTL_SECONDS.
+    Inverted sets per specialization and per language turn a match into a
+    set intersection, so slot searches never join user_profiles.
+    """
+
+    def __init__(self):
+        self._profiles: Dict[UUID, Tuple[Optional[str], List[str]]] = {}
+        self._by_specialization: Dict[str, Set[UUID]] = {}
+        self._by_language: Dict[str, Set[UUID]] = {}
+        self._loaded_at: Optional[float] = None
+        self._lock = asyncio.Lock()
+
+    @property
+    def fresh(self) -> bool:
+        return (
+            self._loaded_at is not None
+            and time.monotonic() - self._loaded_at < settings.VOLUNTEER_CAPABILITY_TTL_SECONDS
+        )
+
+    def invalidate(self) -> None:
+        """Force a reload on next use (e.g. after a volunteer is deactivated)"""
+        self._loaded_at = None
+
+    async def ensure_loaded(self, db: AsyncSession) -> None:
+        if self.fresh:
+            return
+        async with self._lock:
+            if self.fresh:
+                return
+            rows = await UserProfileRepository(db).list_volunteer_capabilities()
+
+            profiles, by_specialization, by_language = {}, {}, {}
+            for user_id, specialization, languages in rows:
+                profiles[user_id] = (specialization, languages)
+                if specialization:
+                    by_specialization.setdefault(specialization.strip().lower(), set()).add(user_id)
+                for language in languages:
+                    by_language.setdefault(language.strip().lower(), set()).add(user_id)
+
+            self._profiles = profiles
+            self._by_specialization = by_specialization
+            self._by_language = by_language
+            self._loaded_at = time.monotonic()
+
+    def match(self, specialization: Optional[str] = None, languages: Optional[List[str]] = None) -> FrozenSet[UUID]:
+        """Volunteers with the specialization and every requested language"""
+        candidates: Optional[Set[UUID]] = None
+        if specialization:
+            candidates = set(self._by_specialization.get(specialization.strip().lower(), ()))
+        for language in languages or []:
+            speakers = self._by_language.get(language.strip().lower(), set())
+            candidates = set(speakers) if candidates is None else candidates & speakers
+            if not candidates:
+                break
+        if candidates is None:
+            candidates = set(self._profiles)
+        return frozenset(candidates)
+
+    def profile(self, volunteer_id: UUID) -> Tuple[Optional[str], List[str]]:
+        return self._profiles.get(volunteer_id, (None, []))
+
+
+volunteer_capabilities = VolunteerCapabilities()
+
+
+async def match_free_windows(
+    db: AsyncSession,
+    duration_minutes: int,
+    start: datetime,
+    end: datetime,
+    specialization: Optional[str] = None,
+    languages: Optional[List[str]] = None,
+    limit: int = 50
+) -> List[Tuple[UUID, datetime, datetime]]:
+    """Earliest free windows among volunteers matching the capabilities"""
+    await volunteer_capabilities.ensure_loaded(db)
+    candidates = volunteer_capabilities.match(specialization, languages)
+    if not candidates:
+        return []
+
+    await availability_index.ensure_built(db)
+    return availability_index.free_windows(
+        duration_minutes,
+        start,
+        end,
+        volunteer_ids=list(candidates),
+        limit=limit
+    )
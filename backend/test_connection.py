@@ -4,6 +4,7 @@ Test Database Connection from FastAPI Backend
 Tests that the backend can connect to the database using SQLAlchemy
 """
 
+import asyncio
 import sys
 import os
 
@@ -14,7 +15,7 @@ from app.core.database import engine, SessionLocal
 from app.core.config import settings
 from sqlalchemy import text
 
-def test_connection():
+async def check_connection():
     """Test database connection"""
     print("🔌 Testing database connection from FastAPI backend...")
     print(f"   Database URL: {settings.DATABASE_URL.split('@')[1] if '@' in settings.DATABASE_URL else 'hidden'}")
@@ -22,15 +23,15 @@ def test_connection():
     
     try:
         # Test connection using engine
-        with engine.connect() as conn:
-            result = conn.execute(text("SELECT version();"))
+        async with engine.connect() as conn:
+            result = await conn.execute(text("SELECT version();"))
             version = result.fetchone()[0]
             print(f"✅ Connection successful!")
             print(f"   PostgreSQL version: {version.split(',')[0]}")
             print()
             
             # Test table count
-            result = conn.execute(text("""
+            result = await conn.execute(text("""
                 SELECT COUNT(*) 
                 FROM information_schema.tables 
                 WHERE table_schema = 'public' 
@@ -41,7 +42,7 @@ def test_connection():
             print()
             
             # Test users table
-            result = conn.execute(text("""
+            result = await conn.execute(text("""
                 SELECT COUNT(*) 
                 FROM information_schema.columns 
                 WHERE table_name = 'users';
@@ -51,16 +52,13 @@ def test_connection():
             print()
             
             # Test SessionLocal
-            db = SessionLocal()
-            try:
-                result = db.execute(text("SELECT 1 as test;"))
+            async with SessionLocal() as db:
+                result = await db.execute(text("SELECT 1 as test;"))
                 test_value = result.fetchone()[0]
                 if test_value == 1:
                     print("✅ SessionLocal working correctly")
                 else:
                     print("❌ SessionLocal test failed")
-            finally:
-                db.close()
             
             print()
             print("=" * 60)
@@ -79,6 +77,12 @@ def test_connection():
         print("2. Check DATABASE_URL in backend/.env")
         print("3. Verify database exists: psql -d globalhealth_connect")
         sys.exit(1)
+    finally:
+        await engine.dispose()
+
+def test_connection():
+    """Test database connection"""
+    asyncio.run(check_connection())
 
 if __name__ == "__main__":
     test_connection()
@@ -0,0 +1,79 @@
+#!/usr/bin/env python3
+"""
+Test Import Time
+Fails if `import app.main` exceeds the startup budget or pulls in heavy SDKs
+
+Only the app's own share is budgeted: the frameworks every worker needs
+are imported first and timed separately, since their cost varies with
+the machine and is outside our control
+"""
+
+import os
+import subprocess
+import sys
+
+IMPORT_TIME_BUDGET_SECONDS = float(os.environ.get("IMPORT_TIME_BUDGET_SECONDS", "1.0"))
+
+# Imported (and timed) before app.main; excluded from the budget
+BASELINE_MODULES = ("fastapi", "pydantic", "pydantic_settings", "sqlalchemy", "sqlalchemy.ext.asyncio")
+
+# These must load on first use, never at worker startup
+DEFERRED_MODULES = ("boto3", "botocore", "cv2", "numpy", "firebase_admin")
+
+MEASURE_SCRIPT = f"""
+import importlib, sys, time
+start = time.perf_counter()
+for name in {BASELINE_MODULES!r}:
+    importlib.import_module(name)
+baseline = time.perf_counter() - start
+start = time.perf_counter()
+import app.main
+elapsed = time.perf_counter() - start
+loaded = [name for name in {DEFERRED_MODULES!r} if name in sys.modules]
+print(f"{{baseline:.3f}} {{elapsed:.3f}} {{','.join(loaded)}}")
+"""
+
+
+def measure_import():
+    """
+    Import app.main in a fresh interpreter after the baseline frameworks;
+    return (baseline seconds, app seconds, eagerly loaded heavy modules)
+    """
+    env = dict(os.environ)
+    env.setdefault("SECRET_KEY", "import-time-check")
+    env.setdefault("DATABASE_URL", "postgresql://localhost/import_time_check")
+    
+    result = subprocess.run(
+        [sys.executable, "-c", MEASURE_SCRIPT],
+        cwd=os.path.dirname(os.path.abspath(__file__)),
+        env=env,
+        capture_output=True,
+        text=True,
+    )
+    if result.returncode != 0:
+        raise RuntimeError(f"import app.main failed:\n{result.stderr}")
+    
+    baseline, elapsed, loaded = (result.stdout.strip().splitlines()[-1].split(" ") + [""])[:3]
+    return float(baseline), float(elapsed), [name for name in loaded.split(",") if name]
+
+
+def test_import_time():
+    """Test worker startup import budget"""
+    print("⏱️  Measuring `import app.main`...")
+    baseline, elapsed, loaded = measure_import()
+    print(f"   Frameworks took {baseline:.3f}s (not budgeted)")
+    print(f"   App import took {elapsed:.3f}s (budget {IMPORT_TIME_BUDGET_SECONDS:.1f}s)")
+    
+    assert not loaded, f"Heavy modules imported at startup: {', '.join(loaded)}"
+    assert elapsed <= IMPORT_TIME_BUDGET_SECONDS, (
+        f"import app.main took {elapsed:.3f}s beyond the frameworks, budget is {IMPORT_TIME_BUDGET_SECONDS:.1f}s"
+    )
+    print("   ✅ Within budget")
+
+
+if __name__ == "__main__":
+    try:
+        test_import_time()
+    except (AssertionError, RuntimeError) as e:
+        print(f"   ❌ {e}")
+        sys.exit(1)
@@ -30,6 +30,11 @@ CREATE INDEX idx_cases_doctor ON cases(requesting_doctor_id);
 CREATE INDEX idx_cases_volunteer ON cases(assigned_volunteer_id);
 CREATE INDEX idx_cases_patient ON cases(patient_id);
 CREATE INDEX idx_cases_priority ON cases(priority_score DESC, created_at);
+-- Volunteer case queue: keyset pagination over (priority_score DESC, created_at, id)
+CREATE INDEX idx_cases_available ON cases(priority_score DESC, created_at, id)
+    WHERE status = 'submitted' AND assigned_volunteer_id IS NULL;
+-- Keyset pagination of a doctor's cases (created_at, id)
+CREATE INDEX idx_cases_doctor_created ON cases(requesting_doctor_id, created_at DESC, id DESC);
 CREATE INDEX idx_cases_offline ON cases(is_offline, device_id) WHERE is_offline = TRUE;
 
 -- Case Status History (Audit trail)
@@ -35,6 +35,30 @@ CREATE INDEX idx_files_tus_id ON files(tus_upload_id) WHERE tus_upload_id IS NOT
 CREATE INDEX idx_files_uploaded_by ON files(uploaded_by);
 CREATE INDEX idx_files_quality ON files(quality_score) WHERE quality_score IS NOT NULL;
 
+-- Upload Sessions (in-progress TUS and direct-to-S3 uploads)
+-- Hot per-chunk state lives here; the files row is only touched at progress
+-- milestones and completion. Rows are deleted when the upload completes,
+-- except concatenation partials, which are kept until merged or expired
+CREATE TABLE upload_sessions (
+    tus_upload_id VARCHAR(255) PRIMARY KEY,
+    file_id UUID REFERENCES files(id) ON DELETE CASCADE,  -- NULL for concatenation partials
+    uploaded_by UUID NOT NULL,
+    s3_key VARCHAR(500) NOT NULL,
+    s3_bucket VARCHAR(100) NOT NULL,
+    s3_upload_id VARCHAR(1024),  -- S3 multipart UploadId; NULL once the upload is completed
+    upload_length BIGINT NOT NULL,
+    upload_offset BIGINT NOT NULL DEFAULT 0,  -- Exact bytes received (TUS Upload-Offset)
+    part_etags JSONB NOT NULL DEFAULT '[]',  -- ETag of part N at index N-1
+    is_partial BOOLEAN NOT NULL DEFAULT FALSE,  -- Upload-Concat: partial
+    is_direct BOOLEAN NOT NULL DEFAULT FALSE,  -- Client PUTs parts to presigned S3 URLs; offset/ETags unused
+    created_at TIMESTAMPTZ DEFAULT NOW(),
+    updated_at TIMESTAMPTZ DEFAULT NOW(),
+    expires_at TIMESTAMPTZ NOT NULL
+);
+
+CREATE INDEX idx_upload_sessions_file ON upload_sessions(file_id);
+CREATE INDEX idx_upload_sessions_expires ON upload_sessions(expires_at);
+
 -- File Access Log (HIPAA compliance - track who accessed which files)
 CREATE TABLE file_access_logs (
     id UUID PRIMARY KEY DEFAULT gen_random_uuid(),
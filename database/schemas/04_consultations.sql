@@ -33,12 +33,18 @@ CREATE TABLE consultations (
 
 -- Indexes for consultations table
 CREATE INDEX idx_consultations_case ON consultations(case_id);
+-- At most one live consultation per case; cancelled/rescheduled ones are kept as history
+CREATE UNIQUE INDEX uq_consultations_active_case ON consultations(case_id)
+    WHERE status NOT IN ('cancelled', 'rescheduled');
 CREATE INDEX idx_consultations_volunteer ON consultations(volunteer_id);
 CREATE INDEX idx_consultations_patient ON consultations(patient_id);
 CREATE INDEX idx_consultations_scheduled ON consultations(scheduled_start);
 CREATE INDEX idx_consultations_status ON consultations(status);
 -- Note: Partial index with NOW() cannot be created directly
 -- Will be created as a regular index, filtering can be done in queries
+-- Keyset pagination of consultation lists (scheduled_start, id)
+CREATE INDEX idx_consultations_doctor_scheduled ON consultations(requesting_doctor_id, scheduled_start DESC, id DESC);
+CREATE INDEX idx_consultations_volunteer_scheduled ON consultations(volunteer_id, scheduled_start DESC, id DESC);
 CREATE INDEX idx_consultations_upcoming ON consultations(scheduled_start, status) WHERE status = 'scheduled';
 
 -- Consultation Participants (for multi-party consultations if needed)
@@ -46,7 +52,7 @@ CREATE TABLE consultation_participants (
     id UUID PRIMARY KEY DEFAULT gen_random_uuid(),
     consultation_id UUID NOT NULL REFERENCES consultations(id) ON DELETE CASCADE,
     user_id UUID NOT NULL REFERENCES users(id),
-    role VARCHAR(50) NOT NULL,  -- 'volunteer', 'patient', 'requesting_doctor', 'observer'
+    role VARCHAR(50) NOT NULL,  -- 'volunteer', 'patient', 'requesting_doctor', 'interpreter', 'observer'
     joined_at TIMESTAMPTZ,
     left_at TIMESTAMPTZ,
     connection_quality VARCHAR(20),
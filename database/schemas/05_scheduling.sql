@@ -12,6 +12,7 @@ CREATE TABLE availability_blocks (
     slot_duration_minutes INTEGER DEFAULT 10,
     is_recurring BOOLEAN DEFAULT FALSE,
     recurrence_pattern JSONB,  -- For recurring availability (e.g., "every Monday")
+    materialized_until TIMESTAMPTZ,  -- Recurring blocks: slots have been generated up to here
     status VARCHAR(50) DEFAULT 'active' CHECK (status IN ('active', 'cancelled', 'expired')),
     created_at TIMESTAMPTZ DEFAULT NOW(),
     updated_at TIMESTAMPTZ DEFAULT NOW(),
@@ -22,6 +23,7 @@ CREATE TABLE availability_blocks (
 CREATE INDEX idx_availability_blocks_volunteer ON availability_blocks(volunteer_id);
 CREATE INDEX idx_availability_blocks_time ON availability_blocks(start_time, end_time);
 CREATE INDEX idx_availability_blocks_active ON availability_blocks(volunteer_id, status) WHERE status = 'active';
+CREATE INDEX idx_availability_blocks_materialize ON availability_blocks(materialized_until) WHERE is_recurring AND status = 'active';
 
 -- Appointment Slots Table
 -- Auto-generated slots from availability blocks
@@ -42,7 +44,9 @@ CREATE TABLE appointment_slots (
 -- Indexes for appointment_slots
 CREATE INDEX idx_appointment_slots_volunteer ON appointment_slots(volunteer_id);
 CREATE INDEX idx_appointment_slots_time ON appointment_slots(start_time, end_time);
-CREATE INDEX idx_appointment_slots_status ON appointment_slots(status, start_time) WHERE status = 'available';
+-- Keyset pagination of available slots (start_time, id)
+CREATE INDEX idx_appointment_slots_status ON appointment_slots(start_time, id) WHERE status = 'available';
+CREATE INDEX idx_appointment_slots_volunteer_available ON appointment_slots(volunteer_id, start_time, id) WHERE status = 'available';
 CREATE INDEX idx_appointment_slots_consultation ON appointment_slots(consultation_id) WHERE consultation_id IS NOT NULL;
 
 -- Time Zone Conversions Cache (for performance)
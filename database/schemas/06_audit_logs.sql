@@ -1,9 +1,10 @@
 -- Audit Logs Table
 -- HIPAA/GDPR compliance - track all PHI access and modifications
+-- Written in batches by the backend (app/core/audit.py), partitioned by month
 
 CREATE TABLE audit_logs (
-    id UUID PRIMARY KEY DEFAULT gen_random_uuid(),
-    user_id UUID REFERENCES users(id),
+    id UUID NOT NULL DEFAULT gen_random_uuid(),
+    user_id UUID,  -- No FK: audit rows outlive users and must never fail a batch insert
     action VARCHAR(100) NOT NULL,  -- 'view', 'create', 'update', 'delete', 'download', 'export'
     resource_type VARCHAR(50) NOT NULL,  -- 'case', 'file', 'consultation', 'user'
     resource_id UUID,
@@ -14,15 +15,61 @@ CREATE TABLE audit_logs (
     request_body_hash VARCHAR(64),  -- SHA-256 hash of request body (for privacy)
     response_status INTEGER,
     details JSONB,  -- Additional context (non-PHI)
-    created_at TIMESTAMPTZ DEFAULT NOW()
-);
+    created_at TIMESTAMPTZ NOT NULL DEFAULT NOW(),
+    -- The partition key must be part of the primary key
+    PRIMARY KEY (id, created_at)
+) PARTITION BY RANGE (created_at);
 
--- Partition by month for performance (large table)
--- Note: This requires PostgreSQL 10+
--- CREATE TABLE audit_logs_2025_11 PARTITION OF audit_logs
---     FOR VALUES FROM ('2025-11-01') TO ('2025-12-01');
+-- Catches rows outside every monthly partition so inserts never fail
+CREATE TABLE audit_logs_default PARTITION OF audit_logs DEFAULT;
 
--- Indexes for audit_logs
+-- Creates monthly partitions from the current month through months_ahead.
+-- Called at startup and daily by the backend; safe to run repeatedly.
+-- CREATE ... PARTITION OF fails once the DEFAULT partition holds rows in the
+-- new range, so each partition is built standalone, the matching rows are
+-- moved out of DEFAULT into it, and then it is attached.
+CREATE OR REPLACE FUNCTION ensure_audit_log_partitions(months_ahead INTEGER DEFAULT 2)
+RETURNS VOID AS $$
+DECLARE
+    month_start DATE;
+    month_end DATE;
+    partition_name TEXT;
+BEGIN
+    FOR i IN 0..months_ahead LOOP
+        month_start := (date_trunc('month', NOW()) + make_interval(months => i))::DATE;
+        month_end := (month_start + INTERVAL '1 month')::DATE;
+        partition_name := 'audit_logs_' || to_char(month_start, 'YYYY_MM');
+
+        IF to_regclass(partition_name) IS NULL THEN
+            -- Held to the end of the transaction so no row lands in DEFAULT
+            -- between the move and the attach
+            LOCK TABLE audit_logs_default IN ACCESS EXCLUSIVE MODE;
+            EXECUTE format(
+                'CREATE TABLE %I (LIKE audit_logs INCLUDING DEFAULTS INCLUDING CONSTRAINTS)',
+                partition_name
+            );
+            EXECUTE format(
+                'WITH moved AS (DELETE FROM audit_logs_default WHERE created_at >= %L AND created_at < %L RETURNING *) '
+                || 'INSERT INTO %I SELECT * FROM moved',
+                month_start,
+                month_end,
+                partition_name
+            );
+            -- Indexes are created on the new partition to match the parent's
+            EXECUTE format(
+                'ALTER TABLE audit_logs ATTACH PARTITION %I FOR VALUES FROM (%L) TO (%L)',
+                partition_name,
+                month_start,
+                month_end
+            );
+        END IF;
+    END LOOP;
+END;
+$$ LANGUAGE plpgsql;
+
+SELECT ensure_audit_log_partitions(2);
+
+-- Indexes for audit_logs (created on every partition)
 CREATE INDEX idx_audit_logs_user ON audit_logs(user_id);
 CREATE INDEX idx_audit_logs_resource ON audit_logs(resource_type, resource_id);
 CREATE INDEX idx_audit_logs_action ON audit_logs(action);
@@ -31,4 +78,3 @@ CREATE INDEX idx_audit_logs_ip ON audit_logs(ip_address);
 
 -- Composite index for common queries
 CREATE INDEX idx_audit_logs_user_resource ON audit_logs(user_id, resource_type, created_at DESC);
-
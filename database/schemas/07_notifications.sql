@@ -23,6 +23,8 @@ CREATE TABLE notifications (
 CREATE INDEX idx_notifications_user ON notifications(user_id);
 CREATE INDEX idx_notifications_status ON notifications(status);
 CREATE INDEX idx_notifications_type ON notifications(type);
+-- Keyset pagination of a user's notifications (created_at, id)
+CREATE INDEX idx_notifications_user_created ON notifications(user_id, created_at DESC, id DESC);
 CREATE INDEX idx_notifications_unread ON notifications(user_id, read_at) WHERE read_at IS NULL;
 CREATE INDEX idx_notifications_scheduled ON notifications(scheduled_for) WHERE status = 'pending' AND scheduled_for IS NOT NULL;
 
@@ -11,7 +11,8 @@ class AvailableCasesService {
 
   AvailableCasesService(this._apiClient);
 
-  /// Get cases available for volunteers (pending cases)
+  /// Get cases available for volunteers (submitted, unassigned),
+  /// highest priority first
   Future<Map<String, dynamic>> getAvailableCases({
     int page = 1,
     int pageSize = 20,
@@ -21,14 +22,13 @@ class AvailableCasesService {
       final queryParams = <String, dynamic>{
         'page': page,
         'page_size': pageSize,
-        'status': 'pending', // Only show pending cases
       };
       if (urgency != null) {
         queryParams['urgency'] = urgency;
       }
 
       final response = await _apiClient.get(
-        AppConfig.casesBase,
+        '${AppConfig.casesBase}/available',
         queryParameters: queryParams,
       );
 